@@ -0,0 +1,129 @@
+"""
+Headless batch fitting of points files
+
+Fits every given file with a LinearRegression model and writes one row of results per file
+(as CSV or as a JSON array), without importing Tk or matplotlib, so it can run on servers
+without a display. The files are read in chunks (see DataImport), so a file of any size can
+be fitted, and several files are fitted at the same time by a pool of worker processes.
+The rows are written as soon as they are ready (in the order of the input files).
+
+Usage:
+    python BatchFit.py [-f csv|json] [-o OUTPUT] [-w WORKERS] [--stable] FILE [FILE ...]
+
+A FILE which is "-" is replaced by the paths read from the standard input (one per line).
+A file which can't be read or parsed gets a row with an error message instead of failing the whole batch.
+To fit a single very large file faster, use ShardedFit, which splits the file between the workers.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from LinearRegression import LinearRegression, StableLinearRegression
+from DataImport import iter_chunks
+
+FIELDS = ["file", "n", "alpha", "beta", "mean_x", "mean_y", "var_x", "cov_xy", "r2", "rse", "se_alpha", "se_beta",
+          "seconds", "error"]
+
+
+def fit_file(path, model=LinearRegression):
+    """ Fits the points of a file and returns a dictionary with the FIELDS of its results row. """
+
+    start_time = time.perf_counter()
+    lin_reg = model()
+    row = dict.fromkeys(FIELDS)
+    row["file"] = path
+    try:
+        for xs, ys, progress in iter_chunks(path):
+            lin_reg.add_points(xs, ys)
+    except Exception as e:
+        # Any error (a corrupt archive, for example) fails only the row of its file
+        row["error"] = str(e) or type(e).__name__
+
+    n, mx, my, cxx, cxy = lin_reg.get_moments()
+    row.update(n=n, alpha=lin_reg.get_alpha(), beta=lin_reg.get_beta())
+    if n > 0:
+        row.update(mean_x=mx, mean_y=my, var_x=cxx / n, cov_xy=cxy / n)
+    fit_stats = lin_reg.get_fit_stats()
+    if fit_stats is not None:
+        row.update(fit_stats._asdict())
+    row["seconds"] = time.perf_counter() - start_time
+    return row
+
+
+def fit_files(paths, model=LinearRegression, workers=None):
+    """ Yields the results rows of the given files (in the same order), fitting up to workers files at a time.
+
+    Parameters
+    ----------
+    paths : list
+        The paths of the points files
+    model (default = LinearRegression) : type
+        The class of the linear regression model used to fit every file
+    workers (default = None) : int
+        The number of worker processes (the number of CPUs if it is None)
+        If it is 1, the files are fitted one by one in the current process.
+    """
+
+    fit = partial(fit_file, model=model)
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers == 1:
+        yield from map(fit, paths)
+        return
+
+    # Many small files are sent to the workers in batches, so the inter-process overhead is paid per batch
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fit, paths, chunksize=chunksize)
+
+
+def write_csv(rows, out):
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        out.flush()
+
+
+def write_json(rows, out):
+    out.write("[")
+    for i, row in enumerate(rows):
+        out.write(("," if i else "") + "\n  " + json.dumps(row))
+        out.flush()
+    out.write("\n]\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit points files with linear regression, without a GUI.")
+    parser.add_argument("files", nargs="+", help="points files (.csv, .tsv, .txt, .npy, .npz), or - to read paths from stdin")
+    parser.add_argument("-f", "--format", choices=("csv", "json"), default="csv", help="output format (default: csv)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--stable", action="store_true", help="use StableLinearRegression")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.files:
+        if path == "-":
+            paths.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            paths.append(path)
+
+    model = StableLinearRegression if args.stable else LinearRegression
+    write = write_csv if args.format == "csv" else write_json
+    rows = fit_files(paths, model, args.workers)
+    if args.output is None:
+        write(rows, sys.stdout)
+    else:
+        with open(args.output, "w", newline="") as out:
+            write(rows, out)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Chunked readers for points files
+
+Every reader yields the points of a file in chunks of at most chunk_size points,
+together with the fraction of the file that was read so far, so the memory needed
+to import a file is bounded by the chunk size, no matter how large the file is.
+
+Supported formats:
+    .csv / .tsv / any other extension : text files with one point per line
+        (the x and y coordinates are separated by a comma in .csv files, a tab in .tsv files, and
+        by the first of a tab, a semicolon or a comma found in the first non-empty line of the others,
+        or else by whitespace)
+        A first line which doesn't start with two numbers is treated as a header and skipped.
+    .npy : an array of shape (n, 2)
+    .npz : either an "x" and a "y" array of shape (n,), or a single array of shape (n, 2)
+    .f64 / .bin : a raw file of little-endian float64 (x, y) pairs (see MappedDataset)
+
+This module doesn't use Tk or matplotlib, so it can be used without a display.
+"""
+
+import os
+import zipfile
+from itertools import islice
+import numpy as np
+
+CHUNK_SIZE = 1 << 16
+
+TEXT_FORMATS = (".csv", ".tsv", ".txt", ".dat")
+FILE_TYPES = [("Points files", "*.csv *.tsv *.txt *.dat *.npy *.npz *.f64 *.bin"), ("All files", "*.*")]
+
+
+SNIFFED_DELIMITERS = ("\t", ";", ",")
+
+
+def get_first_line(f):
+    """ Returns the first non-empty line of a binary file (b"" if there is none). """
+
+    for line in f:
+        if line.strip():
+            return line
+    return b""
+
+
+def get_delimiter(path):
+    """ Returns the delimiter used by a text points file (None for whitespace).
+
+    It is given by the extension of .csv and .tsv files, and sniffed from the first non-empty line of the others.
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return ","
+    if ext == ".tsv":
+        return "\t"
+    with open(path, "rb") as f:
+        first = get_first_line(f)
+    for delimiter in SNIFFED_DELIMITERS:
+        if delimiter.encode() in first:
+            return delimiter
+    return None
+
+
+def is_header(line, delimiter):
+    try:
+        fields = line.decode().split(delimiter)
+        float(fields[0])
+        float(fields[1])
+        return False
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return True
+
+
+def parse_lines(lines, delimiter):
+    """ Returns the x and y columns of a list of (bytes) text lines. """
+
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return np.empty(0), np.empty(0)
+    data = np.loadtxt([line.decode() for line in lines], delimiter=delimiter, ndmin=2, usecols=(0, 1))
+    return data[:, 0], data[:, 1]
+
+
+def iter_text_chunks(path, chunk_size=CHUNK_SIZE):
+    delimiter = get_delimiter(path)
+    size = max(os.path.getsize(path), 1)
+
+    with open(path, "rb") as f:
+        # The first line is a header only if it doesn't start with two numbers
+        first = get_first_line(f)
+        lines = [] if not first or is_header(first, delimiter) else [first]
+        lines.extend(islice(f, chunk_size - len(lines)))
+        while lines:
+            xs, ys = parse_lines(lines, delimiter)
+            yield xs, ys, f.tell() / size
+            lines = list(islice(f, chunk_size))
+
+
+def iter_npy_chunks(path, chunk_size=CHUNK_SIZE):
+    data = np.load(path, mmap_mode="r")
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError(f"{path} must contain an array of shape (n, 2)")
+
+    rows = data.shape[0]
+    for start in range(0, rows, chunk_size):
+        stop = min(start + chunk_size, rows)
+        # Copy the chunk, so only chunk_size rows of the mapped file are kept in memory
+        chunk = np.array(data[start:stop, :2], dtype=np.float64)
+        yield chunk[:, 0], chunk[:, 1], stop / rows
+
+
+def open_npz_member(archive, name):
+    """ Opens an array stored inside a .npz archive and returns (file, shape, dtype) without reading the data. """
+
+    fp = archive.open(name)
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    if fortran_order and len(shape) > 1:
+        raise ValueError(f"{name} is stored in Fortran order, which can't be streamed")
+    return fp, shape, dtype
+
+
+def read_npz_rows(fp, rows, row_shape, dtype):
+    count = rows * int(np.prod(row_shape))
+    data = fp.read(count * dtype.itemsize)
+    return np.frombuffer(data, dtype=dtype).reshape((rows,) + row_shape).astype(np.float64)
+
+
+def iter_npz_chunks(path, chunk_size=CHUNK_SIZE):
+    """ Streams the arrays of a .npz archive, so the (possibly compressed) arrays are never fully loaded. """
+
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        if "x.npy" in names and "y.npy" in names:
+            x_fp, x_shape, x_dtype = open_npz_member(archive, "x.npy")
+            y_fp, y_shape, y_dtype = open_npz_member(archive, "y.npy")
+            if x_shape != y_shape or len(x_shape) != 1:
+                raise ValueError(f"the x and y arrays of {path} must have the same shape (n,)")
+
+            rows = x_shape[0]
+            for start in range(0, rows, chunk_size):
+                count = min(chunk_size, rows - start)
+                xs = read_npz_rows(x_fp, count, (), x_dtype)
+                ys = read_npz_rows(y_fp, count, (), y_dtype)
+                yield xs, ys, (start + count) / rows
+        elif len(names) == 1:
+            fp, shape, dtype = open_npz_member(archive, names[0])
+            if len(shape) != 2 or shape[1] < 2:
+                raise ValueError(f"{path} must contain an array of shape (n, 2)")
+
+            rows = shape[0]
+            for start in range(0, rows, chunk_size):
+                count = min(chunk_size, rows - start)
+                chunk = read_npz_rows(fp, count, shape[1:], dtype)
+                yield chunk[:, 0], chunk[:, 1], (start + count) / rows
+        else:
+            raise ValueError(f"{path} must contain either an x and a y array or a single (n, 2) array")
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """ Yields the points of a file in chunks.
+
+    Parameters
+    ----------
+    path : str
+        The path of the points file
+    chunk_size (default = CHUNK_SIZE) : int
+        The maximum number of points in a chunk
+
+    Yields
+    ------
+    (xs, ys, progress)
+        The x and y coordinates of the points in the chunk (float64 arrays)
+        and the fraction of the file that was read so far (between 0 and 1).
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return iter_npy_chunks(path, chunk_size)
+    if ext == ".npz":
+        return iter_npz_chunks(path, chunk_size)
+    if ext in (".f64", ".bin"):
+        from MappedDataset import MappedDataset
+        return MappedDataset(path).iter_chunks(chunk_size)
+    return iter_text_chunks(path, chunk_size)
+
+
+if __name__ == "__main__":
+    import sys
+    from LinearRegression import LinearRegression
+
+    lin_reg = LinearRegression()
+    for xs, ys, progress in iter_chunks(sys.argv[1]):
+        lin_reg.add_points(xs, ys)
+        print(f"\r{progress:.0%} ({lin_reg.n} points)", end="")
+    print(f"\ny = {lin_reg.get_alpha()} + {lin_reg.get_beta()} * x")
@@ -0,0 +1,137 @@
+import math
+import numpy as np
+
+
+class DensityGrid:
+    """
+    A fixed-resolution 2D histogram of the points of a plot
+
+    It is used to draw large datasets as a density image instead of individual markers.
+    The counts are updated incrementally when points are added or deleted, and the image of any view
+    is computed from the counts (by summing blocks of cells), so its cost depends only on the resolution
+    of the grid, not on the number of points. The grid covers the points with some margin; a point outside
+    of the grid can't be added, so the owner has to rebuild the grid (the margin makes this rare).
+
+    Attributes
+    ----------
+    RESOLUTION : 1024
+        The default number of cells along each axis
+    MARGIN : 0.5
+        The fraction of the points' range added on each side of the grid when it is rebuilt
+    resolution : int
+        The number of cells along each axis
+    x0, y0 : double
+        The coordinates of the lower left corner of the grid
+    cell_w, cell_h : double
+        The size of a cell
+    counts : numpy.ndarray
+        A (resolution, resolution) array with the number of points in every cell (rows correspond to y)
+        The counts are int32, unless another dtype is given (int64 for datasets of billions of points).
+
+    Methods
+    -------
+    rebuild(xs, ys)
+        Fits the grid around the given points and counts them again.
+    set_bounds(x_min, x_max, y_min, y_max)
+        Fits the grid around the given limits and clears the counts (the points are added later, in chunks).
+    get_cells(xs, ys)
+        Returns the column and row of the cells of the points (or None if a point is outside of the grid).
+    add(xs, ys)
+        Adds points to the counts, returns False if a point is outside of the grid.
+    remove(x, y)
+        Removes a point from the counts.
+    get_view_cells(xlim, ylim)
+        Returns the ranges of columns and rows of the cells visible inside the given limits.
+    count_in(xlim, ylim)
+        Returns the number of points inside the cells visible inside the given limits.
+    render(xlim, ylim, bins)
+        Returns the image (at most bins x bins) of the given view and its extent.
+    """
+
+    RESOLUTION = 1024
+    MARGIN = 0.5
+
+    def __init__(self, resolution=RESOLUTION, dtype=np.int32):
+        self.resolution = resolution
+        self.x0 = self.y0 = 0.0
+        self.cell_w = self.cell_h = 1.0
+        self.counts = np.zeros((resolution, resolution), dtype=dtype)
+
+    def rebuild(self, xs, ys):
+        if len(xs) == 0:
+            self.counts[:] = 0
+            return
+
+        self.set_bounds(float(xs.min()), float(xs.max()), float(ys.min()), float(ys.max()))
+        self.add(xs, ys)
+
+    def set_bounds(self, x_min, x_max, y_min, y_max):
+        self.counts[:] = 0
+        for axis, low, high in (("x", x_min, x_max), ("y", y_min, y_max)):
+            span = max(high - low, abs(high) * 1e-9, 1e-12)
+            low -= span * DensityGrid.MARGIN
+            high += span * DensityGrid.MARGIN
+            setattr(self, axis + "0", low)
+            setattr(self, "cell_w" if axis == "x" else "cell_h", (high - low) / self.resolution)
+
+    def get_cells(self, xs, ys):
+        cols = np.floor((np.asarray(xs) - self.x0) / self.cell_w).astype(np.int64)
+        rows = np.floor((np.asarray(ys) - self.y0) / self.cell_h).astype(np.int64)
+        if len(cols) and (cols.min() < 0 or rows.min() < 0 or
+                          cols.max() >= self.resolution or rows.max() >= self.resolution):
+            return None
+        return cols, rows
+
+    def add(self, xs, ys, sign=1):
+        cells = self.get_cells(xs, ys)
+        if cells is None:
+            return False
+
+        cols, rows = cells
+        flat = self.counts.reshape(-1)
+        cells = rows * self.resolution + cols
+        if cells.size < flat.size // 16:
+            np.add.at(flat, cells, sign)
+        else:
+            # For large batches counting all the cells at once is faster than np.add.at
+            flat += sign * np.bincount(cells, minlength=flat.size).astype(flat.dtype)
+        return True
+
+    def remove(self, x, y):
+        return self.add([x], [y], sign=-1)
+
+    def get_view_cells(self, xlim, ylim):
+        res = self.resolution
+        col_min = min(max(math.floor((min(xlim) - self.x0) / self.cell_w), 0), res)
+        col_max = min(max(math.ceil((max(xlim) - self.x0) / self.cell_w), 0), res)
+        row_min = min(max(math.floor((min(ylim) - self.y0) / self.cell_h), 0), res)
+        row_max = min(max(math.ceil((max(ylim) - self.y0) / self.cell_h), 0), res)
+        return col_min, col_max, row_min, row_max
+
+    def count_in(self, xlim, ylim):
+        col_min, col_max, row_min, row_max = self.get_view_cells(xlim, ylim)
+        return int(self.counts[row_min:row_max, col_min:col_max].sum())
+
+    def render(self, xlim, ylim, bins):
+        """ Returns the image (at most bins x bins) of the given view and its extent.
+
+        Blocks of cells are summed into one pixel of the image when the view contains more than bins cells.
+        Returns (None, None) if the view doesn't overlap the grid.
+        """
+
+        col_min, col_max, row_min, row_max = self.get_view_cells(xlim, ylim)
+        if col_max <= col_min or row_max <= row_min:
+            return None, None
+
+        step_x = -(-(col_max - col_min) // bins)
+        step_y = -(-(row_max - row_min) // bins)
+        # Round the view to whole blocks, so all the pixels of the image have the same size
+        col_max = min(col_min + step_x * -(-(col_max - col_min) // step_x), self.resolution)
+        row_max = min(row_min + step_y * -(-(row_max - row_min) // step_y), self.resolution)
+
+        view = self.counts[row_min:row_max, col_min:col_max]
+        image = np.add.reduceat(view, np.arange(0, view.shape[0], step_y), axis=0)
+        image = np.add.reduceat(image, np.arange(0, view.shape[1], step_x), axis=1)
+        extent = (self.x0 + col_min * self.cell_w, self.x0 + col_max * self.cell_w,
+                  self.y0 + row_min * self.cell_h, self.y0 + row_max * self.cell_h)
+        return image, extent
@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+# kind : ADD or DELETE
+# start, stop : the range [start, stop) of the added points, or the index of the deleted point (start) and
+#     the index of the last point at the time of the deletion (stop)
+# x, y : the coordinates of the deleted point, or copies of the added points while an ADD is undone (None otherwise)
+# before, after : the states of the model before and after the step (None if the model can't be restored from its state)
+Step = namedtuple("Step", ["kind", "start", "stop", "x", "y", "before", "after"])
+
+ADD = "add"
+DELETE = "delete"
+
+
+class History:
+    """
+    The undo and redo history of the changes of a plot's points
+
+    Every step is a compact delta: added points are recorded as the range of indices they got in the
+    points store (so a bulk import of a million points is a single step of a few numbers) and a deleted
+    point by its index and coordinates. Undoing an addition cuts the store short, and the undone step keeps a
+    copy of the cut points (their slots in the store can be reused before the step is redone).
+    If the model can be restored from its state (see LinearRegression.get_state), the states before and
+    after the step are recorded too, so undoing or redoing a step restores the fit in O(1), without any
+    rounding error. Otherwise the inverse update (del_points for an addition) is applied.
+
+    Attributes
+    ----------
+    MAX_STEPS : 10000
+        The maximum number of steps which can be undone (the oldest steps are dropped)
+    undo_steps : list
+        The steps which can be undone, the last one first
+    redo_steps : list
+        The undone steps which can be redone, the last undone one first
+    groups : int
+        The number of open groups (see begin_group)
+        While a group is open, a range of points added right after the last range recorded inside the group
+        extends that range, so an import added in many chunks is undone in one step.
+    group_start : int
+        The number of undo steps when the outermost open group was opened
+        Only the steps recorded after it are merged, so the first chunk of an import starts a new step
+        (instead of extending a point added right before the import).
+
+    Methods
+    -------
+    record(step)
+        Records a new step (and forgets the undone steps, which can't be redone anymore).
+    begin_group(), end_group()
+        Open / close a group of additions which are undone together.
+    can_undo(), can_redo()
+        Return True if there is a step to undo / redo.
+    pop_undo(), pop_redo()
+        Return the step to undo / redo and move it to the other list.
+    clear()
+        Forgets all the steps.
+    """
+
+    MAX_STEPS = 10000
+
+    def __init__(self):
+        self.undo_steps = []
+        self.redo_steps = []
+        self.groups = 0
+        self.group_start = 0
+
+    def record(self, step):
+        self.redo_steps.clear()
+        if self.groups and len(self.undo_steps) > self.group_start and step.kind == ADD:
+            last = self.undo_steps[-1]
+            if last.kind == ADD and last.stop == step.start:
+                self.undo_steps[-1] = last._replace(stop=step.stop, after=step.after)
+                return
+
+        self.undo_steps.append(step)
+        if len(self.undo_steps) > History.MAX_STEPS:
+            del self.undo_steps[0]
+            self.group_start = max(self.group_start - 1, 0)
+
+    def begin_group(self):
+        if self.groups == 0:
+            self.group_start = len(self.undo_steps)
+        self.groups += 1
+
+    def end_group(self):
+        self.groups = max(self.groups - 1, 0)
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def pop_undo(self):
+        step = self.undo_steps.pop()
+        # A step recorded after an undone one mustn't be merged into the step before it
+        self.group_start = min(self.group_start, len(self.undo_steps))
+        self.redo_steps.append(step)
+        return step
+
+    def pop_redo(self):
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        # Nor merged into a redone step
+        self.group_start = max(self.group_start, len(self.undo_steps))
+        return step
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.group_start = 0
@@ -0,0 +1,239 @@
+"""
+Runtime instrumentation of the hot paths
+
+When instrumentation is enabled, the methods listed in TARGETS are replaced by wrappers which
+time every call and record it in a Histogram named after the method: the LinearRegression updates,
+the Plot updates and full figure redraws, the PlotData inserts, and every Tk callback of the main
+loop (button commands, event bindings and after/after_idle calls, named "tk.<function name>").
+When it is disabled, the original methods are put back, so instrumentation costs nothing at all
+(but a flag check per Tk callback, see below).
+
+Tk keeps the callable of a callback from the time it is registered, so patching it later has no
+effect. Importing this module hooks Misc._register instead: every callback registered from then on
+is wrapped in a TkCallback, which times the calls while instrumentation is enabled (and only checks
+a flag otherwise), so the callbacks registered before enable are timed too.
+
+Modules which aren't imported yet (like Plot, which is imported only when the first plot is created)
+are instrumented by the first instrument() call after they are imported.
+
+Example:
+    import Instrumentation
+    Instrumentation.enable()
+    ...
+    print(Instrumentation.format_table())
+    Instrumentation.dump("stats.json")
+"""
+
+import functools
+import json
+import sys
+import time
+import tkinter
+from datetime import datetime
+
+# module name, class name, method names
+TARGETS = [
+    ("LinearRegression", "LinearRegression", ("add_point", "del_point", "add_points", "del_points", "update_coef")),
+    ("LinearRegression", "StableLinearRegression", ("add_point", "del_point", "add_points", "del_points")),
+    ("WindowedRegression", "WindowedLinearRegression", ("add_point", "add_points")),
+    ("WindowedRegression", "ExpWeightedLinearRegression", ("add_point", "add_points")),
+    ("Plot", "Plot", ("add_point", "add_points", "del_point", "update_points_view", "blit_animated")),
+    ("matplotlib.figure", "Figure", ("draw",)),
+    ("PlotData", "PlotData", ("add_points", "update_data_batch", "refresh_points")),
+]
+
+enabled = False
+histograms = {}
+# (class, method name, original method) of every instrumented method
+patched = []
+
+
+class Histogram:
+    """
+    A histogram of the durations of the calls of one function
+
+    The durations are counted in buckets whose limits are powers of two microseconds,
+    so recording a call takes O(1) time and the histogram has a fixed size.
+
+    Attributes
+    ----------
+    BUCKETS : 32
+        The number of buckets (the last one counts every call longer than 2^30 microseconds)
+    count : int
+        The number of recorded calls
+    total : double
+        The total duration of the recorded calls (in seconds)
+    max : double
+        The duration of the longest recorded call (in seconds)
+    buckets : list
+        buckets[0] counts the calls shorter than 1 microsecond,
+        buckets[i] counts the calls between 2^(i-1) and 2^i microseconds.
+
+    Methods
+    -------
+    add(duration)
+        Records a call which took duration seconds.
+    get_percentile(q)
+        Returns an upper bound of the q-th percentile (0 <= q <= 100) of the durations (in seconds).
+    to_dict()
+        Returns the histogram as a dictionary (used by dump).
+    """
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * Histogram.BUCKETS
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.buckets[min(int(duration * 1e6).bit_length(), Histogram.BUCKETS - 1)] += 1
+
+    def get_percentile(self, q):
+        rank = self.count * q / 100
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            seen += bucket
+            if bucket and seen >= rank:
+                return min(2 ** i * 1e-6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.get_percentile(50),
+            "p99": self.get_percentile(99),
+            "max": self.max,
+            "buckets": self.buckets,
+        }
+
+
+def get_histogram(name):
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+    return histogram
+
+
+def timed(name, func):
+    """ Returns a wrapper of func which records the duration of every call in the histogram called name. """
+
+    histogram = get_histogram(name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.add(time.perf_counter() - start_time)
+
+    return wrapper
+
+
+class TkCallback:
+    """
+    A Tk callback which records the duration of its calls while instrumentation is enabled
+
+    Attributes
+    ----------
+    func : callable
+        The callback
+    __name__ : str
+        The name of the callback (used by Misc._register to name the Tcl command)
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__name__ = getattr(func, "__name__", type(func).__name__)
+
+    def __call__(self, *args):
+        if not enabled:
+            return self.func(*args)
+        start_time = time.perf_counter()
+        try:
+            return self.func(*args)
+        finally:
+            get_histogram("tk." + self.__name__).add(time.perf_counter() - start_time)
+
+
+def register_callback(self, func, subst=None, needcleanup=1):
+    """ Replaces Misc._register (and its alias Misc.register), which creates the Tcl command of every Tk callback. """
+
+    return tk_register(self, TkCallback(func), subst, needcleanup)
+
+
+tk_register = tkinter.Misc._register
+tkinter.Misc._register = tkinter.Misc.register = register_callback
+
+
+def instrument():
+    """ Instruments the targets whose modules were imported since the last call (if instrumentation is enabled). """
+
+    if not enabled:
+        return
+
+    done = {(cls, name) for cls, name, original in patched}
+    for module_name, class_name, methods in TARGETS:
+        module = sys.modules.get(module_name)
+        cls = getattr(module, class_name, None)
+        if cls is None:
+            continue
+
+        for name in methods:
+            # Inherited methods are instrumented in the class which defines them
+            original = cls.__dict__.get(name)
+            if original is None or (cls, name) in done:
+                continue
+            setattr(cls, name, timed(f"{class_name}.{name}", original))
+            patched.append((cls, name, original))
+
+
+def enable():
+    global enabled
+    enabled = True
+    instrument()
+
+
+def disable():
+    global enabled
+    enabled = False
+    while patched:
+        cls, name, original = patched.pop()
+        setattr(cls, name, original)
+
+
+def reset():
+    """ Clears all the recorded calls (the histograms used by the wrappers are kept). """
+
+    for name, histogram in histograms.items():
+        histogram.__init__()
+
+
+def snapshot():
+    """ Returns the statistics of every instrumented function which was called, sorted by total time. """
+
+    stats = {name: histogram.to_dict() for name, histogram in histograms.items() if histogram.count}
+    return dict(sorted(stats.items(), key=lambda item: -item[1]["total"]))
+
+
+def format_table():
+    lines = [f"{'function':<36}{'calls':>9}{'total ms':>10}{'mean us':>10}{'p99 us':>10}{'max ms':>9}"]
+    for name, stats in snapshot().items():
+        lines.append(f"{name:<36}{stats['count']:>9}{stats['total'] * 1e3:>10.1f}{stats['mean'] * 1e6:>10.1f}"
+                     f"{stats['p99'] * 1e6:>10.0f}{stats['max'] * 1e3:>9.2f}")
+    return "\n".join(lines)
+
+
+def dump(path):
+    """ Writes the statistics (durations in seconds) to a JSON file. """
+
+    with open(path, "w") as f:
+        json.dump({"date": datetime.now().isoformat(timespec="seconds"), "stats": snapshot()}, f, indent=2)
@@ -1,3 +1,74 @@
+import functools
+import math
+from collections import namedtuple
+import numpy as np
+
+# The goodness of fit of a model: the coefficient of determination, the residual standard error
+# and the standard errors of the alpha and beta coefficients
+FitStats = namedtuple("FitStats", ["r2", "rse", "se_alpha", "se_beta"])
+
+# The 0.975 quantile of the standard normal distribution (used for 95% confidence bands)
+Z_95 = 1.959963984540054
+
+# The number of degrees of freedom from which t_quantile uses the Cornish-Fisher expansion
+EXACT_T_DF = 30
+
+# The relative rounding error of a float64
+EPS = float(np.finfo(np.float64).eps)
+
+
+def t_interval_probability(t, df):
+    """ Returns P(|T| <= t) for Student's t distribution with an integer number df of degrees of freedom.
+
+    It sums the finite series of the distribution function (Abramowitz and Stegun, 26.7.3 and 26.7.4).
+    """
+
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if df % 2:
+        if df == 1:
+            return 2 * theta / math.pi
+        for j in range(1, (df - 1) // 2):
+            term *= 2 * j / (2 * j + 1) * c2
+            total += term
+        return 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+
+    for j in range(1, df // 2):
+        term *= (2 * j - 1) / (2 * j) * c2
+        total += term
+    return math.sin(theta) * total
+
+
+@functools.lru_cache(maxsize=256)
+def t_quantile(df, z=Z_95):
+    """ Returns the quantile of Student's t distribution with df degrees of freedom matching the normal quantile z.
+
+    Below EXACT_T_DF degrees of freedom, the distribution function is inverted by bisection (to full precision).
+    Above, the Cornish-Fisher expansion is accurate to 4 decimals (for the usual confidence levels),
+    so no statistics library is needed.
+    The results are cached, since a model asks for the same few quantiles every time its band is drawn.
+    """
+
+    if df < EXACT_T_DF:
+        # The quantile of the t distribution with 1 degree of freedom (the Cauchy distribution) is the largest one
+        p = math.erf(abs(z) / math.sqrt(2))
+        low, high = 0.0, math.tan(math.pi * p / 2)
+        mid = high / 2
+        # Stop when the interval can't be halved anymore
+        while low < mid < high:
+            if t_interval_probability(mid, int(df)) < p:
+                low = mid
+            else:
+                high = mid
+            mid = (low + high) / 2
+        return math.copysign(high, z)
+
+    z3, z5, z7 = z ** 3, z ** 5, z ** 7
+    return (z + (z3 + z) / (4 * df) + (5 * z5 + 16 * z3 + 3 * z) / (96 * df ** 2)
+            + (3 * z7 + 19 * z5 + 17 * z3 - 15 * z) / (384 * df ** 3))
+
+
 class LinearRegression:
     """
 
@@ -24,6 +95,8 @@ class LinearRegression:
         Sum of x * y for all the points in the dataset
     sx2 (default = 0) : double
         Sum of x squared for all points in the dataset
+    sy2 (default = 0) : double
+        Sum of y squared for all points in the dataset (used only by the goodness of fit statistics)
 
     # Note: I used sx, sy, sxy and sx2 attributes in order to minimize the number of calculations
     required to compute alpha and beta when a new point is added to the dataset.
@@ -31,15 +104,37 @@ class LinearRegression:
     Methods
     -------
     update_coef()
-        Updates the alpha and beta attributes.
+        Updates the alpha and beta attributes (None if all the points have the same x, so the line is vertical).
     get_alpha()
         Returns the alpha attribute.
     get_beta()
         Returns the beta attribute.
+    refresh_coef()
+        Updates alpha and beta if there are at least 2 points, otherwise sets them to None.
     add_point(x, y)
         Adds a new point to the dataset.
     del_point(x, y)
         Deletes a (hopefully existing) point from the dataset.
+    add_points(xs, ys)
+        Adds a batch of points to the dataset.
+    del_points(xs, ys)
+        Deletes a batch of (hopefully existing) points from the dataset.
+    merge(other)
+        Adds all the points of another LinearRegression object to this dataset.
+    get_moments()
+        Returns the number of points, the means and the centered co-moments of the dataset.
+    get_cyy()
+        Returns the sum of (y - mean of y) squared for all the points in the dataset.
+    get_fit_stats()
+        Returns the goodness of fit (a FitStats tuple) in O(1), or None if it is undefined.
+    get_band(xs, z)
+        Returns the lower and upper edges of the confidence band of the line at the given x coordinates.
+    get_state()
+        Returns the numbers which describe the dataset (used to save and restore a fit without refitting).
+    set_state(state)
+        Restores the numbers returned by get_state and updates alpha and beta.
+    reset()
+        Deletes all the points from the dataset.
 
     """
 
@@ -52,16 +147,30 @@ class LinearRegression:
         self.sy = 0
         self.sxy = 0
         self.sx2 = 0
+        self.sy2 = 0
 
     def update_coef(self):
         num = self.sxy - self.sx * self.sy / self.n
         den = self.sx2 - self.sx * self.sx / self.n
+        # den is the centered spread n * var(x); if all the x coordinates are equal, it is 0 up to the rounding
+        # error of sx2 (a few ulps of it), while any real spread (even with a large offset of x) is larger
+        if den <= 4 * EPS * self.sx2:
+            self.alpha = None
+            self.beta = None
+            return
         self.beta = num / den
 
         xmed = self.sx / self.n
         ymed = self.sy / self.n
         self.alpha = ymed - self.beta * xmed
 
+    def refresh_coef(self):
+        if self.n > 1:
+            self.update_coef()
+        else:
+            self.alpha = None
+            self.beta = None
+
     def get_alpha(self):
         return self.alpha
 
@@ -83,9 +192,9 @@ class LinearRegression:
         self.sy += y
         self.sxy += x * y
         self.sx2 += x * x
+        self.sy2 += y * y
 
-        if self.n > 1:
-            self.update_coef()
+        self.refresh_coef()
 
     def del_point(self, x, y):
         """ Deletes a (hopefully existing) point from the dataset.
@@ -108,8 +217,344 @@ class LinearRegression:
         self.sy -= y
         self.sxy -= x * y
         self.sx2 -= x * x
+        self.sy2 -= y * y
+
+        self.refresh_coef()
+        return True
+
+    @staticmethod
+    def as_columns(xs, ys):
+        """ Converts two sequences of coordinates into flat float64 NumPy arrays.
+
+        Any NumPy array, buffer-protocol object (array.array, memoryview, etc.)
+        or plain sequence of numbers is accepted. No copy is made if the input
+        already is a contiguous float64 array.
+        """
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        ys = np.asarray(ys, dtype=np.float64).ravel()
+        if xs.shape != ys.shape:
+            raise ValueError(f"xs and ys must have the same length ({xs.size} != {ys.size})")
+        return xs, ys
+
+    def add_points(self, xs, ys):
+        """ Adds a batch of points to the dataset.
+
+        The sums are updated with a few vectorized reductions and the coefficients
+        are recomputed only once, so this gives the same result as calling add_point
+        for every point, without the per-point interpreter overhead.
+
+        Parameters
+        ----------
+        xs : array_like
+            The x coordinates of the new points
+        ys : array_like
+            The y coordinates of the new points
+        """
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size == 0:
+            return
+
+        self.n += xs.size
+        self.sx += float(xs.sum())
+        self.sy += float(ys.sum())
+        self.sxy += float(np.dot(xs, ys))
+        self.sx2 += float(np.dot(xs, xs))
+        self.sy2 += float(np.dot(ys, ys))
+
+        self.refresh_coef()
+
+    def del_points(self, xs, ys):
+        """ Deletes a batch of (hopefully existing) points from the dataset.
+
+        It is assumed that all the points already are in the dataset before this function is called.
+        The coefficients are recomputed only once, after all the points were deleted.
+
+        Parameters
+        ----------
+        xs : array_like
+            The x coordinates of the points to be deleted
+        ys : array_like
+            The y coordinates of the points to be deleted
+        """
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size > self.n:
+            return False
+        if xs.size == 0:
+            return True
+
+        self.n -= xs.size
+        self.sx -= float(xs.sum())
+        self.sy -= float(ys.sum())
+        self.sxy -= float(np.dot(xs, ys))
+        self.sx2 -= float(np.dot(xs, xs))
+        self.sy2 -= float(np.dot(ys, ys))
+
+        self.refresh_coef()
         return True
 
+    def merge(self, other):
+        """ Adds all the points of another LinearRegression object to this dataset.
+
+        The two datasets are combined from their centered moments with Chan's formula (through
+        StableLinearRegression.merge), instead of adding up their raw sums, so merging partial fits
+        (for example fits of different shards of the same file) doesn't add the cancellation errors of the sums.
+
+        Parameters
+        ----------
+        other : LinearRegression
+            The partial fit to be merged into this one
+        """
+
+        stable = StableLinearRegression()
+        stable.set_state(self.get_moments() + (self.get_cyy(),))
+        stable.merge(other)
+        n, mx, my, cxx, cxy, cyy = stable.get_state()
+        # The sums are set by this class, since the subclasses may refuse states (like the robust models)
+        LinearRegression.set_state(self, (n, n * mx, n * my, cxy + n * mx * my, cxx + n * mx * mx, cyy + n * my * my))
+        return self
+
+    def get_moments(self):
+        """ Returns (n, mean of x, mean of y, sum of (x - mean_x)^2, sum of (x - mean_x) * (y - mean_y)). """
+
+        if self.n == 0:
+            return 0, 0.0, 0.0, 0.0, 0.0
+        mx = self.sx / self.n
+        my = self.sy / self.n
+        return self.n, mx, my, self.sx2 - self.sx * mx, self.sxy - self.sx * my
+
+    def get_cyy(self):
+        if self.n == 0:
+            return 0.0
+        return self.sy2 - self.sy * self.sy / self.n
+
+    def get_fit_stats(self):
+        """ Returns the goodness of fit (a FitStats tuple), or None if there are less than 3 points (or no line).
+
+        All the statistics are computed from the sums (or moments) of the dataset, so this takes O(1):
+        the residual sum of squares of the OLS line is cyy - cxy^2 / cxx.
+        """
+
+        n, mx, my, cxx, cxy = self.get_moments()
+        if n < 3 or cxx <= 0 or self.get_alpha() is None:
+            return None
+
+        cyy = self.get_cyy()
+        sse = max(cyy - cxy * cxy / cxx, 0.0)
+        r2 = 1 - sse / cyy if cyy > 0 else 1.0
+        rse = math.sqrt(sse / (n - 2))
+        return FitStats(r2, rse, rse * math.sqrt(1 / n + mx * mx / cxx), rse / math.sqrt(cxx))
+
+    def get_band(self, xs, z=Z_95):
+        """ Returns the lower and upper edges of the confidence band of the line at the given x coordinates.
+
+        The band contains the true line with the confidence level of the normal quantile z (95% by default).
+        Returns None if the goodness of fit is undefined.
+        """
+
+        stats = self.get_fit_stats()
+        if stats is None or self.get_alpha() is None:
+            return None
+
+        n, mx, my, cxx, cxy = self.get_moments()
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = self.get_alpha() + self.get_beta() * xs
+        half = t_quantile(n - 2, z) * stats.rse * np.sqrt(1 / n + (xs - mx) ** 2 / cxx)
+        return ys - half, ys + half
+
+    def get_state(self):
+        return self.n, self.sx, self.sy, self.sxy, self.sx2, self.sy2
+
+    def set_state(self, state):
+        n, sx, sy, sxy, sx2, sy2 = state
+        self.n = int(n)
+        self.sx, self.sy, self.sxy, self.sx2, self.sy2 = sx, sy, sxy, sx2, sy2
+        self.refresh_coef()
+
+    def reset(self):
+        self.set_state((0, 0, 0, 0, 0, 0))
+
+
+class StableLinearRegression(LinearRegression):
+    """
+    A numerically stable version of the LinearRegression model
+
+    The raw sums used by LinearRegression suffer from catastrophic cancellation when
+    the x coordinates carry a large offset (epoch timestamps, for example), because
+    sx2 - sx * sx / n subtracts two huge, almost equal numbers.
+    This class stores the means and the centered co-moments instead, which are updated
+    with Welford's method when a point is added or deleted (still O(1) per point).
+    For reference: https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance
+
+    Attributes
+    ----------
+    alpha, beta, n :
+        The same as in LinearRegression
+    mx (default = 0) : double
+        The mean of the x coordinates
+    my (default = 0) : double
+        The mean of the y coordinates
+    cxx (default = 0) : double
+        Sum of (x - mx) squared for all the points in the dataset
+    cxy (default = 0) : double
+        Sum of (x - mx) * (y - my) for all the points in the dataset
+    cyy (default = 0) : double
+        Sum of (y - my) squared for all the points in the dataset
+    sx, sy, sxy, sx2, sy2 :
+        Read-only properties which compute the raw sums used by LinearRegression
+
+    Methods
+    -------
+    The same as in LinearRegression, plus:
+    set_moments(n, mx, my, cxx, cxy, cyy)
+        Overwrites the stored moments and updates alpha and beta.
+    get_batch_moments(xs, ys)
+        A static method which returns the moments (n, mx, my, cxx, cxy, cyy) of a batch of points.
+    combine(nb, mxb, myb, cxxb, cxyb, cyyb, sign)
+        Adds (sign = 1) or removes (sign = -1) a batch described by its moments.
+        Batches and merged fits are combined with the pairwise formulas of Chan et al.
+    """
+
+    def __init__(self):
+        self.alpha = None
+        self.beta = None
+        self.n = 0
+
+        self.mx = 0.0
+        self.my = 0.0
+        self.cxx = 0.0
+        self.cxy = 0.0
+        self.cyy = 0.0
+
+    @property
+    def sx(self):
+        return self.n * self.mx
+
+    @property
+    def sy(self):
+        return self.n * self.my
+
+    @property
+    def sxy(self):
+        return self.cxy + self.n * self.mx * self.my
+
+    @property
+    def sx2(self):
+        return self.cxx + self.n * self.mx * self.mx
+
+    @property
+    def sy2(self):
+        return self.cyy + self.n * self.my * self.my
+
+    def update_coef(self):
+        # If all the x coordinates are equal, cxx is made only of the rounding error of mx (a few ulps of it)
+        if self.cxx <= self.n * (4 * EPS * self.mx) ** 2:
+            self.alpha = None
+            self.beta = None
+            return
+        self.beta = self.cxy / self.cxx
+        self.alpha = self.my - self.beta * self.mx
+
+    def get_moments(self):
+        return self.n, self.mx, self.my, self.cxx, self.cxy
+
+    def get_cyy(self):
+        return self.cyy
+
+    def get_state(self):
+        return self.get_moments() + (self.cyy,)
+
+    def set_state(self, state):
+        n, mx, my, cxx, cxy, cyy = state
+        self.set_moments(int(n), mx, my, cxx, cxy, cyy)
+
+    def set_moments(self, n, mx, my, cxx, cxy, cyy):
+        if n == 0:
+            mx = my = cxx = cxy = cyy = 0.0
+        self.n, self.mx, self.my, self.cxx, self.cxy, self.cyy = n, mx, my, cxx, cxy, cyy
+        self.refresh_coef()
+
+    def add_point(self, x, y):
+        self.n += 1
+        dx = x - self.mx
+        dy = y - self.my
+        self.mx += dx / self.n
+        self.my += dy / self.n
+        self.cxx += dx * (x - self.mx)
+        self.cxy += dx * (y - self.my)
+        self.cyy += dy * (y - self.my)
+
+        self.refresh_coef()
+
+    def del_point(self, x, y):
+        if self.n == 0:
+            return False
+        if self.n == 1:
+            self.set_moments(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+            return True
+
+        # This is add_point run backwards
+        dx = x - self.mx
+        dy = y - self.my
+        self.n -= 1
+        self.mx -= dx / self.n
+        self.my -= dy / self.n
+        self.cxx -= (x - self.mx) * dx
+        self.cxy -= (x - self.mx) * dy
+        self.cyy -= (y - self.my) * dy
+
+        self.refresh_coef()
+        return True
+
+    @staticmethod
+    def get_batch_moments(xs, ys):
+        mx = float(xs.mean())
+        my = float(ys.mean())
+        dx = xs - mx
+        dy = ys - my
+        return xs.size, mx, my, float(np.dot(dx, dx)), float(np.dot(dx, dy)), float(np.dot(dy, dy))
+
+    def combine(self, nb, mxb, myb, cxxb, cxyb, cyyb, sign=1):
+        """ Adds (sign = 1) or removes (sign = -1) a batch described by its moments. """
+
+        na, mxa, mya, cxxa, cxya, cyya = self.get_moments() + (self.cyy,)
+        if sign > 0:
+            n = na + nb
+            dx = mxb - mxa
+            dy = myb - mya
+            f = na * nb / n
+            self.set_moments(n, mxa + dx * nb / n, mya + dy * nb / n,
+                             cxxa + cxxb + dx * dx * f, cxya + cxyb + dx * dy * f, cyya + cyyb + dy * dy * f)
+        else:
+            n = na - nb
+            if n <= 0:
+                self.set_moments(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+                return
+            mx = (na * mxa - nb * mxb) / n
+            my = (na * mya - nb * myb) / n
+            dx = mxb - mx
+            dy = myb - my
+            f = n * nb / na
+            self.set_moments(n, mx, my, cxxa - cxxb - dx * dx * f, cxya - cxyb - dx * dy * f,
+                             cyya - cyyb - dy * dy * f)
+
+    def add_points(self, xs, ys):
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size > 0:
+            self.combine(*self.get_batch_moments(xs, ys))
+
+    def del_points(self, xs, ys):
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size > self.n:
+            return False
+        if xs.size > 0:
+            self.combine(*self.get_batch_moments(xs, ys), sign=-1)
+        return True
+
+    def merge(self, other):
+        if other.n > 0:
+            self.combine(*other.get_moments(), other.get_cyy())
+        return self
+
 
 if __name__ == "__main__":
     lin_reg = LinearRegression()
@@ -4,9 +4,20 @@ from tkinter import Entry
 from tkinter import Label
 from tkinter import Checkbutton
 from tkinter import BooleanVar
-import matplotlib.pyplot as plt
-from Plot import Plot
+from tkinter import StringVar
+from tkinter import OptionMenu
+from tkinter import filedialog
+from tkinter import simpledialog
+import os
+import time
+from functools import partial
 from PlotData import PlotData
+from StatsPanel import StatsPanel
+from WorkerPool import WorkerPool
+import Instrumentation
+
+# matplotlib and numpy take much longer to import than Tk needs to show the window, so the modules
+# which use them (Plot, PointStore, DataImport and Session) are imported only when they are first needed
 
 
 class MainApplication(tk.Frame):
@@ -23,14 +34,41 @@ class MainApplication(tk.Frame):
         The height value that is used for all the buttons inside this class
     BTN_WIDTH : 90
         The width value that is used for all the buttons inside this class
+    ESTIMATORS : tuple
+        The names of the estimators which can fit the points: "OLS" (ordinary least squares),
+        "Theil-Sen" and "RANSAC" (robust estimators, which aren't thrown off by outliers)
+    STREAM_ADDRESS : "tcp://127.0.0.1:5555"
+        The default address of a live stream
+    STREAM_POLL_MS : 30
+        The time (in milliseconds) between two updates of the plot with the points of the stream
+    STREAM_CHUNK_POINTS : 8192
+        The maximum number of points of the stream added to the plot at once
+    STREAM_UPDATE_SECONDS : 0.02
+        The time (in seconds) after which an update stops adding chunks of points of the stream, so the GUI
+        stays responsive whatever a point costs. If the stream sends more points than the updates can add,
+        they wait in its queue until it is full, which slows the producers down.
     parent :
         The parent window (or widget)
     plot : Plot
         The plot managed by this class
     plot_data : PlotData
         The widget that displays data related to the plot
+    workers : WorkerPool
+        The pool which runs the heavy jobs (imports and fits) off the Tk thread
+    pending_changes : list
+        The plot changes which weren't applied to plot_data yet
+    flush_id :
+        The id of the scheduled flush_plot_changes call, or None if no call is scheduled
     new_plot_btn : Button
         The "New plot" button that creates the plot managed by this class
+    save_session_btn : Button
+        The "Save session" button, which saves the points, the fit and the axes limits of the plot to a file
+    load_session_btn : Button
+        The "Load session" button, which opens a new plot from a saved session file
+    stats_btn : Button
+        The "Stats" button, which opens the runtime statistics panel
+    stats_panel : StatsPanel
+        The runtime statistics panel (None if it was never opened)
     x_label : Label
         A lebel which contains the text "X: "
     x_entry : Entry
@@ -47,8 +85,35 @@ class MainApplication(tk.Frame):
         which lets you add points on the plot by clicking inside the coordinate system only if it is activated
     check_state : BooleanVar
         Stores the state of add_multiple_points_check check button.
-    update_line_btn : Button
-        The "Update line" button, which stretches the best fitting line to match the plot's coordinate system size
+    estimator_label : Label
+        A label which contains the text "Estimator: "
+    estimator_menu : OptionMenu
+        The menu used to pick the estimator which fits the points of the plot
+    estimator : StringVar
+        Stores the name of the picked estimator (one of ESTIMATORS).
+    import_btn : Button
+        The "Import file" button, which imports the points of a CSV, TSV, .npy, .npz or .f64 file into the plot
+        A .npy or .f64 file of at least MappedDataset.OUT_OF_CORE_BYTES is opened as an out-of-core dataset instead.
+    progress_label : Label
+        A label which displays the progress of the current import or fit
+    cancel_btn : Button
+        The "Cancel" button, which cancels the current import and fit
+    import_job : Job
+        The job which reads the imported file or scans the opened dataset (None if there is no such job)
+    fit_job : Job
+        The job which fits the points with the picked estimator (None if there is no fit in progress)
+    fit_stale : bool
+        True if the points of the plot changed while fit_job was running
+    stream_btn : Button
+        The "Stream" button, which starts (or stops) adding the points of a live stream to the plot
+    stream : StreamSource
+        The live stream whose points are added to the plot (None if there is no stream)
+    stream_id :
+        The id of the scheduled poll_stream call (None if there is no stream)
+    undo_btn : Button
+        The "Undo" button, which undoes the last addition or deletion of points (also Ctrl+Z)
+    redo_btn : Button
+        The "Redo" button, which redoes the last undone step (also Ctrl+Y or Ctrl+Shift+Z)
 
     Methods
     -------
@@ -56,9 +121,17 @@ class MainApplication(tk.Frame):
         Returns a PlotData widget which will store the points inside the plot
         and the alpha and beta coefficients of the best fitting line.
     reset_plot_data()
-        Resets the data inside the plot_data widget (alpha=None, beta=None, all points are deleted).
+        Resets the data inside the plot_data widget (alpha=None, beta=None)
+        and makes it display the points of the current plot.
     create_new_plot()
-        Assigns a new Plot instance to the plot attribute.
+        Assigns a new Plot instance to the plot attribute and subscribes to its changes.
+    on_plot_change(change, *args)
+        A callback which is notified about every change of the plot
+        It queues the change and schedules a single flush_plot_changes call for when Tk is idle.
+    flush_plot_changes()
+        Applies all the queued plot changes to plot_data in one batch.
+    is_plot_open()
+        Returns True if there is a plot and its window wasn't closed.
     remove_closed_plot()
         Disconnects the on_click callback from the plot and assigns "None" to the plot attribute.
     new_plot_clb()
@@ -67,6 +140,20 @@ class MainApplication(tk.Frame):
         and resets the data inside plot_data widget.
     create_new_plot_btn()
         Returns a new new_plot_btn ("New plot") button.
+    save_session_clb()
+        A callback assigned to the save_session_btn ("Save session") button.
+    create_save_session_btn()
+        Returns a new save_session_btn ("Save session") button.
+    load_session_clb()
+        A callback assigned to the load_session_btn ("Load session") button
+        The points of the session are memory-mapped and the fit is restored without refitting.
+    create_load_session_btn()
+        Returns a new load_session_btn ("Load session") button.
+    stats_clb()
+        A callback assigned to the stats_btn ("Stats") button
+        It opens the runtime statistics panel, or brings it to the front if it is already open.
+    create_stats_btn()
+        Returns a new stats_btn ("Stats") button.
     create_x_label()
         Returns the "X: " label.
     create_x_entry()
@@ -89,17 +176,73 @@ class MainApplication(tk.Frame):
         It updates check_state everytime the check button changes its state.
     create_add_multiple_points_check()
         Returns a new add_multiple_points_check ("Add multiple points") check button.
-    update_line_clb()
-        A callback assigned to the update_line_btn ("Update line") button.
-        It stretches the best fitting line to match the plot's coordinate system size.
-    create_update_line_btn()
-        Returns a new update_line_btn ("Update line") button.
+    create_lin_reg()
+        Returns a new (empty) model of the picked estimator.
+    get_estimator_name(lin_reg)
+        A static method which returns the name of the estimator of a model (one of ESTIMATORS).
+    estimator_clb(name)
+        A callback assigned to the estimator_menu
+        It starts fitting the points of the current plot with the picked estimator.
+    start_fit(lin_reg)
+        Fits the points of the current plot with the given model in the background.
+    on_fit_done(plot, lin_reg)
+        Makes the plot use the fitted model, or fits it again if the points changed in the meantime.
+    cancel_fit()
+        Stops the fit in progress, if there is one.
+    create_estimator_menu()
+        Returns the "Estimator: " label, the estimator_menu and the estimator variable.
+    import_clb()
+        A callback assigned to the import_btn ("Import file") button.
+        It asks for a points file and starts reading it in the background.
+    on_import_progress(progress, chunk)
+        Adds the next chunk of the imported file to the plot.
+        The file is parsed on a worker thread and Tk handles the pending events between two chunks,
+        so the GUI stays responsive during the import.
+    on_import_done(count), on_import_error(error)
+        Callbacks called when the whole file was read or when reading it failed.
+    open_dataset(path)
+        Opens a new plot of an out-of-core dataset: its file is scanned in the background (fitted in one pass
+        and binned in another) and the plot shows the result.
+    on_dataset_progress(progress, phase), on_dataset_scanned(dataset, result)
+        Callbacks called after every percent of a pass over the dataset and when the dataset was scanned.
+    cancel_import()
+        Stops the import in progress, if there is one.
+    create_import_btn()
+        Returns a new import_btn ("Import file") button.
+    create_progress_label()
+        Returns the label which displays the progress of the current import or fit.
+    cancel_clb()
+        A callback assigned to the cancel_btn ("Cancel") button.
+    create_cancel_btn()
+        Returns a new cancel_btn ("Cancel") button.
+    stream_clb()
+        A callback assigned to the stream_btn ("Stream") button
+        It asks for the address of a stream and starts reading it, or stops the current stream.
+    poll_stream()
+        Adds all the points received from the stream since the last call to the plot in one update.
+    stop_stream()
+        Stops the current stream, if there is one.
+    create_stream_btn()
+        Returns a new stream_btn ("Stream") button.
+    begin_history_group(), end_history_group()
+        Make all the points added in between (by an import or a stream) a single step of the plot's history.
+    undo_clb(event), redo_clb(event)
+        Callbacks assigned to the undo_btn ("Undo") and redo_btn ("Redo") buttons and to their shortcuts.
+    create_undo_btn(), create_redo_btn()
+        Return the new undo_btn ("Undo") and redo_btn ("Redo") buttons.
+    destroy()
+        Cancels the background jobs, stops the stream and destroys the widget.
     is_number(s)
         Returns True if the "s" string is a float number, False otherwise.
     """
 
     BTN_HEIGHT = 30
     BTN_WIDTH = 90
+    ESTIMATORS = ("OLS", "Theil-Sen", "RANSAC")
+    STREAM_ADDRESS = "tcp://127.0.0.1:5555"
+    STREAM_POLL_MS = 30
+    STREAM_CHUNK_POINTS = 8192
+    STREAM_UPDATE_SECONDS = 0.02
 
     def __init__(self, parent, **args):
         """
@@ -116,8 +259,16 @@ class MainApplication(tk.Frame):
 
         self.plot = None
         self.plot_data = self.create_plot_data()
+        self.workers = WorkerPool(self)
+
+        self.pending_changes = []
+        self.flush_id = None
 
         self.new_plot_btn = self.create_new_plot_btn()
+        self.save_session_btn = self.create_save_session_btn()
+        self.load_session_btn = self.create_load_session_btn()
+        self.stats_btn = self.create_stats_btn()
+        self.stats_panel = None
 
         self.x_label = self.create_x_label()
         self.x_entry = self.create_x_entry()
@@ -126,7 +277,24 @@ class MainApplication(tk.Frame):
 
         self.add_point_btn = self.create_add_point_btn()
         self.add_multiple_points_check, self.check_state = self.create_add_multiple_points_check()
-        self.update_line_btn = self.create_update_line_btn()
+        self.estimator_label, self.estimator_menu, self.estimator = self.create_estimator_menu()
+
+        self.import_btn = self.create_import_btn()
+        self.progress_label = self.create_progress_label()
+        self.cancel_btn = self.create_cancel_btn()
+        self.import_job = None
+        self.fit_job = None
+        self.fit_stale = False
+
+        self.stream_btn = self.create_stream_btn()
+        self.stream = None
+        self.stream_id = None
+
+        self.undo_btn = self.create_undo_btn()
+        self.redo_btn = self.create_redo_btn()
+        self.bind_all("<Control-z>", self.undo_clb)
+        self.bind_all("<Control-y>", self.redo_clb)
+        self.bind_all("<Control-Z>", self.redo_clb)
 
     def create_plot_data(self):
         plot_data = PlotData(self, height=PlotData.HEIGHT, width=PlotData.WIDTH, bg="white")
@@ -135,18 +303,73 @@ class MainApplication(tk.Frame):
         return plot_data
 
     def reset_plot_data(self):
-        self.plot_data.reset()
+        self.pending_changes = []
+        self.plot_data.reset(self.plot.get_rows() if self.plot is not None else None)
 
     def create_new_plot(self):
-        self.plot = Plot(self)
+        from Plot import Plot
+
+        if self.plot is not None:
+            self.plot.unsubscribe(self.on_plot_change)
+            # The old figure may stay open, but its undo history isn't reachable from the buttons anymore
+            self.plot.fig.canvas.mpl_disconnect(self.plot.key_cid)
+        self.plot = Plot(self, lin_reg=self.create_lin_reg(), workers=self.workers)
+        # Plot is imported only now, so it can't be instrumented earlier
+        Instrumentation.instrument()
         self.plot.update_check_state(self.check_state.get())
+        self.plot.subscribe(self.on_plot_change)
+
+    def on_plot_change(self, change, *args):
+        from Plot import Plot
+
+        if self.fit_job is not None and change != Plot.COEF_CHANGED:
+            self.fit_stale = True
+        self.pending_changes.append((change, args))
+        if self.flush_id is None:
+            self.flush_id = self.after_idle(self.flush_plot_changes)
+
+    def flush_plot_changes(self):
+        from Plot import Plot
+
+        self.flush_id = None
+        changes, self.pending_changes = self.pending_changes, []
+
+        # plot_data shares the points store with the plot, so it only has to be refreshed once
+        refresh = False
+        coef = None
+        for change, args in changes:
+            if change == Plot.POINTS_RESET:
+                # The plot might have a new points store (or show a dataset, whose rows are read on demand)
+                self.plot_data.reset(self.plot.get_rows())
+                refresh = True
+            elif change in (Plot.POINTS_ADDED, Plot.POINTS_REMOVED):
+                refresh = True
+            elif change == Plot.COEF_CHANGED:
+                # Only the last coefficients matter
+                coef = args
+
+        if refresh:
+            self.plot_data.refresh_points()
+        if coef is not None:
+            # The statistics are kept up to date by the model, so reading them costs O(1)
+            self.plot_data.set_coefs(coef[0], coef[1], self.plot.lin_reg.get_fit_stats())
+
+    def is_plot_open(self):
+        if self.plot is None:
+            return False
+
+        import matplotlib.pyplot as plt
+        return plt.fignum_exists(self.plot.fig.number)
 
     def remove_closed_plot(self):
-        if self.plot is not None and not plt.fignum_exists(self.plot.fig.number):
+        if self.plot is not None and not self.is_plot_open():
             self.plot.disconnect_on_click_clb()
             self.plot = None
 
     def new_plot_clb(self):
+        self.cancel_import()
+        self.cancel_fit()
+        self.stop_stream()
         self.remove_closed_plot()
         self.create_new_plot()
         self.reset_plot_data()
@@ -156,6 +379,70 @@ class MainApplication(tk.Frame):
         new_plot_btn.place(x=10, y=10, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
         return new_plot_btn
 
+    def save_session_clb(self):
+        self.remove_closed_plot()
+        if self.plot is None:
+            print("There is no plot to save")
+            return
+        if self.plot.dataset is not None:
+            print(f"The plot shows the dataset {self.plot.dataset.path}, import it again to reopen it")
+            return
+
+        import Session
+
+        path = filedialog.asksaveasfilename(title="Save session", defaultextension=".lrs",
+                                            filetypes=Session.FILE_TYPES)
+        if not path:
+            return
+
+        points = self.plot.points
+        try:
+            Session.save_session(path, points.xs, points.ys, self.plot.lin_reg,
+                                 self.plot.ax.get_xlim(), self.plot.ax.get_ylim())
+        except (OSError, ValueError) as e:
+            print(f"Could not save the session: {e}")
+
+    def create_save_session_btn(self):
+        save_session_btn = Button(self, text="Save session", command=self.save_session_clb, padx=5)
+        save_session_btn.place(x=110, y=10, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return save_session_btn
+
+    def load_session_clb(self):
+        import Session
+        from PointStore import PointStore
+
+        path = filedialog.askopenfilename(title="Load session", filetypes=Session.FILE_TYPES)
+        if not path:
+            return
+
+        try:
+            session = Session.load_session(path)
+        except (OSError, ValueError) as e:
+            print(f"Could not load the session: {e}")
+            return
+
+        # Show the estimator of the session, so a later fit (or a new plot) uses it too
+        self.estimator.set(MainApplication.get_estimator_name(session.lin_reg))
+        self.new_plot_clb()
+        self.plot.restore(PointStore.from_arrays(session.xs, session.ys), session.lin_reg,
+                          session.xlim, session.ylim)
+
+    def create_load_session_btn(self):
+        load_session_btn = Button(self, text="Load session", command=self.load_session_clb, padx=5)
+        load_session_btn.place(x=210, y=10, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return load_session_btn
+
+    def stats_clb(self):
+        if self.stats_panel is not None and self.stats_panel.winfo_exists():
+            self.stats_panel.lift()
+        else:
+            self.stats_panel = StatsPanel(self)
+
+    def create_stats_btn(self):
+        stats_btn = Button(self, text="Stats", command=self.stats_clb, padx=5)
+        stats_btn.place(x=310, y=10, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return stats_btn
+
     def create_x_label(self):
         x_label = Label(self, text="X: ", bg="white")
         x_label.place(x=110, y=50, height=MainApplication.BTN_HEIGHT)
@@ -187,11 +474,11 @@ class MainApplication(tk.Frame):
         else:
             x = float(strx)
             y = float(stry)
+            if self.plot.dataset is not None:
+                print("The points of a dataset can't be changed")
+                return
             self.plot.add_point(x, y)
 
-            plot_lin_reg = self.plot.lin_reg
-            self.plot_data.update_data(x, y, plot_lin_reg.get_alpha(), plot_lin_reg.get_beta())
-
     def create_add_point_btn(self):
         add_point_btn = Button(self, text="Add point", command=self.add_point_clb, padx=5)
         add_point_btn.place(x=10, y=50, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
@@ -207,14 +494,299 @@ class MainApplication(tk.Frame):
         add_multiple_points_check.place(x=10, y=90)
         return add_multiple_points_check, check_state
 
-    def update_line_clb(self):
-        if self.plot is not None:
-            self.plot.update_best_fitting_line()
+    def create_lin_reg(self):
+        name = self.estimator.get()
+        if name == "Theil-Sen":
+            from RobustRegression import TheilSenRegression
+            return TheilSenRegression()
+        if name == "RANSAC":
+            from RobustRegression import RansacRegression
+            return RansacRegression()
+
+        from LinearRegression import LinearRegression
+        return LinearRegression()
+
+    @staticmethod
+    def get_estimator_name(lin_reg):
+        from RobustRegression import TheilSenRegression, RansacRegression
+
+        if isinstance(lin_reg, TheilSenRegression):
+            return "Theil-Sen"
+        if isinstance(lin_reg, RansacRegression):
+            return "RANSAC"
+        return "OLS"
+
+    def estimator_clb(self, name):
+        if not self.is_plot_open():
+            return
+
+        lin_reg = self.create_lin_reg()
+        if not self.plot.can_set_lin_reg(lin_reg):
+            print("The estimator of this plot can't be changed")
+            return
+        self.start_fit(lin_reg)
+
+    def start_fit(self, lin_reg):
+        from WorkerPool import fit_model, fit_dataset
+
+        self.cancel_fit()
+        self.fit_stale = False
+        if self.plot.dataset is not None:
+            self.fit_job = self.workers.submit(fit_dataset, lin_reg, self.plot.dataset,
+                                               on_done=partial(self.on_fit_done, self.plot))
+        else:
+            # The job reads the points of the plot without copying them: new points are only appended after them,
+            # and any change of the points makes the result stale (see on_plot_change)
+            points = self.plot.points
+            self.fit_job = self.workers.submit(fit_model, lin_reg, points.xs, points.ys,
+                                               on_done=partial(self.on_fit_done, self.plot))
+        self.progress_label["text"] = f"Fitting {self.plot.get_points_count()} points with {self.estimator.get()}..."
+
+    def on_fit_done(self, plot, lin_reg):
+        self.fit_job = None
+        if plot is not self.plot or not self.is_plot_open():
+            return
+        if self.fit_stale:
+            self.start_fit(lin_reg)
+            return
+
+        plot.set_lin_reg(lin_reg, fitted=True)
+        self.progress_label["text"] = f"Fitted {plot.get_points_count()} points with {self.estimator.get()}"
+
+    def cancel_fit(self):
+        if self.fit_job is not None:
+            self.fit_job.cancel()
+            self.fit_job = None
+            self.progress_label["text"] = "Fit cancelled"
+
+    def create_estimator_menu(self):
+        estimator_label = Label(self, text="Estimator: ", bg="white")
+        estimator_label.place(x=170, y=90)
+
+        estimator = StringVar(value=MainApplication.ESTIMATORS[0])
+        estimator_menu = OptionMenu(self, estimator, *MainApplication.ESTIMATORS, command=self.estimator_clb)
+        estimator_menu.place(x=240, y=86, width=110)
+        return estimator_label, estimator_menu, estimator
+
+    def import_clb(self):
+        import DataImport
+        import MappedDataset
+        from WorkerPool import read_points
+
+        path = filedialog.askopenfilename(title="Import points", filetypes=DataImport.FILE_TYPES)
+        if not path:
+            return
+        if MappedDataset.is_out_of_core(path):
+            self.open_dataset(path)
+            return
+
+        self.remove_closed_plot()
+        # The points of a dataset can't be changed, so the file is imported into a new plot
+        if self.plot is None or self.plot.dataset is not None:
+            self.new_plot_clb()
+
+        self.cancel_import()
+        self.import_job = self.workers.submit(read_points, path, on_progress=self.on_import_progress,
+                                              on_done=self.on_import_done, on_error=self.on_import_error)
+        # The whole import is undone in one step
+        self.begin_history_group()
+        self.progress_label["text"] = f"Importing {os.path.basename(path)}..."
+
+    def on_import_progress(self, progress, chunk):
+        if not self.is_plot_open():
+            self.cancel_import()
+            return
+
+        self.plot.add_points(*chunk)
+        self.progress_label["text"] = f"Importing: {progress:.0%} ({len(self.plot.points)} points)"
+
+    def on_import_done(self, count):
+        self.import_job = None
+        self.end_history_group()
+        if self.is_plot_open():
+            self.progress_label["text"] = f"Imported {len(self.plot.points)} points"
+
+    def on_import_error(self, error):
+        self.import_job = None
+        self.end_history_group()
+        self.progress_label["text"] = "The import failed"
+        print(f"Could not import the file: {error}")
+
+    def open_dataset(self, path):
+        from MappedDataset import MappedDataset
+        from LinearRegression import LinearRegression
+        from WorkerPool import scan_dataset
+
+        try:
+            dataset = MappedDataset(path)
+        except (OSError, ValueError) as e:
+            print(f"Could not open the dataset: {e}")
+            return
+
+        lin_reg = self.create_lin_reg()
+        if hasattr(lin_reg, "points"):
+            print(f"{self.estimator.get()} keeps all the points in memory, so the dataset is fitted with OLS")
+            self.estimator.set(MainApplication.ESTIMATORS[0])
+            lin_reg = LinearRegression()
+
+        self.new_plot_clb()
+        self.import_job = self.workers.submit(scan_dataset, lin_reg, dataset, self.plot.lod_threshold,
+                                              on_progress=self.on_dataset_progress,
+                                              on_done=partial(self.on_dataset_scanned, dataset),
+                                              on_error=self.on_import_error)
+        self.progress_label["text"] = f"Opening {os.path.basename(path)} ({len(dataset)} points)..."
+
+    def on_dataset_progress(self, progress, phase):
+        self.progress_label["text"] = f"{phase}: {progress:.0%}"
+
+    def on_dataset_scanned(self, dataset, result):
+        from PointStore import PointStore
+
+        self.import_job = None
+        if not self.is_plot_open():
+            return
+
+        lin_reg, grid, sample_xs, sample_ys = result
+        if dataset.bounds is None:
+            xlim, ylim = (-10, 10), (-10, 10)
+        else:
+            x_min, x_max, y_min, y_max = dataset.bounds
+            x_margin = max(x_max - x_min, 1.0) * 0.05
+            y_margin = max(y_max - y_min, 1.0) * 0.05
+            xlim, ylim = (x_min - x_margin, x_max + x_margin), (y_min - y_margin, y_max + y_margin)
+        self.plot.restore(PointStore.from_arrays(sample_xs, sample_ys), lin_reg, xlim, ylim, dataset, grid)
+        self.progress_label["text"] = f"Opened {len(dataset)} points ({len(sample_xs)} drawn as markers)"
+
+    def cancel_import(self):
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.import_job = None
+            self.end_history_group()
+            self.progress_label["text"] = "Import cancelled"
+
+    def create_import_btn(self):
+        import_btn = Button(self, text="Import file", command=self.import_clb, padx=5)
+        import_btn.place(x=10, y=125, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return import_btn
+
+    def create_progress_label(self):
+        progress_label = Label(self, text="", bg="white")
+        progress_label.place(x=110, y=125, height=MainApplication.BTN_HEIGHT)
+        return progress_label
+
+    def cancel_clb(self):
+        self.cancel_import()
+        self.cancel_fit()
+
+    def create_cancel_btn(self):
+        cancel_btn = Button(self, text="Cancel", command=self.cancel_clb, padx=5)
+        cancel_btn.place(x=310, y=125, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return cancel_btn
+
+    def stream_clb(self):
+        if self.stream is not None:
+            self.stop_stream()
+            return
+
+        from StreamSource import StreamSource
+
+        answer = simpledialog.askstring("Stream", "Address (tcp://HOST:PORT, unix://PATH or pipe://PATH),\n"
+                                        "followed by \"binary\" for binary records:",
+                                        initialvalue=MainApplication.STREAM_ADDRESS, parent=self)
+        if not answer:
+            return
+
+        address, _, fmt = answer.strip().partition(" ")
+        try:
+            stream = StreamSource(address, fmt.strip() or "text")
+        except ValueError as e:
+            print(f"Could not open the stream: {e}")
+            return
+
+        stream.start()
+        if stream.error is not None:
+            print(f"Could not open the stream: {stream.error}")
+            return
+
+        self.remove_closed_plot()
+        if self.plot is None or self.plot.dataset is not None:
+            self.new_plot_clb()
+        self.stream = stream
+        self.stream_btn["text"] = "Stop stream"
+        self.begin_history_group()
+        self.progress_label["text"] = f"Waiting for points on {address}..."
+        self.stream_id = self.after(MainApplication.STREAM_POLL_MS, self.poll_stream)
+
+    def poll_stream(self):
+        self.stream_id = None
+        if not self.is_plot_open():
+            self.stop_stream()
+            return
+
+        stream = self.stream
+        deadline = time.perf_counter() + MainApplication.STREAM_UPDATE_SECONDS
+        while time.perf_counter() < deadline:
+            points = stream.get_points(MainApplication.STREAM_CHUNK_POINTS)
+            if points is None:
+                break
+            self.plot.add_points(*points)
+
+        if not stream.is_running() and not stream.has_points():
+            if stream.error is not None:
+                print(f"The stream failed: {stream.error}")
+            self.stop_stream()
+            return
+
+        self.progress_label["text"] = (f"Streaming: {stream.received} points from {stream.connections} producers"
+                                       + (f" ({stream.bad_records} bad records)" if stream.bad_records else ""))
+        self.stream_id = self.after(MainApplication.STREAM_POLL_MS, self.poll_stream)
+
+    def stop_stream(self):
+        if self.stream_id is not None:
+            self.after_cancel(self.stream_id)
+            self.stream_id = None
+        if self.stream is not None:
+            self.stream.stop()
+            self.end_history_group()
+            self.progress_label["text"] = f"Stream stopped after {self.stream.received} points"
+            self.stream = None
+            self.stream_btn["text"] = "Stream"
+
+    def create_stream_btn(self):
+        stream_btn = Button(self, text="Stream", command=self.stream_clb, padx=5)
+        stream_btn.place(x=310, y=50, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
+        return stream_btn
+
+    def begin_history_group(self):
+        if self.plot is not None and self.plot.history is not None:
+            self.plot.history.begin_group()
+
+    def end_history_group(self):
+        if self.plot is not None and self.plot.history is not None:
+            self.plot.history.end_group()
+
+    def undo_clb(self, event=None):
+        if not self.is_plot_open() or not self.plot.undo():
+            print("There is nothing to undo")
+
+    def create_undo_btn(self):
+        undo_btn = Button(self, text="Undo", command=self.undo_clb, padx=5)
+        undo_btn.place(x=10, y=470, height=MainApplication.BTN_HEIGHT - 5, width=MainApplication.BTN_WIDTH)
+        return undo_btn
+
+    def redo_clb(self, event=None):
+        if not self.is_plot_open() or not self.plot.redo():
+            print("There is nothing to redo")
+
+    def create_redo_btn(self):
+        redo_btn = Button(self, text="Redo", command=self.redo_clb, padx=5)
+        redo_btn.place(x=110, y=470, height=MainApplication.BTN_HEIGHT - 5, width=MainApplication.BTN_WIDTH)
+        return redo_btn
 
-    def create_update_line_btn(self):
-        update_line_btn = Button(self, text="Update line", command=self.update_line_clb)
-        update_line_btn.place(x=10, y=125, height=MainApplication.BTN_HEIGHT, width=MainApplication.BTN_WIDTH)
-        return update_line_btn
+    def destroy(self):
+        self.workers.shutdown()
+        self.stop_stream()
+        super().destroy()
 
     @staticmethod
     def is_number(s):
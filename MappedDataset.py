@@ -0,0 +1,202 @@
+"""
+Out-of-core datasets
+
+A dataset larger than the memory can't be held in a PointStore, so a MappedDataset reads its points
+straight from a binary file of float64 (x, y) records, either:
+    .f64 / .bin : a raw file of little-endian (x, y) pairs (the records of the binary streams)
+    .npy : an array of shape (n, 2) (or (n, k), whose first two columns are used)
+
+Only a small window of the file is memory-mapped at a time: a chunk of rows while the
+dataset is scanned, or a page of PAGE_ROWS rows around the rows shown by the data panel. Every
+window is copied and unmapped right away, so the resident memory stays the same whether the file
+has a million points or a hundred gigabytes of them.
+
+The plot of a dataset is computed by two passes over the file: scan fits the model (in a single
+chunked pass, like the import of a file), finds the bounds of the points and keeps a strided sample
+of them, then bin counts all the points into a DensityGrid. The density image is rendered from the
+grid and the sample is drawn as markers when the view is zoomed in, so nothing else is ever read.
+
+This module doesn't use Tk or matplotlib, so it can be used without a display.
+
+Example:
+    dataset = MappedDataset("points.f64")
+    lin_reg = LinearRegression()
+    dataset.fit(lin_reg)
+"""
+
+import math
+import os
+import numpy as np
+from DataImport import CHUNK_SIZE
+
+FORMATS = (".npy", ".f64", ".bin")
+# Smaller files are imported into memory, which allows editing their points
+OUT_OF_CORE_BYTES = 1 << 30
+
+
+def is_out_of_core(path):
+    """ Returns True if the file should be opened as a MappedDataset instead of being imported. """
+
+    return os.path.splitext(path)[1].lower() in FORMATS and os.path.getsize(path) >= OUT_OF_CORE_BYTES
+
+
+class MappedDataset:
+    """
+    A read-only dataset of points mapped from a binary file, a window at a time
+
+    Attributes
+    ----------
+    PAGE_ROWS : 4096
+        The number of rows read at once by get_point (the data panel shows a few rows at a time)
+    BIN_CHUNK_SIZE : 1048576
+        The number of rows binned at once (counting a chunk costs O(grid cells), so the chunks are larger than CHUNK_SIZE)
+    path : str
+        The path of the file
+    offset : int
+        The position of the first record in the file
+    columns : int
+        The number of float64 values in every record (the first two are the x and y coordinates)
+    size : int
+        The number of points in the dataset
+    bounds : tuple
+        The limits (x_min, x_max, y_min, y_max) of the points, None until the dataset is scanned
+    page_start : int
+        The index of the first row of the cached page
+    page : numpy.ndarray
+        A copy of the rows page_start, page_start + 1, ... (at most PAGE_ROWS rows)
+
+    Methods
+    -------
+    read(start, stop)
+        Returns the rows start, ..., stop - 1 as a (stop - start, 2) array, mapping only those rows.
+    get_point(index)
+        Returns the coordinates (x, y) of the point with the given index (from the cached page).
+    iter_chunks(chunk_size)
+        Yields the points in chunks of at most chunk_size points, like DataImport.iter_chunks.
+    fit(lin_reg, callback)
+        Adds all the points to a model in one chunked pass.
+    scan(lin_reg, sample_size, callback)
+        Fits a model, finds the bounds of the points and returns a strided sample of them, in one pass.
+    bin(grid, callback)
+        Fits a DensityGrid around the bounds found by scan and counts all the points into it.
+    """
+
+    PAGE_ROWS = 4096
+    BIN_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            The path of a .npy file or of a raw file of float64 (x, y) pairs
+
+        Raises ValueError if the file doesn't contain float64 points.
+        """
+
+        self.path = path
+        if os.path.splitext(path)[1].lower() == ".npy":
+            with open(path, "rb") as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                self.offset = f.tell()
+            if len(shape) != 2 or shape[1] < 2 or fortran_order or dtype != np.dtype("<f8"):
+                raise ValueError(f"{path} must contain a (n, 2) array of little-endian float64 values")
+            self.size, self.columns = shape
+        else:
+            file_size = os.path.getsize(path)
+            if file_size % 16:
+                raise ValueError(f"{path} must contain pairs of float64 values")
+            self.offset = 0
+            self.columns = 2
+            self.size = file_size // 16
+
+        self.bounds = None
+        self.page_start = 0
+        self.page = np.empty((0, 2))
+
+    def __len__(self):
+        return self.size
+
+    def read(self, start, stop):
+        if stop <= start:
+            return np.empty((0, 2))
+
+        window = np.memmap(self.path, dtype="<f8", mode="r", offset=self.offset + 8 * self.columns * start,
+                           shape=(stop - start, self.columns))
+        # The rows are copied, so the window is unmapped as soon as this function returns
+        return np.array(window[:, :2], dtype=np.float64)
+
+    def get_point(self, index):
+        if not self.page_start <= index < self.page_start + len(self.page):
+            if not 0 <= index < self.size:
+                raise IndexError("point index out of range")
+            self.page_start = index - index % MappedDataset.PAGE_ROWS
+            self.page = self.read(self.page_start, min(self.page_start + MappedDataset.PAGE_ROWS, self.size))
+        x, y = self.page[index - self.page_start]
+        return float(x), float(y)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        for start in range(0, self.size, chunk_size):
+            stop = min(start + chunk_size, self.size)
+            rows = self.read(start, stop)
+            yield rows[:, 0], rows[:, 1], stop / self.size
+
+    def fit(self, lin_reg, callback=None):
+        """ Adds all the points to lin_reg, one chunk at a time.
+
+        callback(progress) is called after every chunk (it can raise an exception to stop the pass).
+        """
+
+        for xs, ys, progress in self.iter_chunks():
+            lin_reg.add_points(xs, ys)
+            if callback is not None:
+                callback(progress)
+
+    def scan(self, lin_reg, sample_size, callback=None):
+        """ Adds all the points to lin_reg and sets the bounds attribute, in one pass over the file.
+
+        Returns the coordinates (xs, ys) of every k-th point, where k is chosen so there are at most
+        sample_size of them. callback(progress) is called after every chunk.
+        """
+
+        step = max(1, math.ceil(self.size / max(sample_size, 1)))
+        sample_xs, sample_ys = [], []
+        x_min = y_min = math.inf
+        x_max = y_max = -math.inf
+        start = 0
+        for xs, ys, progress in self.iter_chunks():
+            lin_reg.add_points(xs, ys)
+            x_min = min(x_min, float(xs.min()))
+            x_max = max(x_max, float(xs.max()))
+            y_min = min(y_min, float(ys.min()))
+            y_max = max(y_max, float(ys.max()))
+            # The first point of the chunk whose index is a multiple of step
+            first = -start % step
+            sample_xs.append(xs[first::step].copy())
+            sample_ys.append(ys[first::step].copy())
+            start += xs.size
+            if callback is not None:
+                callback(progress)
+
+        if self.size:
+            self.bounds = (x_min, x_max, y_min, y_max)
+        if not sample_xs:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(sample_xs), np.concatenate(sample_ys)
+
+    def bin(self, grid, callback=None):
+        """ Counts all the points into grid (fitted around the bounds found by scan), one chunk at a time. """
+
+        if self.bounds is None:
+            grid.rebuild(np.empty(0), np.empty(0))
+            return
+
+        grid.set_bounds(*self.bounds)
+        for xs, ys, progress in self.iter_chunks(MappedDataset.BIN_CHUNK_SIZE):
+            grid.add(xs, ys)
+            if callback is not None:
+                callback(progress)
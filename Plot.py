@@ -2,45 +2,12 @@ from tkinter import Canvas
 import matplotlib.pyplot as plt
 import numpy as np
 from LinearRegression import LinearRegression
-
-
-class Point:
-    """ A class used to represent a point
-
-    It is mainly used to store the points inside the matplotlib plot.
-
-    Attributes
-    ----------
-    x : double
-        the x coordinate of the point
-    y : double
-        the y coordinate of the point
-
-    Methods
-    -------
-    get_x()
-        Returns the x attribute
-    get_y()
-        Returns the y attribute
-    """
-
-    def __init__(self, x, y):
-        """
-        Parameters
-        ----------
-        x : double
-            the x coordinate of the point
-        y : double
-            the y coordinate of the point
-        """
-        self.x = x
-        self.y = y
-
-    def get_x(self):
-        return self.x
-
-    def get_y(self):
-        return self.y
+from SpatialIndex import SpatialIndex
+from DensityGrid import DensityGrid
+from PointStore import PointStore, RingPointStore
+from WindowedRegression import WindowedLinearRegression
+from PolynomialRegression import LeastSquaresRegression
+from History import History, Step, ADD, DELETE
 
 
 class Plot:
@@ -52,6 +19,24 @@ class Plot:
 
     Attributes
     ----------
+    POINTS_ADDED : "points_added"
+        Change notification sent with the coordinates (x, y) of a new point
+        or with the coordinate arrays (xs, ys) of a batch of new points
+    POINTS_REMOVED : "points_removed"
+        Change notification sent with the index of a deleted point
+        or with the range (start, stop) of the indices of the last points, which were removed by undo
+    POINTS_RESET : "points_reset"
+        Change notification sent (without arguments) when all the points are deleted
+    COEF_CHANGED : "coef_changed"
+        Change notification sent with the new (alpha, beta) coefficients
+    PICK_RADIUS : 6
+        The distance (in pixels) from the mouse cursor inside which a point can be hovered or deleted
+    LOD_THRESHOLD : 50000
+        The default maximum number of points drawn as individual markers
+    DENSITY_BINS : 256
+        The maximum number of pixels (along each axis) of the density image
+    CURVE_POINTS : 200
+        The number of points at which a fitted curve (of a LeastSquaresRegression model) is drawn
     fig : matplotlib.figure.Figure
         The top level container for the plot (according to matplotlib documentation)
         This is basically the window which contains the plot.
@@ -65,11 +50,75 @@ class Plot:
         This tells the plot whether to add a new point if you click on it or not.
     cid : int
         A connection id that can be used to disconnect the on_click callback from the figure (self.fig)
-    points : list
-        A list which stores all the Point objects displayed on the plot
+    points : PointStore
+        The store which contains all the points displayed on the plot
+        It is shared with the PlotData widget which displays the points.
+        If lin_reg is a WindowedLinearRegression, this is the store of its window, so only the points
+        inside the window are displayed. If max_points is given, this is a RingPointStore which keeps
+        only the newest max_points points, so the memory used by the plot stays flat over an endless stream.
+    owns_points : bool
+        False if the points store belongs to lin_reg (which adds and evicts the points), True otherwise
+    dataset : MappedDataset
+        The out-of-core dataset shown by the plot (None if the points are held in memory)
+        Its points are read-only: points is a strided sample of them (drawn as markers when the view is zoomed in)
+        and grid counts all of them, so the plot never reads the file again after opening it.
+    scatter : matplotlib.collections.PathCollection
+        The single collection which draws the points as markers
+        Adding a point only changes its offsets, instead of creating a new artist.
+    lod_threshold : int
+        The maximum number of points drawn as individual markers
+        If there are more points inside the view, they are drawn as a density image instead.
+    density : matplotlib.image.AxesImage
+        The (reused) image which shows how many points fall in every pixel of the view
+        It replaces the scatter when there are too many points to draw them one by one.
+    grid : DensityGrid
+        The counts from which the density image is computed (None until the image is needed)
+    grid_dirty : bool
+        True if the grid has to be rebuilt before it is used
+    marker_view : tuple
+        The limits (xlim, ylim) of the zoomed view whose points are drawn as markers (None if no such view is drawn)
+    workers : WorkerPool
+        The pool which rebuilds the grid of at least ASYNC_GRID_POINTS points in the background
+        (None to rebuild it on the Tk thread)
+    grid_job : Job
+        The job which rebuilds the grid (None if there is no such job)
+    grid_job_size : int
+        The number of (first) points binned by grid_job
+    line : matplotlib.lines.Line2D
+        The best fitting line, which is reused every time the coefficients change
+        It is an animated artist defined by its two visible endpoints and it is redrawn by blitting.
+        If lin_reg is a LeastSquaresRegression (a polynomial, for example), it is the fitted curve,
+        sampled at CURVE_POINTS points across the visible x range.
+    band : matplotlib.collections.PolyCollection
+        The 95% confidence band of the best fitting line (or curve), sampled at CURVE_POINTS points
+        It is a single animated artist whose polygon is replaced every time the coefficients change,
+        and it is empty if lin_reg can't compute a band (for example, if there are less than 3 points).
+    tooltip : matplotlib.text.Annotation
+        The (animated) tooltip which displays the coordinates of the point under the mouse cursor
+    hovered : int
+        The index of the point under the mouse cursor (None if there is no such point)
+    motion_cid : int
+        A connection id used to disconnect the on_motion callback from the figure
+    index : SpatialIndex
+        A grid index over the points, used to find the point nearest to the mouse cursor
+        It is None if the points are stored in a RingPointStore, whose (few) points are simply scanned.
+    index_dirty : bool
+        True if the index has to be rebuilt before it is used (after the points store was replaced)
+    history : History
+        The undo and redo history of the points (None if the points can't be deleted, like the points of a window)
+        It is cleared when all the points are deleted or the model is replaced.
+    key_cid : int
+        A connection id used to disconnect the on_key callback from the figure
+    background :
+        A copy of the axes pixels (without the animated artists) taken after every full redraw of the figure
+    draw_cid : int
+        A connection id used to disconnect the on_draw callback from the figure
     lin_reg : LinearRegression
         An object used to compute the alpha and beta coefficients of the best fitting line
         The best fitting line's equation is: y = alpha + beta * x.
+    listeners : list
+        The callbacks which are notified about every change of the plot's points and coefficients
+        A callback is called as callback(change, *args), where change is one of the class constants above.
 
     Methods
     -------
@@ -77,29 +126,117 @@ class Plot:
         Returns the alpha coefficient of the best fitting line.
     get_beta()
         Returns the beta coefficient of the best fitting line.
+    subscribe(callback)
+        Registers a callback which is notified about the changes of the plot.
+    unsubscribe(callback)
+        Removes a callback registered with subscribe.
+    notify(change, *args)
+        Sends a change notification to all the listeners.
     add_point(x, y)
         Adds a new point on the plot.
+    add_points(xs, ys)
+        Adds a batch of points on the plot.
+    del_point(index)
+        Deletes the point with the given index from the plot.
+    remove_point(index, state)
+        Deletes a point from the store, the index, the density grid and the model (without recording the step).
+    get_model_state()
+        Returns the state of the model recorded by the history, or None if the model can't be restored from it.
+    record(kind, start, stop, x, y, before)
+        Records a step in the history.
+    undo(), redo()
+        Undo / redo the last addition or deletion of points.
+    remove_range(start, stop, state), restore_range(start, xs, ys, state)
+        Cut the last points off the plot / bring them back (used by undo and redo of additions).
+    reinsert_point(index, x, y, state)
+        Puts a deleted point back (used by undo of deletions).
+    reset()
+        Deletes all the points from the plot.
+    restore(points, lin_reg, xlim, ylim, dataset, grid)
+        Replaces the points and the linear regression model of the plot (used to load a saved session
+        or to open an out-of-core dataset).
+    get_points_count()
+        Returns the number of points of the plot (of the dataset, if it shows one).
+    get_rows()
+        Returns the points listed by the data panel: the dataset, if the plot shows one, otherwise the points store.
+    can_set_lin_reg(lin_reg)
+        Returns True if the points of the plot can be fitted by the given model.
+    set_lin_reg(lin_reg, fitted)
+        Fits another model on the points of the plot (unless it is already fitted) and uses it from now on
+        (used to switch the estimator).
+    update_grid(xs, ys)
+        Adds new points to the density grid, or marks it for rebuilding.
+    update_points_view(xs, ys)
+        Draws the points either as markers or as a density image, depending on how many points are in the view.
+    get_view_offsets(xlim, ylim)
+        Returns the coordinates of the points inside a view, found with the spatial index.
+    show_markers(offsets)
+        Draws the given points as markers and hides the density image.
+    show_density(image, extent)
+        Draws the given counts as a density image and hides the markers.
+    rebuild_grid_async()
+        Starts rebuilding the density grid in the background (if it isn't already being rebuilt).
+    on_grid_built(grid)
+        Callback which uses the grid rebuilt in the background and adds the points added in the meantime.
+    cancel_grid_job()
+        Stops rebuilding the density grid in the background (after the points were deleted or replaced).
+    set_line_data()
+        Moves the best fitting line endpoints to the edges of the axes (or samples the fitted curve).
+    set_band_data()
+        Samples the confidence band across the visible x range.
     update_best_fitting_line()
-        Updates the best fitting line coefficients and makes it fill the axes.
-    delete_existing_lines()
-        Deletes the previous drawn line(s).
+        Updates the best fitting line and redraws only the line by blitting.
+    blit_animated()
+        Redraws the confidence band, the best fitting line and the tooltip over the cached background.
+    get_pick_radii()
+        Returns the PICK_RADIUS distance converted to data units along the x and y axes.
+    find_nearest(x, y)
+        Returns the index of the point nearest to (x, y) within PICK_RADIUS pixels, or None.
+    on_draw(event)
+        Callback which caches the background after every full redraw of the figure.
+    on_lims_changed(ax)
+        Callback which re-extends the best fitting line and re-bins the density image when the axes limits change.
     update_check_state(new_val)
         Updates the check_state attribute to new_val.
     on_click(event)
         Callback which handles mouse clicks on the figure
+    on_motion(event)
+        Callback which shows the tooltip of the point under the mouse cursor
+    on_key(event)
+        Callback which undoes (Ctrl+Z) or redoes (Ctrl+Y or Ctrl+Shift+Z) the last change of the points
     disconnect_on_click_clb()
         Disconnects on_click callback from the figure.
 
     Note: I added docstrings only to the most important class methods for the sake of code simplicity.
     """
 
-    def __init__(self, parent):
+    POINTS_ADDED = "points_added"
+    POINTS_REMOVED = "points_removed"
+    POINTS_RESET = "points_reset"
+    COEF_CHANGED = "coef_changed"
+    PICK_RADIUS = 6
+    LOD_THRESHOLD = 50000
+    DENSITY_BINS = 256
+    CURVE_POINTS = 200
+    ASYNC_GRID_POINTS = 1_000_000
+
+    def __init__(self, parent, lin_reg=None, max_points=None, lod_threshold=LOD_THRESHOLD, workers=None):
         """
         Parameters
         ----------
         parent : MainApplication
             A reference to the MainApplication object which created the plot
             This is used to enable access to the PlotData object inside the main app.
+        lin_reg (default = None) : LinearRegression
+            The model used to fit the points (a new LinearRegression object if it is None)
+            Any of the models with the same interface can be used, like StableLinearRegression,
+            WindowedLinearRegression, ExpWeightedLinearRegression or PolynomialRegression.
+        max_points (default = None) : int
+            The maximum number of (newest) points displayed on the plot, or None to display all the points
+        lod_threshold (default = LOD_THRESHOLD) : int
+            The maximum number of points inside the view which are drawn as individual markers
+        workers (default = None) : WorkerPool
+            The pool used to rebuild the density grid of many points in the background
         """
 
         self.fig, self.ax = plt.subplots()
@@ -110,43 +247,613 @@ class Plot:
         self.check_state = False
         self.cid = self.fig.canvas.mpl_connect("button_press_event", self.on_click)
 
-        self.points = []
-        self.lin_reg = LinearRegression()
+        self.lin_reg = lin_reg if lin_reg is not None else LinearRegression()
+        if isinstance(self.lin_reg, WindowedLinearRegression):
+            self.points = self.lin_reg.points
+        elif max_points is not None:
+            self.points = RingPointStore(max_size=max_points)
+        else:
+            self.points = PointStore()
+        self.owns_points = self.points is not getattr(self.lin_reg, "points", None)
+        self.dataset = None
+        self.index = SpatialIndex(1.0, 1.0) if type(self.points) is PointStore else None
+        self.index_dirty = False
+        self.history = History() if self.index is not None and self.owns_points else None
+        self.scatter = self.ax.scatter([], [], color="red")
+        self.listeners = []
 
         self.ax.set(xlim=(-10, 10), ylim=(-10, 10))
 
+        self.lod_threshold = lod_threshold
+        self.density = self.ax.imshow(np.zeros((1, 1)), extent=(0, 1, 0, 1), origin="lower", aspect="auto",
+                                      cmap="Reds", interpolation="nearest", visible=False)
+        self.grid = None
+        self.grid_dirty = True
+        self.marker_view = None
+        self.workers = workers
+        self.grid_job = None
+        self.grid_job_size = 0
+
+        self.band = self.ax.fill_between([], [], [], color="blue", alpha=0.15, linewidth=0, animated=True)
+        self.line, = self.ax.plot([], [], color="blue", animated=True)
+        self.tooltip = self.ax.annotate("", xy=(0, 0), xytext=(10, 10), textcoords="offset points",
+                                        bbox=dict(boxstyle="round", fc="white"), animated=True, visible=False)
+        self.hovered = None
+        self.motion_cid = self.fig.canvas.mpl_connect("motion_notify_event", self.on_motion)
+        self.key_cid = self.fig.canvas.mpl_connect("key_press_event", self.on_key)
+        self.background = None
+        self.draw_cid = self.fig.canvas.mpl_connect("draw_event", self.on_draw)
+        self.ax.callbacks.connect("xlim_changed", self.on_lims_changed)
+        self.ax.callbacks.connect("ylim_changed", self.on_lims_changed)
+
     def get_alpha(self):
         return self.lin_reg.get_alpha()
 
     def get_beta(self):
         return self.lin_reg.get_beta()
 
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, change, *args):
+        for callback in self.listeners:
+            callback(change, *args)
+
     def add_point(self, x, y):
-        self.points.append(Point(x, y))
+        # The points of a dataset are read-only
+        if self.dataset is not None:
+            return
+
+        before = self.get_model_state()
+        if self.owns_points:
+            self.points.append(x, y)
+        if self.index is not None and not self.index_dirty:
+            self.index.add(len(self.points) - 1, x, y)
+        self.update_grid([x], [y])
         self.lin_reg.add_point(x, y)
-        plt.scatter(x, y, color="red")
-        plt.draw()
+        self.update_points_view([x], [y])
 
-        if len(self.points) > 1:
-            self.update_best_fitting_line()
+        # The line is drawn on top of the figure by on_draw, so there is no need to blit it here
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+        self.record(ADD, len(self.points) - 1, len(self.points), before=before)
+
+        self.notify(Plot.POINTS_ADDED, x, y)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def add_points(self, xs, ys):
+        """ Adds a batch of points on the plot.
+
+        The points are added to the store and to the linear regression model in bulk,
+        and the figure is redrawn only once for the whole batch.
+
+        Parameters
+        ----------
+        xs : array_like
+            The x coordinates of the new points
+        ys : array_like
+            The y coordinates of the new points
+        """
+
+        if self.dataset is not None:
+            return
+
+        xs, ys = LinearRegression.as_columns(xs, ys)
+        before = self.get_model_state()
+        if self.owns_points:
+            self.points.extend(xs, ys)
+        if self.index is not None and not self.index_dirty:
+            self.index.add_many(len(self.points) - xs.size, xs, ys)
+        self.update_grid(xs, ys)
+        self.lin_reg.add_points(xs, ys)
+        self.update_points_view(xs, ys)
+
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+        if xs.size:
+            self.record(ADD, len(self.points) - xs.size, len(self.points), before=before)
+
+        self.notify(Plot.POINTS_ADDED, xs, ys)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def del_point(self, index):
+        """ Deletes the point with the given index from the plot.
+
+        The last point is moved into the place of the deleted one (see PointStore.remove),
+        so the deletion takes O(1), and the coefficients are updated with LinearRegression.del_point.
+        Points can't be deleted from a RingPointStore (only the oldest points leave a window)
+        or from a dataset.
+        """
+
+        if self.index is None or not self.owns_points or self.dataset is not None:
+            return False
+
+        before = self.get_model_state()
+        x, y = self.points.get_point(index)
+        last = len(self.points) - 1
+        if not self.remove_point(index):
+            return False
+
+        self.record(DELETE, index, last, x, y, before)
+        return True
+
+    def remove_point(self, index, state=None):
+        """ Deletes a point from the store, the index, the density grid and the model (see del_point).
+
+        If state is given, the model is restored from it instead of deleting the point from the model.
+        """
+
+        x, y = self.points.get_point(index)
+        if state is not None:
+            self.lin_reg.set_state(state)
+        elif not self.lin_reg.del_point(x, y):
+            return False
+
+        last = len(self.points) - 1
+        last_x, last_y = self.points.get_point(last)
+        self.points.remove(index)
+        if not self.index_dirty:
+            self.index.remove(index, x, y)
+            if index != last:
+                self.index.move(last, index, last_x, last_y)
+        if not self.grid_dirty:
+            self.grid.remove(x, y)
+        self.cancel_grid_job()
+
+        self.hovered = None
+        self.tooltip.set_visible(False)
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_REMOVED, index)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+        return True
+
+    def get_model_state(self):
+        # Models which keep their own copy of the points (the robust ones) can't be restored from their state
+        if self.history is None or hasattr(self.lin_reg, "points") or not hasattr(self.lin_reg, "get_state"):
+            return None
+        return self.lin_reg.get_state()
+
+    def record(self, kind, start, stop, x=None, y=None, before=None):
+        if self.history is not None:
+            self.history.record(Step(kind, start, stop, x, y, before, self.get_model_state()))
+
+    def undo(self):
+        """ Undoes the last addition or deletion of points. Returns False if there is nothing to undo.
+
+        An addition is undone by cutting the added points off the end of the store, a deletion by putting the
+        deleted point back. The model is restored from its recorded state (or updated with the inverse change),
+        so the cost doesn't depend on the number of points of the plot, and undoing an import of a million
+        points only takes a few milliseconds (to update the spatial index and the density grid).
+        """
+
+        if self.history is None or not self.history.can_undo():
+            return False
+
+        step = self.history.pop_undo()
+        if step.kind == ADD:
+            # Undoing a deletion appends a point, which can reuse the slots of the cut points before they are
+            # redone, so the undone step keeps a copy of them
+            xs = self.points.xs[step.start:step.stop].copy()
+            ys = self.points.ys[step.start:step.stop].copy()
+            self.history.redo_steps[-1] = step._replace(x=xs, y=ys)
+            self.remove_range(step.start, step.stop, step.before)
+        else:
+            self.reinsert_point(step.start, step.x, step.y, step.before)
+        return True
+
+    def redo(self):
+        """ Redoes the last undone step. Returns False if there is nothing to redo. """
+
+        if self.history is None or not self.history.can_redo():
+            return False
+
+        step = self.history.pop_redo()
+        if step.kind == ADD:
+            self.history.undo_steps[-1] = step._replace(x=None, y=None)
+            self.restore_range(step.start, step.x, step.y, step.after)
+        else:
+            self.remove_point(step.start, step.after)
+        return True
+
+    def remove_range(self, start, stop, state=None):
+        """ Removes the last points of the plot, whose indices are start, ..., stop - 1 (used by undo). """
+
+        xs, ys = self.points.xs[start:stop], self.points.ys[start:stop]
+        if state is not None:
+            self.lin_reg.set_state(state)
+        else:
+            self.lin_reg.del_points(xs, ys)
+        if stop - start > start:
+            # Building the index of the points which are left is cheaper than removing the others from it
+            self.index_dirty = True
+        elif not self.index_dirty:
+            self.index.truncate(start, xs, ys)
+        if not self.grid_dirty and not self.grid.add(xs, ys, sign=-1):
+            self.grid_dirty = True
+        self.cancel_grid_job()
+        self.points.set_size(start)
+
+        self.hovered = None
+        self.tooltip.set_visible(False)
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_REMOVED, start, stop)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def restore_range(self, start, xs, ys, state=None):
+        """ Appends again the points which were cut by remove_range, starting at the index start (used by redo). """
+
+        self.points.set_size(start)
+        self.points.extend(xs, ys)
+        if state is not None:
+            self.lin_reg.set_state(state)
+        else:
+            self.lin_reg.add_points(xs, ys)
+        if not self.index_dirty:
+            self.index.add_many(start, xs, ys)
+        self.update_grid(xs, ys)
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_ADDED, xs, ys)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def reinsert_point(self, index, x, y, state=None):
+        """ Puts a deleted point back at its index, moving the point which took its place back to the end (used by undo). """
+
+        last = len(self.points)
+        if state is not None:
+            self.lin_reg.set_state(state)
+        else:
+            self.lin_reg.add_point(x, y)
+        if not self.index_dirty:
+            if index != last:
+                self.index.move(index, last, *self.points.get_point(index))
+            self.index.add(index, x, y)
+        self.points.reinsert(index, x, y)
+        self.update_grid([x], [y])
+        # A grid job might be reading the point which was moved
+        self.cancel_grid_job()
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_ADDED, x, y)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def reset(self):
+        if self.owns_points:
+            self.points.clear()
+        self.dataset = None
+        if self.index is not None:
+            self.index.clear()
+        self.grid_dirty = True
+        self.cancel_grid_job()
+        self.hovered = None
+        self.tooltip.set_visible(False)
+        self.lin_reg.reset()
+        if self.history is not None:
+            self.history.clear()
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_RESET)
+        self.notify(Plot.COEF_CHANGED, None, None)
+
+    def restore(self, points, lin_reg, xlim, ylim, dataset=None, grid=None):
+        """ Replaces the points and the linear regression model of the plot.
+
+        The model is used as it is, so the plot doesn't have to fit the points again.
+
+        Parameters
+        ----------
+        points : PointStore
+            The new points of the plot (a sample of the dataset, if one is given)
+        lin_reg : LinearRegression
+            A linear regression model already fitted on the new points (on all the points of the dataset)
+        xlim, ylim : tuple
+            The new axes limits
+        dataset (default = None) : MappedDataset
+            An out-of-core dataset whose points are shown by the plot, read-only
+        grid (default = None) : DensityGrid
+            The counts of all the points (it is built from points if it isn't given)
+        """
+
+        self.points = points
+        self.lin_reg = lin_reg
+        self.owns_points = self.points is not getattr(self.lin_reg, "points", None)
+        self.dataset = dataset
+        # The index is built when it is used for the first time
+        self.index = SpatialIndex(1.0, 1.0) if type(self.points) is PointStore else None
+        self.index_dirty = True
+        self.history = History() if self.index is not None and self.owns_points and dataset is None else None
+        self.cancel_grid_job()
+        self.grid = grid if grid is not None else self.grid
+        self.grid_dirty = grid is None
+        self.hovered = None
+        self.tooltip.set_visible(False)
+        self.ax.set(xlim=xlim, ylim=ylim)
+        self.update_points_view()
+        self.set_line_data()
+        self.fig.canvas.draw_idle()
+
+        self.notify(Plot.POINTS_RESET)
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+
+    def get_points_count(self):
+        return len(self.dataset) if self.dataset is not None else len(self.points)
+
+    def get_rows(self):
+        return self.dataset if self.dataset is not None else self.points
+
+    def update_grid(self, xs, ys):
+        # Only a PointStore owned by the plot changes just by the added and deleted points,
+        # the other stores also evict points, so their (small) grid is rebuilt every time
+        if self.grid_dirty or self.index is None or not self.owns_points:
+            self.grid_dirty = True
+        elif not self.grid.add(xs, ys):
+            self.grid_dirty = True
+
+    def update_points_view(self, xs=None, ys=None):
+        """ Draws the points either as markers or as a density image.
+
+        Drawing every point as a marker gets slow (and unreadable) for large datasets, so if there
+        are more than lod_threshold points inside the view, the view is binned into at most
+        DENSITY_BINS x DENSITY_BINS pixels instead. The image is computed from the density grid,
+        which is updated incrementally, so the cost of a frame doesn't depend on the number of points.
+        When the view is zoomed in far enough to contain few points, these are drawn as markers again.
+        The grid of a dataset counts all of its points, but only its sample is drawn as markers.
+
+        xs and ys are the coordinates of the points appended since the last call, if nothing else changed.
+        If the view didn't change either, only these points are compared with its limits.
+        """
+
+        if self.get_points_count() <= self.lod_threshold:
+            self.marker_view = None
+            self.show_markers(self.points.get_offsets())
+            return
+
+        if self.grid_dirty:
+            if (self.workers is not None and self.index is not None and self.owns_points and
+                    len(self.points) >= Plot.ASYNC_GRID_POINTS):
+                # The view is updated when the grid is ready (see on_grid_built)
+                self.marker_view = None
+                self.rebuild_grid_async()
+                return
+            if self.grid is None:
+                self.grid = DensityGrid()
+            self.grid.rebuild(self.points.xs, self.points.ys)
+            self.grid_dirty = False
+
+        xlim = self.ax.get_xlim()
+        ylim = self.ax.get_ylim()
+        # The cells on the edges of the view are counted whole, so this is an upper bound
+        if self.grid.count_in(xlim, ylim) <= self.lod_threshold:
+            # Only a PointStore owned by the plot changes just by the appended points (the others evict points)
+            if (xs is not None and self.marker_view == (xlim, ylim) and self.index is not None and
+                    self.owns_points):
+                xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+                inside = (xs >= min(xlim)) & (xs <= max(xlim)) & (ys >= min(ylim)) & (ys <= max(ylim))
+                offsets = np.concatenate((np.asarray(self.scatter.get_offsets()),
+                                          np.column_stack((xs[inside], ys[inside]))))
+            else:
+                offsets = self.get_view_offsets(xlim, ylim)
+            self.marker_view = (xlim, ylim)
+            self.show_markers(offsets)
+            return
+
+        self.marker_view = None
+        self.show_density(*self.grid.render(xlim, ylim, Plot.DENSITY_BINS))
+
+    def get_view_offsets(self, xlim, ylim):
+        """ Returns the coordinates of the points inside the view, as an (n, 2) array.
+
+        The spatial index gives the points of the cells overlapping the view, so only the points in the cells
+        on its edges are compared with its limits. Without an up-to-date index, or if its cells are too large
+        or much smaller than the view, all the points are scanned.
+        """
+
+        xs, ys = self.points.xs, self.points.ys
+        inside = None
+        # The cells of the index match the pick radius (see find_nearest), so they are usually much smaller than
+        # the view, but if they are not, most of the points they hold are outside the view
+        if (self.index is not None and not self.index_dirty and self.index.cell_w * 4 <= abs(xlim[1] - xlim[0])
+                and self.index.cell_h * 4 <= abs(ylim[1] - ylim[0])):
+            inside = self.index.query(xlim, ylim, xs, ys)
+        if inside is None:
+            inside = np.flatnonzero((xs >= min(xlim)) & (xs <= max(xlim)) & (ys >= min(ylim)) & (ys <= max(ylim)))
+        return np.column_stack((xs[inside], ys[inside]))
+
+    def show_markers(self, offsets):
+        self.scatter.set_offsets(offsets)
+        self.scatter.set_visible(True)
+        self.density.set_visible(False)
+
+    def show_density(self, image, extent):
+        counts = np.log1p(image)
+        self.density.set_data(counts)
+        self.density.set_extent(extent)
+        self.density.set_clim(0, max(float(counts.max()), 1.0))
+        self.density.set_visible(True)
+        self.scatter.set_visible(False)
+
+    def rebuild_grid_async(self):
+        """ Starts rebuilding the density grid on a worker thread.
+
+        The job bins the first grid_job_size points, which aren't changed while it runs: points are only
+        appended after them, and deleting or replacing points cancels the job (see cancel_grid_job).
+        """
+
+        if self.grid_job is not None:
+            return
+
+        from WorkerPool import build_density_grid
+
+        self.grid_job_size = len(self.points)
+        self.grid_job = self.workers.submit(build_density_grid, self.points.xs, self.points.ys,
+                                            on_done=self.on_grid_built)
+
+    def on_grid_built(self, grid):
+        self.grid_job = None
+        if grid.add(self.points.xs[self.grid_job_size:], self.points.ys[self.grid_job_size:]):
+            self.grid = grid
+            self.grid_dirty = False
+        # Otherwise some of the new points are outside the grid, so it is rebuilt again
+        self.update_points_view()
+        self.fig.canvas.draw_idle()
+
+    def cancel_grid_job(self):
+        if self.grid_job is not None:
+            self.grid_job.cancel()
+            self.grid_job = None
+
+    def can_set_lin_reg(self, lin_reg):
+        # The points of a windowed model belong to the model, so they can't be fitted by another one,
+        # and a model which keeps its points (a robust one) can't keep all the points of a dataset
+        if self.dataset is not None and hasattr(lin_reg, "points"):
+            return False
+        return self.owns_points and not isinstance(lin_reg, WindowedLinearRegression)
+
+    def set_lin_reg(self, lin_reg, fitted=False):
+        """ Fits another model on the points of the plot and uses it from now on.
+
+        If fitted is True, the model was already fitted on the points (by a background job, for example).
+        Returns False if the model can't be replaced, because the points belong to the current model
+        (a windowed model) or the new model would own its points.
+        """
+
+        if not self.can_set_lin_reg(lin_reg):
+            return False
+
+        if not fitted:
+            lin_reg.reset()
+            if self.dataset is not None:
+                self.dataset.fit(lin_reg)
+            else:
+                lin_reg.add_points(self.points.xs, self.points.ys)
+        self.lin_reg = lin_reg
+        # The recorded states belong to the old model
+        if self.history is not None:
+            self.history.clear()
+        self.update_best_fitting_line()
+
+        self.notify(Plot.COEF_CHANGED, self.get_alpha(), self.get_beta())
+        return True
+
+    def set_line_data(self):
+        self.set_band_data()
+        if isinstance(self.lin_reg, LeastSquaresRegression):
+            xs = np.linspace(*self.ax.get_xlim(), Plot.CURVE_POINTS)
+            ys = self.lin_reg.predict(xs)
+            self.line.set_data(xs if ys is not None else [], ys if ys is not None else [])
+            return
 
-    def update_best_fitting_line(self):
         a = self.lin_reg.get_alpha()
         b = self.lin_reg.get_beta()
         if a is None or b is None:
-            return 
-            
-        xmin, xmax, ymin, ymax = plt.axis()
-        x = np.arange(xmin - 1, xmax + 1, (xmax - xmin) / 50)
-        y = a + b * x
+            self.line.set_data([], [])
+            return
+
+        xmin, xmax = self.ax.get_xlim()
+        self.line.set_data((xmin, xmax), (a + b * xmin, a + b * xmax))
 
-        self.delete_existing_lines()
-        plt.plot(x, y, color="blue")
-        plt.draw()
+    def set_band_data(self):
+        xs = np.linspace(*self.ax.get_xlim(), Plot.CURVE_POINTS)
+        band = self.lin_reg.get_band(xs) if hasattr(self.lin_reg, "get_band") else None
+        if band is None:
+            self.band.set_verts([])
+            return
+
+        lower, upper = band
+        # The polygon goes along the lower edge and back along the upper one
+        self.band.set_verts([np.column_stack((np.concatenate((xs, xs[::-1])), np.concatenate((lower, upper[::-1]))))])
+
+    def update_best_fitting_line(self):
+        self.set_line_data()
+        self.blit_animated()
+
+    def blit_animated(self):
+        """ Redraws the confidence band, the best fitting line and the tooltip over the cached background.
+
+        Only the axes area is copied to the screen, so this is much cheaper than redrawing the whole figure.
+        If there is no background yet (the figure wasn't drawn at all), a full redraw is requested instead.
+        """
+
+        canvas = self.fig.canvas
+        if self.background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+
+        canvas.restore_region(self.background)
+        self.ax.draw_artist(self.band)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.tooltip)
+        canvas.blit(self.ax.bbox)
+
+    def get_pick_radii(self):
+        xmin, xmax = self.ax.get_xlim()
+        ymin, ymax = self.ax.get_ylim()
+        bbox = self.ax.bbox
+        return (abs(xmax - xmin) * Plot.PICK_RADIUS / max(bbox.width, 1),
+                abs(ymax - ymin) * Plot.PICK_RADIUS / max(bbox.height, 1))
+
+    def find_nearest(self, x, y):
+        """ Returns the index of the point nearest to (x, y) within PICK_RADIUS pixels, or None.
+
+        The spatial index is rebuilt (in O(n)) only when its cells don't match the zoom level anymore,
+        otherwise a query looks only at the points in the few cells around (x, y).
+        """
+
+        # Single points can't be told apart inside the density image
+        if len(self.points) == 0 or self.density.get_visible():
+            return None
+
+        rx, ry = self.get_pick_radii()
+        xs, ys = self.points.xs, self.points.ys
+        if self.index is not None:
+            if self.index_dirty or self.index.needs_rebuild(rx, ry):
+                self.index.rebuild(xs, ys, rx, ry)
+                self.index_dirty = False
+            return self.index.nearest(x, y, rx, ry, xs, ys)
+
+        dist = ((xs - x) / rx) ** 2 + ((ys - y) / ry) ** 2
+        best = int(np.argmin(dist))
+        return best if dist[best] <= 1 else None
+
+    def on_draw(self, event):
+        """ Callback which caches the background after every full redraw of the figure.
+
+        The band, the line and the tooltip are animated, so they are skipped by full redraws
+        and have to be drawn here, on top of everything else.
+        """
+
+        if not self.fig.canvas.is_saving():
+            self.background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.band)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.tooltip)
+
+    def on_lims_changed(self, ax):
+        """ Callback which re-extends the best fitting line when the axes limits change (zoom, pan, resize).
+
+        The figure is redrawn after its limits change, so the line only needs new endpoints
+        and the density image (if the view contains many points) only has to be re-binned.
+        """
 
-    def delete_existing_lines(self):
-        while len(self.ax.lines):
-            self.ax.lines.pop()
+        self.set_line_data()
+        if self.get_points_count() > self.lod_threshold:
+            self.update_points_view()
 
     def update_check_state(self, new_val):
         self.check_state = new_val
@@ -156,19 +863,52 @@ class Plot:
 
         If the "Add multiple points" check is activated you can add points on the plot by clicking inside the axes.
         This adds a point on the plot only if the left mouse button was clicked inside the axes.
+        Right clicking on a point deletes it (unless the zoom or pan tool is active).
         """
 
-        if len(self.points) > 1:
-            self.update_best_fitting_line()
-        if self.check_state is True and event.button == 1 and event.xdata is not None and event.ydata is not None:
+        if event.xdata is None or event.ydata is None:
+            return
+        if self.check_state is True and event.button == 1:
             self.add_point(event.xdata, event.ydata)
-            # self.parent.plot_data.update_data(event.xdata, event.ydata,
-            #                                   self.lin_reg.get_alpha(), self.lin_reg.get_beta())
+        elif event.button == 3:
+            toolbar = getattr(self.fig.canvas, "toolbar", None)
+            if toolbar is not None and toolbar.mode:
+                return
+            index = self.find_nearest(event.xdata, event.ydata)
+            if index is not None:
+                self.del_point(index)
+
+    def on_motion(self, event):
+        if event.inaxes is not self.ax:
+            index = None
+        else:
+            index = self.find_nearest(event.xdata, event.ydata)
+        if index == self.hovered:
+            return
+
+        self.hovered = index
+        if index is None:
+            self.tooltip.set_visible(False)
+        else:
+            x, y = self.points.get_point(index)
+            self.tooltip.xy = (x, y)
+            self.tooltip.set_text("({:.3f}, {:.3f})".format(x, y))
+            self.tooltip.set_visible(True)
+        self.blit_animated()
+
+    def on_key(self, event):
+        if event.key == "ctrl+z":
+            self.undo()
+        elif event.key in ("ctrl+y", "ctrl+shift+z", "ctrl+Z"):
+            self.redo()
 
     def disconnect_on_click_clb(self):
-        """ Disconnects on_click callback from the figure.
+        """ Disconnects on_click callback (and the draw, motion and key callbacks) from the figure.
 
-        The callback should be disconnected from the figure when the plot is closed.
+        The callbacks should be disconnected from the figure when the plot is closed.
         """
 
         self.fig.canvas.mpl_disconnect(self.cid)
+        self.fig.canvas.mpl_disconnect(self.draw_cid)
+        self.fig.canvas.mpl_disconnect(self.motion_cid)
+        self.fig.canvas.mpl_disconnect(self.key_cid)
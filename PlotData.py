@@ -1,5 +1,5 @@
 from tkinter import *
-from Plot import Point
+from VirtualListBox import VirtualListBox
 
 
 class PlotData(LabelFrame):
@@ -9,9 +9,10 @@ class PlotData(LabelFrame):
     This class inherits from LabelFrame so instances of this class are considered to be widgets.
     All the data stored inside an instance of this class is related to only one plot.
     This class' dataset consists of the following data related to the plot: points
-    and alpha and beta coefficients of the best fitting line.
-    The alpha and beta coefficients will be displayed as labels
-    and the points will be displayed as entries inside a listbox.
+    alpha and beta coefficients of the best fitting line and its goodness of fit.
+    The alpha and beta coefficients and the goodness of fit will be displayed as labels
+    and the points will be displayed as entries inside a virtual list box,
+    which formats only the visible rows, so it can display millions of points.
 
     Attributes
     ----------
@@ -21,29 +22,50 @@ class PlotData(LabelFrame):
         The width of a PlotData widget
     parent :
         The parent window (or widget)
-    points : list
+    points : PointStore
         The points of the plot
+        When the widget displays the data of a Plot, this is the same store as the plot's points.
+        It is None until the first point is added (or the widget is reset with a store),
+        so numpy isn't imported before it is needed.
+    owns_points : bool
+        True if the store was created by this widget, False if it was given to reset by its owner (a Plot)
+        The points of a store owned by someone else are added by the owner, so add_points only displays them.
     alpha (default = None) : double
         The alpha coefficient of the best fitting line
     beta (default = None) : double
         The beta coefficient of the best fitting line
+    fit_stats (default = None) : FitStats
+        The goodness of fit of the best fitting line (R^2, RSE and the standard errors of alpha and beta)
     alpha_label : Label
         A label which displays the value of alpha attribute
     beta_label : Label
         A label which displays the value of beta attribute
+    stats_label : Label
+        A label which displays the goodness of fit
     points_label : Label
         A label which displays the number of points in the dataset
-    points_list_box : ListBox
-        The list box which contains the points in the dataset
+    points_list_box : VirtualListBox
+        The list box which displays the points in the dataset
     points_scrollbar : Scrollbar
         The scrollbar used to scroll through the points entries inside points_list_box
 
     Methods
     -------
     update_data(x, y, alpha, beta)
-        Adds a new point and updates the alpha and beta attributes.
+        Adds a new point and updates the alpha and beta attributes (a batch of one point).
+    update_data_batch(xs, ys, alpha, beta, fit_stats=None)
+        Adds a batch of new points and updates the coefficients with a single refresh of every widget.
+        If the store is shared with a plot, the points were already added by the plot, so they are only displayed.
     add_point(x, y)
         Adds a new point to the data
+    add_points(xs, ys)
+        Adds a batch of new points to the data and refreshes the list box and points label once
+    refresh_points()
+        Updates the points label and list box after the points store was changed by its owner
+    get_point_string(index)
+        Returns the text displayed for the point with the given index
+    get_points_count()
+        Returns the number of points in the dataset
     get_alpha()
         Returns the alpha attribute
     set_alpha(alpha)
@@ -52,6 +74,14 @@ class PlotData(LabelFrame):
         Returns the beta attribute
     set_beta()
         Updates the beta attribute
+    set_coefs(alpha, beta, fit_stats=None)
+        Updates the alpha, beta and fit_stats attributes and their labels (each label once).
+    get_fit_stats()
+        Returns the fit_stats attribute
+    set_fit_stats(fit_stats)
+        Updates the fit_stats attribute
+    get_stats_string()
+        Returns the text displayed by stats_label
     get_coef_string(coef)
         A static method which returns "undefined" if coef is None, str(coef) otherwise.
     create_alpha_label()
@@ -62,16 +92,20 @@ class PlotData(LabelFrame):
         Returns the label which displays the beta attribute value
     update_beta_label()
         Updates the value displayed in beta_label
+    create_stats_label()
+        Returns the label which displays the goodness of fit
+    update_stats_label()
+        Updates the value displayed in stats_label
     create_points_label()
         Returns the label which displays the number of points in the dataset
     update_points_label()
         Updates the value displayed in points_label
     create_points_list_box()
-        Returns the list box which contains the points
+        Returns the virtual list box which displays the points
         and the scrollbar which is used to croll through the list box entries.
-    reset()
-        Resets the alpha and beta attributes' values to None
-        and deletes all the points from the dataset and from the points list box.
+    reset(points)
+        Resets the alpha, beta and fit_stats attributes' values to None
+        and replaces the points store with the given (shared) one (or with None, which means no points).
     """
 
     HEIGHT = 300
@@ -91,27 +125,51 @@ class PlotData(LabelFrame):
 
         self.parent = parent
 
-        self.points = []
+        self.points = None
+        self.owns_points = True
         self.alpha = None
         self.beta = None
+        self.fit_stats = None
 
         self.alpha_label = self.create_alpha_label()
         self.beta_label = self.create_beta_label()
+        self.stats_label = self.create_stats_label()
 
         self.points_label = self.create_points_label()
         self.points_list_box, self.points_scrollbar = self.create_points_list_box()
 
     def update_data(self, x, y, alpha, beta):
-        self.add_point(x, y)
-        self.set_alpha(alpha)
-        self.set_beta(beta)
+        self.update_data_batch((x,), (y,), alpha, beta)
+
+    def update_data_batch(self, xs, ys, alpha, beta, fit_stats=None):
+        self.add_points(xs, ys)
+        self.set_coefs(alpha, beta, fit_stats)
 
     def add_point(self, x, y):
-        self.points.append(Point(x, y))
-        crt_len = len(self.points)
-        self.points_list_box.insert(END, f"Point no.{crt_len}: " + "({:.3f}, {:.3f})".format(x, y))
+        self.add_points((x,), (y,))
+
+    def add_points(self, xs, ys):
+        if self.points is None:
+            from PointStore import PointStore
+            self.points = PointStore()
+            self.owns_points = True
+        if self.owns_points:
+            if len(xs) == 1:
+                self.points.append(xs[0], ys[0])
+            else:
+                self.points.extend(xs, ys)
+        self.refresh_points()
+
+    def refresh_points(self):
+        self.points_list_box.refresh()
         self.update_points_label()
 
+    def get_points_count(self):
+        return len(self.points) if self.points is not None else 0
+
+    def get_point_string(self, index):
+        return f"Point no.{index + 1}: " + "({:.3f}, {:.3f})".format(*self.points.get_point(index))
+
     def get_alpha(self):
         return self.alpha
 
@@ -126,6 +184,18 @@ class PlotData(LabelFrame):
         self.beta = beta
         self.update_beta_label()
 
+    def set_coefs(self, alpha, beta, fit_stats=None):
+        self.set_alpha(alpha)
+        self.set_beta(beta)
+        self.set_fit_stats(fit_stats)
+
+    def get_fit_stats(self):
+        return self.fit_stats
+
+    def set_fit_stats(self, fit_stats):
+        self.fit_stats = fit_stats
+        self.update_stats_label()
+
     @staticmethod
     def get_coef_string(coef):
         if coef is None:
@@ -149,32 +219,51 @@ class PlotData(LabelFrame):
     def update_beta_label(self):
         self.beta_label["text"] = f"Beta: " + self.get_coef_string(self.beta)
 
+    def get_stats_string(self):
+        if self.fit_stats is None:
+            return "R^2: undefined\nRSE: undefined"
+
+        r2, rse, se_alpha, se_beta = self.fit_stats
+        return (f"R^2: {r2:.4f}   RSE: " + self.get_coef_string(rse) +
+                "\nSE(alpha): " + self.get_coef_string(se_alpha) + "   SE(beta): " + self.get_coef_string(se_beta))
+
+    def create_stats_label(self):
+        stats_label = Label(self, text=self.get_stats_string(), bg="white", justify=LEFT)
+        stats_label.place(x=130, y=5)
+        return stats_label
+
+    def update_stats_label(self):
+        self.stats_label["text"] = self.get_stats_string()
+
     def create_points_label(self):
-        points_label = Label(self, text=f"There are {len(self.points)} points in this plot:", bg="white")
+        points_label = Label(self, text=f"There are {self.get_points_count()} points in this plot:", bg="white")
         points_label.place(x=5, y=55)
         return points_label
 
     def update_points_label(self):
         label_singular = "There is 1 point in this plot:"
-        label_plural = f"There are {len(self.points)} points in this plot:"
-        self.points_label["text"] = label_singular if len(self.points) == 1 else label_plural
+        label_plural = f"There are {self.get_points_count()} points in this plot:"
+        self.points_label["text"] = label_singular if self.get_points_count() == 1 else label_plural
 
     def create_points_list_box(self):
         points_scrollbar = Scrollbar(self, orient=VERTICAL, width=16)
         points_scrollbar.place(x=310, y=75)
 
-        points_list_box = Listbox(self, width=50, height=10, yscrollcommand=points_scrollbar.set)
-        points_scrollbar.config(command=points_list_box.yview)
+        points_list_box = VirtualListBox(self, self.get_points_count, self.get_point_string, points_scrollbar,
+                                         width=50, height=10)
 
         points_list_box.place(x=5, y=75)
         return points_list_box, points_scrollbar
 
-    def reset(self):
-        self.points_list_box.delete(0, END)
-        self.points = []
+    def reset(self, points=None):
+        self.points = points
+        # A store given by its owner is shared, so its points are never added here
+        self.owns_points = points is None
+        self.points_list_box.scroll_to(0)
         self.update_points_label()
         self.set_alpha(None)
         self.set_beta(None)
+        self.set_fit_stats(None)
 
 
 if __name__ == "__main__":
@@ -184,7 +273,6 @@ if __name__ == "__main__":
     PltData = PlotData(root, height=PlotData.HEIGHT, width=PlotData.WIDTH, text="Plot data: ")
     PltData.set_alpha(20)
     PltData.set_beta(1)
-    for i in range(100):
-        PltData.update_data(i, i, 0, 1)
+    PltData.update_data_batch(range(100), range(100), 0, 1)
     PltData.place(x=5, y=5)
     root.mainloop()
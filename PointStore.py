@@ -0,0 +1,406 @@
+import numpy as np
+
+
+class Point:
+    """ A class used to represent a point
+
+    A Point is a lightweight view of one row of a PointStore: it holds only a reference
+    to the store and the row index, and its coordinates are read from the store on access.
+
+    Attributes
+    ----------
+    store : PointStore
+        The store which contains the point
+    index : int
+        The index of the point inside the store
+    x : double
+        the x coordinate of the point
+    y : double
+        the y coordinate of the point
+
+    Methods
+    -------
+    get_x()
+        Returns the x attribute
+    get_y()
+        Returns the y attribute
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        """
+        Parameters
+        ----------
+        store : PointStore
+            The store which contains the point
+        index : int
+            The index of the point inside the store
+        """
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self):
+        return self.store.get_point(self.index)[0]
+
+    @property
+    def y(self):
+        return self.store.get_point(self.index)[1]
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+
+class PointStore:
+    """
+    A growable store of points, kept as two contiguous float64 columns
+
+    Storing every point as a Python object costs 100+ bytes per point, while this store needs
+    only 16 bytes per point (plus the unused capacity). The columns are doubled when they get full,
+    so appending a point is amortized O(1). The same store is shared by a Plot and its PlotData,
+    which read the coordinates through the xs and ys views, without copying them.
+
+    Attributes
+    ----------
+    x_col : numpy.ndarray
+        The x column, whose first size values are the x coordinates of the points
+    y_col : numpy.ndarray
+        The y column, whose first size values are the y coordinates of the points
+    size : int
+        The number of points in the store
+    xs : numpy.ndarray
+        A (read-only) view of the x coordinates of the points
+    ys : numpy.ndarray
+        A (read-only) view of the y coordinates of the points
+    nbytes : int
+        The number of bytes used by the columns
+    offsets : numpy.ndarray
+        A reusable (capacity, 2) copy of the points, whose first offsets_size rows are up to date
+        It is filled only with the points added since the last call of get_offsets, so drawing the points
+        after every click doesn't copy the whole store again.
+    offsets_size : int
+        The number of rows of offsets which match the columns
+
+    Methods
+    -------
+    from_arrays(xs, ys)
+        A class method which returns a store that uses the given arrays as its columns (without copying them).
+    reserve(capacity)
+        Makes sure that the columns can hold at least capacity points (and that they are writable).
+    append(x, y)
+        Adds a new point to the store.
+    extend(xs, ys)
+        Adds a batch of points to the store.
+    remove(index)
+        Deletes the point with the given index in O(1), by moving the last point into its place.
+    reinsert(index, x, y)
+        Undoes remove(index): moves the point at index back to the end and puts (x, y) back at index.
+    set_size(size)
+        Cuts the store to its first size points in O(1).
+    clear()
+        Deletes all the points from the store.
+    get_point(index)
+        Returns the coordinates (x, y) of the point with the given index.
+    get_offsets()
+        Returns the points as an (n, 2) array (used by matplotlib collections).
+        This is a view of the offsets buffer, which is valid until the store is changed.
+    """
+
+    def __init__(self, capacity=16):
+        self.x_col = np.empty(capacity)
+        self.y_col = np.empty(capacity)
+        self.size = 0
+        self.offsets = np.empty((0, 2))
+        self.offsets_size = 0
+
+    @classmethod
+    def from_arrays(cls, xs, ys):
+        """ Returns a store that uses the given arrays (for example read-only memory maps) as its columns.
+
+        The arrays aren't copied until the first point is added to the store.
+        """
+
+        if len(xs) != len(ys):
+            raise ValueError(f"xs and ys must have the same length ({len(xs)} != {len(ys)})")
+        store = cls(0)
+        store.x_col = xs
+        store.y_col = ys
+        store.size = len(xs)
+        return store
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("point index out of range")
+        return Point(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield Point(self, index)
+
+    @property
+    def xs(self):
+        return self.x_col[:self.size]
+
+    @property
+    def ys(self):
+        return self.y_col[:self.size]
+
+    @property
+    def nbytes(self):
+        return self.x_col.nbytes + self.y_col.nbytes
+
+    def reserve(self, capacity):
+        if capacity <= len(self.x_col) and self.x_col.flags.writeable and self.y_col.flags.writeable:
+            return
+
+        new_capacity = max(capacity, 2 * len(self.x_col))
+        for name in ("x_col", "y_col"):
+            col = np.empty(new_capacity)
+            col[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, col)
+
+    def append(self, x, y):
+        if self.size == len(self.x_col) or not self.x_col.flags.writeable:
+            self.reserve(self.size + 1)
+        self.x_col[self.size] = x
+        self.y_col[self.size] = y
+        self.size += 1
+
+    def extend(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        ys = np.asarray(ys, dtype=np.float64).ravel()
+        if xs.shape != ys.shape:
+            raise ValueError(f"xs and ys must have the same length ({xs.size} != {ys.size})")
+
+        self.reserve(self.size + xs.size)
+        self.x_col[self.size:self.size + xs.size] = xs
+        self.y_col[self.size:self.size + xs.size] = ys
+        self.size += xs.size
+
+    def remove(self, index):
+        self.reserve(self.size)
+        last = self.size - 1
+        self.x_col[index] = self.x_col[last]
+        self.y_col[index] = self.y_col[last]
+        self.size = last
+        if index < min(self.offsets_size, last):
+            self.offsets[index] = self.x_col[index], self.y_col[index]
+        self.offsets_size = min(self.offsets_size, last)
+
+    def reinsert(self, index, x, y):
+        if index == self.size:
+            self.append(x, y)
+            return
+
+        self.append(self.x_col[index], self.y_col[index])
+        self.x_col[index] = x
+        self.y_col[index] = y
+        if index < self.offsets_size:
+            self.offsets[index] = x, y
+
+    def set_size(self, size):
+        """ Deletes the points past the first size points without touching the columns.
+
+        The slots of the deleted points are reused by the next points which are added, so whoever needs
+        the deleted points back has to copy them first.
+        """
+
+        if not 0 <= size <= self.size:
+            raise ValueError(f"the size must be between 0 and the number of points ({size})")
+        self.size = size
+        self.offsets_size = min(self.offsets_size, size)
+
+    def clear(self):
+        self.size = 0
+        self.offsets_size = 0
+
+    def get_point(self, index):
+        return float(self.x_col[index]), float(self.y_col[index])
+
+    def get_offsets(self):
+        if len(self.offsets) < self.size:
+            offsets = np.empty((max(self.size, 2 * len(self.offsets)), 2))
+            offsets[:self.offsets_size] = self.offsets[:self.offsets_size]
+            self.offsets = offsets
+        # Only the points added since the last call are copied
+        self.offsets[self.offsets_size:self.size, 0] = self.x_col[self.offsets_size:self.size]
+        self.offsets[self.offsets_size:self.size, 1] = self.y_col[self.offsets_size:self.size]
+        self.offsets_size = self.size
+        return self.offsets[:self.size]
+
+
+class RingPointStore(PointStore):
+    """
+    A circular store of points, whose oldest points can be removed in O(1)
+
+    It is used for sliding windows over endless streams of points: the memory used by the store
+    depends only on the number of points inside the window. Every point also has a timestamp,
+    which is used by time-based windows. The logical index 0 is always the oldest point.
+
+    Attributes
+    ----------
+    x_col, y_col, size :
+        The same as in PointStore, but the points are stored circularly, starting at head
+    t_col : numpy.ndarray
+        The timestamps of the points (non-decreasing from the oldest to the newest point)
+    head : int
+        The position of the oldest point inside the columns
+    max_size (default = None) : int
+        The maximum number of points in the store
+        When the store is full, appending a point deletes the oldest one.
+        If it is None, the columns grow like the ones of a PointStore.
+    xs, ys, ts : numpy.ndarray
+        The coordinates and the timestamps of the points, from the oldest to the newest
+        Unlike the xs and ys of a PointStore, these are copies if the points wrap around the end of the columns.
+
+    Methods
+    -------
+    The same as in PointStore, except from_arrays, remove, reinsert and set_size, which raise a TypeError
+    (only the oldest points can be deleted, and the points don't start at the beginning of the columns), plus:
+    pop_oldest(count)
+        Deletes the oldest count points and returns their coordinates (xs, ys).
+    count_older_than(t)
+        Returns the number of points whose timestamp is smaller than t (in O(log n)).
+    get_offsets()
+        Returns a new (n, 2) array of the points (evicting the oldest point shifts all of them,
+        so the offsets buffer of a PointStore isn't used).
+    """
+
+    def __init__(self, capacity=16, max_size=None):
+        # PointStore.__init__ isn't called, since the offsets buffer isn't used
+        capacity = capacity if max_size is None else max_size
+        self.x_col = np.empty(capacity)
+        self.y_col = np.empty(capacity)
+        self.t_col = np.empty(capacity)
+        self.size = 0
+        self.head = 0
+        self.max_size = max_size
+
+    @classmethod
+    def from_arrays(cls, xs, ys):
+        raise TypeError("a RingPointStore can't use the given arrays as its columns (they have no timestamps)")
+
+    def get_slices(self):
+        """ Returns the (at most two) slices of the columns which contain the points, from the oldest to the newest. """
+
+        end = self.head + self.size
+        capacity = len(self.x_col)
+        if end <= capacity:
+            return [slice(self.head, end)]
+        return [slice(self.head, capacity), slice(0, end - capacity)]
+
+    def get_column(self, col):
+        slices = self.get_slices()
+        if len(slices) == 1:
+            return col[slices[0]]
+        return np.concatenate([col[part] for part in slices])
+
+    @property
+    def xs(self):
+        return self.get_column(self.x_col)
+
+    @property
+    def ys(self):
+        return self.get_column(self.y_col)
+
+    @property
+    def ts(self):
+        return self.get_column(self.t_col)
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.t_col.nbytes
+
+    def reserve(self, capacity):
+        if capacity <= len(self.x_col):
+            return
+
+        new_capacity = max(capacity, 2 * len(self.x_col))
+        for name in ("x_col", "y_col", "t_col"):
+            col = np.empty(new_capacity)
+            col[:self.size] = self.get_column(getattr(self, name))
+            setattr(self, name, col)
+        self.head = 0
+
+    def append(self, x, y, t=0.0):
+        if self.max_size is not None and self.size == self.max_size:
+            self.pop_oldest(1)
+        elif self.size == len(self.x_col):
+            self.reserve(self.size + 1)
+
+        pos = (self.head + self.size) % len(self.x_col)
+        self.x_col[pos] = x
+        self.y_col[pos] = y
+        self.t_col[pos] = t
+        self.size += 1
+
+    def extend(self, xs, ys, ts=0.0):
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        ys = np.asarray(ys, dtype=np.float64).ravel()
+        if xs.shape != ys.shape:
+            raise ValueError(f"xs and ys must have the same length ({xs.size} != {ys.size})")
+        ts = np.broadcast_to(np.asarray(ts, dtype=np.float64), xs.shape)
+
+        if self.max_size is not None:
+            # Only the newest max_size points can be kept
+            xs, ys, ts = xs[-self.max_size:], ys[-self.max_size:], ts[-self.max_size:]
+            self.pop_oldest(max(0, self.size + xs.size - self.max_size))
+        else:
+            self.reserve(self.size + xs.size)
+
+        capacity = len(self.x_col)
+        start = (self.head + self.size) % capacity
+        first = min(xs.size, capacity - start)
+        for col, values in ((self.x_col, xs), (self.y_col, ys), (self.t_col, ts)):
+            col[start:start + first] = values[:first]
+            col[:xs.size - first] = values[first:]
+        self.size += xs.size
+
+    def pop_oldest(self, count):
+        count = min(count, self.size)
+        old_size = self.size
+        self.size = count
+        # Copy the points, because their place in the columns will be reused
+        xs, ys = np.array(self.xs), np.array(self.ys)
+
+        self.head = (self.head + count) % len(self.x_col)
+        self.size = old_size - count
+        return xs, ys
+
+    def remove(self, index):
+        raise TypeError("only the oldest points can be deleted from a RingPointStore (see pop_oldest)")
+
+    def reinsert(self, index, x, y):
+        raise TypeError("only the oldest points can be deleted from a RingPointStore (see pop_oldest)")
+
+    def set_size(self, size):
+        raise TypeError("only the oldest points can be deleted from a RingPointStore (see pop_oldest)")
+
+    def count_older_than(self, t):
+        count = 0
+        for part in self.get_slices():
+            older = int(np.searchsorted(self.t_col[part], t, side="left"))
+            count += older
+            if older < part.stop - part.start:
+                break
+        return count
+
+    def clear(self):
+        self.size = 0
+        self.head = 0
+
+    def get_point(self, index):
+        pos = (self.head + index) % len(self.x_col)
+        return float(self.x_col[pos]), float(self.y_col[pos])
+
+    def get_offsets(self):
+        return np.column_stack((self.xs, self.ys))
@@ -0,0 +1,308 @@
+import math
+import numpy as np
+from LinearRegression import FitStats, Z_95, t_quantile
+
+
+class LeastSquaresRegression:
+    """
+    An incremental multiple linear regression model, y = coef[0] * f0(x) + ... + coef[p-1] * fp-1(x)
+
+    The model keeps the Gram matrix X^T X and the vector X^T y of the feature rows X of the points,
+    which are updated with a rank-one addition (or removal) per point, plus a cached Cholesky factor L
+    of the Gram matrix (X^T X = L L^T). Adding or deleting a point updates (or downdates) L instead of
+    factoring the Gram matrix again, so a per-point update costs O(p^2), no matter how many points
+    there are. Batches update the Gram matrix with two matrix products and factor it once (O(p^3)).
+    The coefficients are undefined (None) until there are at least p points.
+    For reference: https://en.wikipedia.org/wiki/Cholesky_decomposition#Rank-one_update
+
+    Attributes
+    ----------
+    p : int
+        The number of features (and coefficients)
+    features (default = None) : function
+        A function which maps an array of m values of x to the (m, p) array of their feature rows
+        If it is None, every x is already a feature row (a sequence of p numbers).
+    n : int
+        The number of points in the dataset
+    gram : numpy.ndarray
+        The (p, p) Gram matrix X^T X
+    xty : numpy.ndarray
+        The vector X^T y
+    sy, sy2 : double
+        The sums of y and of y squared (used only by the goodness of fit statistics)
+    chol : numpy.ndarray
+        The lower triangular Cholesky factor of gram, or None if it has to be computed again
+    coef : numpy.ndarray
+        The coefficients of the fit (None if they are undefined)
+
+    Methods
+    -------
+    get_features(xs)
+        Returns the (m, p) array of the feature rows of the given values of x.
+    add_point(x, y), del_point(x, y)
+        Adds / deletes a point and updates the Cholesky factor and the coefficients in O(p^2).
+    add_points(xs, ys), del_points(xs, ys)
+        Adds / deletes a batch of points (the Cholesky factor is computed again, once).
+    merge(other)
+        Adds all the points of another model with the same features to this dataset.
+    update_chol(row, sign)
+        Updates (sign = 1) or downdates (sign = -1) the Cholesky factor with a feature row.
+    refresh_coef()
+        Solves the normal equations for the coefficients (or sets them to None).
+    get_coef()
+        Returns the coefficients.
+    get_alpha(), get_beta()
+        Return the first two coefficients (the intercept and the slope for a polynomial).
+    predict(xs)
+        Returns the fitted values of y for the given values of x.
+    get_inv_chol()
+        Returns the inverse of the Cholesky factor (used by the standard errors).
+    get_fit_stats()
+        Returns the goodness of fit (a FitStats tuple, se_alpha and se_beta are the standard errors
+        of the first two coefficients), or None if it is undefined.
+    get_band(xs, z)
+        Returns the lower and upper edges of the confidence band of the fitted curve at the given values of x.
+    reset()
+        Deletes all the points from the dataset.
+    """
+
+    def __init__(self, p, features=None):
+        self.p = p
+        self.features = features
+        self.n = 0
+        self.gram = np.zeros((p, p))
+        self.xty = np.zeros(p)
+        self.sy = 0.0
+        self.sy2 = 0.0
+        self.chol = None
+        self.coef = None
+
+    def get_features(self, xs):
+        xs = np.asarray(xs, dtype=np.float64)
+        if self.features is None:
+            return xs.reshape(-1, self.p)
+        return self.features(xs.ravel())
+
+    def get_row(self, x):
+        return self.get_features(np.atleast_1d(np.asarray(x, dtype=np.float64)))[0]
+
+    def add_point(self, x, y):
+        row = self.get_row(x)
+        self.n += 1
+        self.gram += np.outer(row, row)
+        self.xty += y * row
+        self.sy += y
+        self.sy2 += y * y
+        if self.chol is not None and not self.update_chol(row, 1):
+            self.chol = None
+
+        self.refresh_coef()
+
+    def del_point(self, x, y):
+        """ Deletes a (hopefully existing) point from the dataset. """
+
+        if self.n == 0:
+            return False
+
+        row = self.get_row(x)
+        self.n -= 1
+        self.gram -= np.outer(row, row)
+        self.xty -= y * row
+        self.sy -= y
+        self.sy2 -= y * y
+        if self.chol is not None and not self.update_chol(row, -1):
+            # The downdated matrix isn't positive definite (numerically), it is factored again when possible
+            self.chol = None
+
+        self.refresh_coef()
+        return True
+
+    def get_batch(self, xs, ys):
+        rows = self.get_features(xs)
+        ys = np.asarray(ys, dtype=np.float64).ravel()
+        if len(rows) != ys.size:
+            raise ValueError(f"xs and ys must have the same length ({len(rows)} != {ys.size})")
+        return rows, ys
+
+    def add_points(self, xs, ys):
+        rows, ys = self.get_batch(xs, ys)
+        if ys.size == 0:
+            return
+
+        self.n += ys.size
+        self.gram += rows.T @ rows
+        self.xty += rows.T @ ys
+        self.sy += float(ys.sum())
+        self.sy2 += float(np.dot(ys, ys))
+        # For a batch, one factorization (O(p^3)) is cheaper than a rank-one update (O(p^2)) per point
+        self.chol = None
+
+        self.refresh_coef()
+
+    def del_points(self, xs, ys):
+        rows, ys = self.get_batch(xs, ys)
+        if ys.size > self.n:
+            return False
+        if ys.size == 0:
+            return True
+
+        self.n -= ys.size
+        self.gram -= rows.T @ rows
+        self.xty -= rows.T @ ys
+        self.sy -= float(ys.sum())
+        self.sy2 -= float(np.dot(ys, ys))
+        self.chol = None
+
+        self.refresh_coef()
+        return True
+
+    def merge(self, other):
+        self.n += other.n
+        self.gram += other.gram
+        self.xty += other.xty
+        self.sy += other.sy
+        self.sy2 += other.sy2
+        self.chol = None
+
+        self.refresh_coef()
+        return self
+
+    def update_chol(self, row, sign):
+        """ Updates (sign = 1) or downdates (sign = -1) the Cholesky factor with a feature row in O(p^2).
+
+        After the call chol * chol^T = gram (with gram already changed by sign * row * row^T).
+        Returns False if a downdate fails, because the new matrix isn't positive definite.
+        """
+
+        chol = self.chol
+        row = np.array(row, dtype=np.float64)
+        for k in range(self.p):
+            diag = chol[k, k]
+            r2 = diag * diag + sign * row[k] * row[k]
+            if r2 <= 0:
+                return False
+
+            r = np.sqrt(r2)
+            c = r / diag
+            s = row[k] / diag
+            chol[k, k] = r
+            if k + 1 < self.p:
+                chol[k + 1:, k] = (chol[k + 1:, k] + sign * s * row[k + 1:]) / c
+                row[k + 1:] = c * row[k + 1:] - s * chol[k + 1:, k]
+        return True
+
+    def refresh_coef(self):
+        if self.n < self.p:
+            self.coef = None
+            return
+
+        if self.chol is None:
+            try:
+                self.chol = np.linalg.cholesky(self.gram)
+            except np.linalg.LinAlgError:
+                # The features of the points are linearly dependent (for example all the x values are equal)
+                self.coef = None
+                return
+
+        # Solve L z = X^T y and L^T coef = z by forward and back substitution (O(p^2))
+        chol = self.chol
+        z = np.empty(self.p)
+        for i in range(self.p):
+            z[i] = (self.xty[i] - chol[i, :i] @ z[:i]) / chol[i, i]
+        coef = np.empty(self.p)
+        for i in range(self.p - 1, -1, -1):
+            coef[i] = (z[i] - chol[i + 1:, i] @ coef[i + 1:]) / chol[i, i]
+        self.coef = coef
+
+    def get_coef(self):
+        return self.coef
+
+    def get_alpha(self):
+        return float(self.coef[0]) if self.coef is not None else None
+
+    def get_beta(self):
+        return float(self.coef[1]) if self.coef is not None and self.p > 1 else None
+
+    def predict(self, xs):
+        if self.coef is None:
+            return None
+        return self.get_features(xs) @ self.coef
+
+    def get_inv_chol(self):
+        return np.linalg.inv(self.chol)
+
+    def get_fit_stats(self):
+        """ Returns the goodness of fit (a FitStats tuple), or None if there are at most p points.
+
+        The residual sum of squares of the least squares fit is sum(y^2) - coef . X^T y, so the statistics
+        are computed from the Gram matrix and the sums of y, without looking at the points (O(p^3)).
+        """
+
+        if self.coef is None or self.n <= self.p:
+            return None
+
+        syy = self.sy2 - self.sy * self.sy / self.n
+        sse = max(self.sy2 - float(self.coef @ self.xty), 0.0)
+        r2 = 1 - sse / syy if syy > 0 else 1.0
+        rse = math.sqrt(sse / (self.n - self.p))
+        # The diagonal of the inverse of the Gram matrix L L^T
+        se = rse * np.sqrt((self.get_inv_chol() ** 2).sum(axis=0))
+        return FitStats(r2, rse, float(se[0]), float(se[1]) if self.p > 1 else None)
+
+    def get_band(self, xs, z=Z_95):
+        stats = self.get_fit_stats()
+        if stats is None:
+            return None
+
+        rows = self.get_features(xs)
+        ys = rows @ self.coef
+        # The variance of the fitted value at x is rse^2 * f(x)^T (L L^T)^-1 f(x) = rse^2 * |L^-1 f(x)|^2
+        half = t_quantile(self.n - self.p, z) * stats.rse * np.sqrt(((rows @ self.get_inv_chol().T) ** 2).sum(axis=1))
+        return ys - half, ys + half
+
+    def reset(self):
+        self.n = 0
+        self.gram[:] = 0
+        self.xty[:] = 0
+        self.sy = 0.0
+        self.sy2 = 0.0
+        self.chol = None
+        self.coef = None
+
+
+class PolynomialRegression(LeastSquaresRegression):
+    """
+    An incremental polynomial regression model, y = coef[0] + coef[1] * x + ... + coef[degree] * x^degree
+
+    The features of a point are the powers of its x coordinate. The powers of large x values make
+    the Gram matrix badly conditioned, so shift the x coordinates near 0 first (like x - x0) if they
+    carry a large offset.
+
+    Attributes
+    ----------
+    degree (default = 2) : int
+        The degree of the polynomial
+    p, n, gram, xty, chol, coef :
+        The same as in LeastSquaresRegression (p = degree + 1)
+
+    Methods
+    -------
+    The same as in LeastSquaresRegression.
+    """
+
+    def __init__(self, degree=2):
+        super().__init__(degree + 1)
+        self.degree = degree
+
+    def get_features(self, xs):
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        return np.power.outer(xs, np.arange(self.p))
+
+
+if __name__ == "__main__":
+    poly = PolynomialRegression(2)
+    for x in range(-5, 6):
+        poly.add_point(x, 1 + 2 * x + 3 * x * x)
+    print(poly.get_coef())
+    poly.del_point(5, 86)
+    print(poly.get_coef(), poly.predict([0, 1, 2]))
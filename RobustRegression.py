@@ -0,0 +1,231 @@
+import numpy as np
+from LinearRegression import LinearRegression, StableLinearRegression
+from PointStore import PointStore
+
+
+class RobustLinearRegression(LinearRegression):
+    """
+    The base class of the linear regression models which aren't thrown off by outliers
+
+    A few outliers can move the OLS line (see LinearRegression) arbitrarily far, while robust estimators
+    ignore them. Robust estimators can't be updated incrementally, so these models keep a copy of the
+    points and fit them again (with fit) every time the points change. Every fit is vectorized and
+    looks at a bounded random sample of point pairs, so it costs O(n) with a small constant
+    (a few milliseconds per 10^5 points). The random generator is seeded again before every fit,
+    so the same points always give the same line. The OLS sums of LinearRegression are kept too.
+
+    Attributes
+    ----------
+    alpha, beta, n, sx, sy, sxy, sx2 :
+        The same as in LinearRegression, but alpha and beta are the robust estimates
+    points : PointStore
+        The points of the dataset
+    seed (default = 0) : int
+        The seed of the random generator used by fit
+
+    Methods
+    -------
+    The same as in LinearRegression, plus:
+    find_point(x, y)
+        Returns the index of a point with the coordinates (x, y) inside points, or None.
+    find_rest(xs, ys)
+        Returns the mask of the points left after deleting the given points, or None if some of them are missing.
+    fit(xs, ys, rng)
+        Returns the robust estimates (alpha, beta) for the given points (implemented by the subclasses).
+    get_fit_stats()
+        The OLS statistics don't describe a robust line, so this always returns None.
+    """
+
+    def __init__(self, seed=0):
+        super().__init__()
+        self.points = PointStore()
+        self.seed = seed
+
+    def update_coef(self):
+        self.alpha, self.beta = self.fit(self.points.xs, self.points.ys, np.random.default_rng(self.seed))
+
+    def fit(self, xs, ys, rng):
+        raise NotImplementedError
+
+    def find_point(self, x, y):
+        found = np.flatnonzero((self.points.xs == x) & (self.points.ys == y))
+        return int(found[0]) if found.size else None
+
+    def add_point(self, x, y):
+        self.points.append(x, y)
+        super().add_point(x, y)
+
+    def del_point(self, x, y):
+        index = self.find_point(x, y)
+        if index is None:
+            return False
+
+        self.points.remove(index)
+        return super().del_point(x, y)
+
+    def add_points(self, xs, ys):
+        xs, ys = self.as_columns(xs, ys)
+        self.points.extend(xs, ys)
+        super().add_points(xs, ys)
+
+    def del_points(self, xs, ys):
+        xs, ys = self.as_columns(xs, ys)
+        start = len(self.points) - xs.size
+        if start >= 0 and np.array_equal(self.points.xs[start:], xs) and np.array_equal(self.points.ys[start:], ys):
+            # The points are the last ones which were added (like an undone import), so they are just cut off
+            self.points.set_size(start)
+            return super().del_points(xs, ys)
+
+        keep = self.find_rest(xs, ys)
+        if keep is None:
+            return False
+
+        kept_xs, kept_ys = self.points.xs[keep], self.points.ys[keep]
+        self.points.clear()
+        self.points.extend(kept_xs, kept_ys)
+        return super().del_points(xs, ys)
+
+    def find_rest(self, xs, ys):
+        """ Returns the mask of the points which are left after deleting one copy of every given point, or None.
+
+        The points are matched by sorting them as complex numbers x + iy, so this takes O(n log n)
+        instead of looking for every deleted point separately.
+        """
+
+        stored = self.points.xs + 1j * self.points.ys
+        order = np.argsort(stored, kind="stable")
+        stored = stored[order]
+        deleted = np.sort(xs + 1j * ys)
+        # The k-th copy of a deleted point is matched with the k-th copy of the stored point
+        copy = np.arange(deleted.size) - np.searchsorted(deleted, deleted, side="left")
+        found = np.searchsorted(stored, deleted, side="left") + copy
+        if found.size and (found.max() >= stored.size or not np.array_equal(stored[found], deleted)):
+            return None
+
+        keep = np.ones(stored.size, dtype=bool)
+        keep[order[found]] = False
+        return keep
+
+    def merge(self, other):
+        self.points.extend(other.points.xs, other.points.ys)
+        return super().merge(other)
+
+    def get_fit_stats(self):
+        return None
+
+    def set_state(self, state):
+        raise ValueError("the state of a robust model doesn't describe its points")
+
+    def reset(self):
+        self.points.clear()
+        # set_state is refused by robust models, but the state of no points describes them
+        LinearRegression.set_state(self, (0, 0, 0, 0, 0, 0))
+
+
+class TheilSenRegression(RobustLinearRegression):
+    """
+    The Theil-Sen estimator: the slope is the median of the slopes of the lines through pairs of points
+
+    The exact estimator looks at all the n * (n - 1) / 2 pairs of points, which is O(n^2).
+    This one looks at all the pairs only if there are at most MAX_PAIRS of them, otherwise
+    it takes the median of the slopes of MAX_PAIRS random pairs, whose rank error is about
+    1 / sqrt(MAX_PAIRS) (0.2% for the default). The intercept is the median of y - beta * x.
+    It tolerates up to ~29% of outliers.
+    For reference: https://en.wikipedia.org/wiki/Theil%E2%80%93Sen_estimator
+
+    Attributes
+    ----------
+    MAX_PAIRS : 200000
+        The maximum number of pairs of points whose slopes are computed by a fit
+    The others are the same as in RobustLinearRegression.
+    """
+
+    MAX_PAIRS = 200_000
+
+    def fit(self, xs, ys, rng):
+        n = xs.size
+        if n * (n - 1) // 2 <= TheilSenRegression.MAX_PAIRS:
+            first, second = np.triu_indices(n, 1)
+        else:
+            first = rng.integers(0, n, TheilSenRegression.MAX_PAIRS)
+            second = rng.integers(0, n, TheilSenRegression.MAX_PAIRS)
+
+        dx = xs[second] - xs[first]
+        valid = dx != 0
+        if not valid.any():
+            return None, None
+
+        beta = float(np.median((ys[second] - ys[first])[valid] / dx[valid]))
+        alpha = float(np.median(ys - beta * xs))
+        return alpha, beta
+
+
+class RansacRegression(RobustLinearRegression):
+    """
+    A vectorized RANSAC estimator
+
+    MAX_TRIALS candidate lines are drawn through random pairs of points of a random sample of at most
+    SAMPLE_SIZE points, and all the candidates are scored against the sample at once (as a single
+    MAX_TRIALS x SAMPLE_SIZE array of residuals). The best candidate is the one with the smallest
+    median absolute residual (or the most inliers, if residual_threshold is given). Finally, the points
+    whose residuals are below the threshold (2.5 robust standard deviations of the best candidate's
+    residuals, by default) are fitted with OLS.
+    For reference: https://en.wikipedia.org/wiki/Random_sample_consensus
+
+    Attributes
+    ----------
+    MAX_TRIALS : 256
+        The number of candidate lines
+    SAMPLE_SIZE : 4096
+        The maximum number of points used to score the candidates
+    residual_threshold (default = None) : double
+        The maximum absolute residual of an inlier (None to derive it from the residuals)
+    The others are the same as in RobustLinearRegression.
+    """
+
+    MAX_TRIALS = 256
+    SAMPLE_SIZE = 4096
+
+    def __init__(self, seed=0, residual_threshold=None):
+        super().__init__(seed)
+        self.residual_threshold = residual_threshold
+
+    def fit(self, xs, ys, rng):
+        n = xs.size
+        if n <= RansacRegression.SAMPLE_SIZE:
+            sample_xs, sample_ys = xs, ys
+        else:
+            sample = rng.integers(0, n, RansacRegression.SAMPLE_SIZE)
+            sample_xs, sample_ys = xs[sample], ys[sample]
+
+        first, second = rng.integers(0, sample_xs.size, (2, RansacRegression.MAX_TRIALS))
+        dx = sample_xs[second] - sample_xs[first]
+        valid = dx != 0
+        if not valid.any():
+            return None, None
+        first, second, dx = first[valid], second[valid], dx[valid]
+        betas = (sample_ys[second] - sample_ys[first]) / dx
+        alphas = sample_ys[first] - betas * sample_xs[first]
+
+        residuals = np.abs(sample_ys - alphas[:, None] - betas[:, None] * sample_xs)
+        if self.residual_threshold is None:
+            scores = np.median(residuals, axis=1)
+            best = int(np.argmin(scores))
+            # 1.4826 * median absolute residual estimates the standard deviation of normal residuals
+            threshold = 2.5 * 1.4826 * scores[best]
+        else:
+            best = int(np.argmax(np.count_nonzero(residuals <= self.residual_threshold, axis=1)))
+            threshold = self.residual_threshold
+
+        inliers = np.abs(ys - alphas[best] - betas[best] * xs) <= threshold
+        inlier_xs = xs[inliers]
+        if inlier_xs.size < 2 or inlier_xs.min() == inlier_xs.max():
+            # OLS can't fit the inliers, so the best candidate is kept
+            return float(alphas[best]), float(betas[best])
+
+        # The inliers of offset data (e.g. timestamps) would lose their spread in the raw sums of LinearRegression
+        ols = StableLinearRegression()
+        ols.add_points(inlier_xs, ys[inliers])
+        if ols.get_beta() is None:
+            return float(alphas[best]), float(betas[best])
+        return ols.get_alpha(), ols.get_beta()
@@ -0,0 +1,112 @@
+"""
+Binary session files (.lrs)
+
+A session file stores everything needed to reopen a plot: the points, the kind and the state
+of the LinearRegression model (its sums or moments, so the fit is restored without refitting)
+and the axes limits. A robust model (Theil-Sen or RANSAC) can't be restored from its sums,
+so it is fitted again on the saved points when the session is loaded.
+
+File layout (little-endian):
+    bytes 0-103    : header (see HEADER), padded with zeros up to DATA_OFFSET
+    DATA_OFFSET    : n float64 x coordinates
+    followed by    : n float64 y coordinates
+
+On load the coordinates are memory-mapped instead of being read, so opening a session
+takes about the same time no matter how many points it contains.
+
+Version 1 files (whose header has no sum of y squared) are still loaded: the missing
+value is computed from the y coordinates, once.
+"""
+
+import struct
+from collections import namedtuple
+import numpy as np
+from LinearRegression import LinearRegression, StableLinearRegression
+from RobustRegression import RobustLinearRegression, TheilSenRegression, RansacRegression
+
+MAGIC = b"LRSESS\x00\x00"
+VERSION = 2
+# magic, version, model index, number of points, model state (6 values), xlim (2 values), ylim (2 values)
+HEADER = struct.Struct("<8sIIQ6d2d2d")
+HEADER_V1 = struct.Struct("<8sIIQ5d2d2d")
+DATA_OFFSET = 128
+# The index of the model's class is saved in the header (version 1 files have only the first two)
+MODELS = (LinearRegression, StableLinearRegression, TheilSenRegression, RansacRegression)
+FILE_TYPES = [("Linear regression sessions", "*.lrs"), ("All files", "*.*")]
+
+Session = namedtuple("Session", ["xs", "ys", "lin_reg", "xlim", "ylim"])
+
+
+def save_session(path, xs, ys, lin_reg, xlim, ylim):
+    """ Saves a session to a binary file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the session file
+    xs, ys : numpy.ndarray
+        The coordinates of the points
+    lin_reg : LinearRegression
+        The linear regression model fitted on the points (one of MODELS)
+    xlim, ylim : tuple
+        The axes limits
+
+    Raises ValueError if the model can't be saved.
+    """
+
+    if type(lin_reg) not in MODELS:
+        raise ValueError(f"a {type(lin_reg).__name__} model can't be saved in a session")
+    header = HEADER.pack(MAGIC, VERSION, MODELS.index(type(lin_reg)), len(xs),
+                         *lin_reg.get_state(), *xlim, *ylim)
+    with open(path, "wb") as f:
+        f.write(header.ljust(DATA_OFFSET, b"\x00"))
+        np.asarray(xs, dtype="<f8").tofile(f)
+        np.asarray(ys, dtype="<f8").tofile(f)
+
+
+def load_session(path):
+    """ Loads a session saved by save_session.
+
+    The returned xs and ys are read-only memory maps of the file.
+    Raises ValueError if the file isn't a valid session file.
+    """
+
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER_V1.size:
+        raise ValueError(f"{path} is not a session file")
+
+    magic, version = struct.unpack_from("<8sI", header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a session file")
+    if version == 1:
+        magic, version, model, n, *values = HEADER_V1.unpack_from(header)
+        state = values[:5]
+    elif version == VERSION and len(header) == HEADER.size:
+        magic, version, model, n, *values = HEADER.unpack(header)
+        state = values[:6]
+    else:
+        raise ValueError(f"{path} was saved by an unsupported version")
+    if model >= len(MODELS):
+        raise ValueError(f"{path} was saved by an unsupported version")
+    lims = values[len(state):]
+
+    if n > 0:
+        xs = np.memmap(path, dtype="<f8", mode="r", offset=DATA_OFFSET, shape=(n,))
+        ys = np.memmap(path, dtype="<f8", mode="r", offset=DATA_OFFSET + 8 * n, shape=(n,))
+    else:
+        xs = np.empty(0)
+        ys = np.empty(0)
+
+    lin_reg = MODELS[model]()
+    if issubclass(MODELS[model], RobustLinearRegression):
+        lin_reg.add_points(xs, ys)
+        return Session(xs, ys, lin_reg, tuple(lims[0:2]), tuple(lims[2:4]))
+    if version == 1:
+        # The last value of the state is the sum of y^2 (LinearRegression) or of (y - mean of y)^2 (stable)
+        if MODELS[model] is LinearRegression:
+            state = (*state, float(np.dot(ys, ys)))
+        else:
+            state = (*state, float(np.dot(ys - state[2], ys - state[2])) if n > 0 else 0.0)
+    lin_reg.set_state(state)
+    return Session(xs, ys, lin_reg, tuple(lims[0:2]), tuple(lims[2:4]))
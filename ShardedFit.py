@@ -0,0 +1,162 @@
+"""
+Sharded fitting of very large datasets
+
+The input (a text file, a .npy file or a pair of arrays) is split into shards,
+every shard is fitted by a separate worker process and the partial fits are merged
+into a single StableLinearRegression object (see StableLinearRegression.merge).
+The workers are only given the location of their shard (a byte range, a range of rows of
+a .npy file or of a shared memory block holding the arrays), so no points are pickled.
+
+Text files must contain one point per line, with the x and y coordinates separated
+by a comma (.csv), a tab (.tsv) or the delimiter found by DataImport.get_delimiter (any other extension).
+.npy files must contain an array of shape (n, 2).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from LinearRegression import LinearRegression, StableLinearRegression
+from DataImport import get_delimiter
+
+SHARD_BYTES = 64 * 1024 * 1024
+SHARD_ROWS = 4 * 1024 * 1024
+
+
+def fit_text_shard(path, start, stop, delimiter, skip_header):
+    """ Fits the lines of a text file which start inside the [start, stop) byte range.
+
+    A line which crosses the start offset belongs to the previous shard,
+    so every line of the file is fitted exactly once.
+    """
+
+    lin_reg = StableLinearRegression()
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            # Skip the rest of the line that started in the previous shard
+            f.readline()
+        elif skip_header:
+            for _ in range(skip_header):
+                f.readline()
+
+        begin = f.tell()
+        if begin >= stop:
+            return lin_reg
+        block = f.read(stop - begin)
+        if not block.endswith(b"\n"):
+            block += f.readline()
+
+    if block.strip():
+        data = np.loadtxt(block.decode().splitlines(), delimiter=delimiter, ndmin=2, usecols=(0, 1))
+        lin_reg.add_points(data[:, 0], data[:, 1])
+    return lin_reg
+
+
+def fit_npy_shard(path, start, stop):
+    """ Fits the rows [start, stop) of a memory-mapped .npy file. """
+
+    data = np.load(path, mmap_mode="r")
+    lin_reg = StableLinearRegression()
+    lin_reg.add_points(data[start:stop, 0], data[start:stop, 1])
+    return lin_reg
+
+
+def fit_shared_shard(name, size, start, stop):
+    """ Fits the points [start, stop) of the x and y arrays (of size points) stored in a shared memory block. """
+
+    shm = SharedMemory(name=name)
+    try:
+        data = np.ndarray((2, size), dtype=np.float64, buffer=shm.buf)
+        lin_reg = StableLinearRegression()
+        lin_reg.add_points(data[0, start:stop], data[1, start:stop])
+        # The block can't be closed while an array still uses its buffer
+        del data
+    finally:
+        shm.close()
+    return lin_reg
+
+
+def get_ranges(size, shard_size):
+    return [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+
+
+def sharded_fit(source, ys=None, workers=None, skip_header=0):
+    """ Fits a large dataset using a pool of worker processes.
+
+    Parameters
+    ----------
+    source : str or array_like
+        The path of a text / .npy points file, or the x coordinates of the points
+    ys (default = None) : array_like
+        The y coordinates of the points, used only if source is an array
+    workers (default = None) : int
+        The number of worker processes (defaults to the number of CPUs)
+    skip_header (default = 0) : int
+        The number of header lines to be skipped at the start of a text file
+
+    Returns
+    -------
+    StableLinearRegression
+        The merged fit, which has the same moments as a single-pass fit (up to rounding).
+    """
+
+    workers = workers or os.cpu_count() or 1
+    lin_reg = StableLinearRegression()
+
+    if ys is not None:
+        xs, ys = LinearRegression.as_columns(source, ys)
+        # The arrays are copied once into a block shared by the workers
+        shm = SharedMemory(create=True, size=max(2 * xs.nbytes, 1))
+        try:
+            data = np.ndarray((2, xs.size), dtype=np.float64, buffer=shm.buf)
+            data[0] = xs
+            data[1] = ys
+            del data
+            shard_size = max(1, min(SHARD_ROWS, -(-xs.size // workers)))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(fit_shared_shard, shm.name, xs.size, start, stop)
+                           for start, stop in get_ranges(xs.size, shard_size)]
+                for future in futures:
+                    lin_reg.merge(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+        return lin_reg
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if os.path.splitext(source)[1].lower() == ".npy":
+            rows = np.load(source, mmap_mode="r").shape[0]
+            shard_size = max(1, min(SHARD_ROWS, -(-rows // workers)))
+            futures = [pool.submit(fit_npy_shard, source, start, stop)
+                       for start, stop in get_ranges(rows, shard_size)]
+        else:
+            size = os.path.getsize(source)
+            delimiter = get_delimiter(source)
+            shard_size = max(1, min(SHARD_BYTES, -(-size // workers)))
+            futures = [pool.submit(fit_text_shard, source, start, stop, delimiter, skip_header)
+                       for start, stop in get_ranges(size, shard_size)]
+
+        for future in futures:
+            lin_reg.merge(future.result())
+
+    return lin_reg
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 1:
+        start_time = time.perf_counter()
+        lin_reg = sharded_fit(sys.argv[1])
+        elapsed = time.perf_counter() - start_time
+        print(f"y = {lin_reg.get_alpha()} + {lin_reg.get_beta()} * x ({lin_reg.n} points, {elapsed:.3f}s)")
+    else:
+        xs = np.random.rand(10 ** 7)
+        ys = 2 + 3 * xs + np.random.normal(0, 0.1, xs.size)
+        for workers in (1, 2, 4):
+            start_time = time.perf_counter()
+            lin_reg = sharded_fit(xs, ys, workers=workers)
+            elapsed = time.perf_counter() - start_time
+            print(f"{workers} workers: y = {lin_reg.get_alpha()} + {lin_reg.get_beta()} * x ({elapsed:.3f}s)")
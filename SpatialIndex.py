@@ -0,0 +1,214 @@
+import math
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    A uniform grid index over the points of a PointStore
+
+    The plane is divided into cells of cell_w x cell_h, and every cell keeps the indices of the points inside it,
+    so finding the point nearest to the mouse cursor only has to look at the few cells around the cursor,
+    instead of scanning all the points. The index is updated incrementally when points are added or deleted.
+    A query is fast only if the cells have about the size of the searched area, so the owner of the index
+    should rebuild it with a new cell size when the zoom level changes a lot (see needs_rebuild).
+
+    Attributes
+    ----------
+    cell_w : double
+        The width of a cell
+    cell_h : double
+        The height of a cell
+    cells : dict
+        A dictionary which maps the (column, row) of a cell to the list of indices of the points inside it
+
+    Methods
+    -------
+    get_cell(x, y)
+        Returns the (column, row) of the cell which contains the point (x, y).
+    add(index, x, y)
+        Adds the point with the given index to the index.
+    add_many(start, xs, ys)
+        Adds the points with the indices start, start + 1, ... to the index.
+    remove(index, x, y)
+        Removes the point with the given index from the index.
+    move(old_index, new_index, x, y)
+        Changes the index of a point (used when a store moves its last point into the place of a deleted one).
+    truncate(start, xs, ys)
+        Removes the last points, whose indices are start, start + 1, ... and whose coordinates are xs and ys.
+    clear()
+        Removes all the points from the index.
+    rebuild(xs, ys, cell_w, cell_h)
+        Rebuilds the index from scratch, with a new cell size.
+    needs_rebuild(rx, ry)
+        Returns True if the cells are much smaller or much larger than the radii of the searched area.
+    nearest(x, y, rx, ry, xs, ys)
+        Returns the index of the point nearest to (x, y) inside the ellipse with the radii rx and ry.
+    query(xlim, ylim, xs, ys)
+        Returns the indices of the points inside a rectangle, or None if it overlaps too many cells.
+    """
+
+    MAX_CELL_RATIO = 2
+    # The maximum number of cells looked at by a query (a few milliseconds of dictionary lookups)
+    MAX_QUERY_CELLS = 1 << 16
+
+    def __init__(self, cell_w, cell_h):
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.cells = {}
+
+    def get_cell(self, x, y):
+        return math.floor(x / self.cell_w), math.floor(y / self.cell_h)
+
+    def add(self, index, x, y):
+        self.cells.setdefault(self.get_cell(x, y), []).append(index)
+
+    def add_many(self, start, xs, ys):
+        if len(xs) == 0:
+            return
+
+        cols = np.floor(np.asarray(xs) / self.cell_w).astype(np.int64)
+        rows = np.floor(np.asarray(ys) / self.cell_h).astype(np.int64)
+        # Group the points by cell, so the dictionary is updated once per cell
+        order = np.lexsort((rows, cols))
+        cols, rows = cols[order], rows[order]
+        bounds = np.flatnonzero((np.diff(cols) != 0) | (np.diff(rows) != 0)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        stops = np.concatenate((bounds, [len(order)])).tolist()
+        indices = (order + start).tolist()
+
+        cols = cols.tolist()
+        rows = rows.tolist()
+        for first, last in zip(starts, stops):
+            self.cells.setdefault((cols[first], rows[first]), []).extend(indices[first:last])
+
+    def remove(self, index, x, y):
+        cell = self.get_cell(x, y)
+        indices = self.cells.get(cell)
+        if indices is None or index not in indices:
+            return False
+
+        indices.remove(index)
+        if not indices:
+            del self.cells[cell]
+        return True
+
+    def move(self, old_index, new_index, x, y):
+        indices = self.cells.get(self.get_cell(x, y))
+        if indices is not None and old_index in indices:
+            indices[indices.index(old_index)] = new_index
+
+    def truncate(self, start, xs, ys):
+        if start == 0:
+            self.clear()
+            return
+        if len(xs) == 0:
+            return
+
+        cols = np.floor(np.asarray(xs) / self.cell_w).astype(np.int64)
+        rows = np.floor(np.asarray(ys) / self.cell_h).astype(np.int64)
+        col_min, row_min = int(cols.min()), int(rows.min())
+        span = int(rows.max()) - row_min + 1
+        if (int(cols.max()) - col_min + 1) * span < 2 ** 62:
+            # Every cell gets a single integer key, so the distinct cells are found by one sort
+            keys = np.unique((cols - col_min) * span + (rows - row_min))
+            cells = zip((keys // span + col_min).tolist(), (keys % span + row_min).tolist())
+        else:
+            cells = set(zip(cols.tolist(), rows.tolist()))
+
+        # Only the cells of the removed points change, and every one of them is filtered once
+        for cell in cells:
+            indices = [index for index in self.cells.get(cell, ()) if index < start]
+            if indices:
+                self.cells[cell] = indices
+            else:
+                self.cells.pop(cell, None)
+
+    def clear(self):
+        self.cells = {}
+
+    def rebuild(self, xs, ys, cell_w, cell_h):
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.clear()
+        self.add_many(0, xs, ys)
+
+    def needs_rebuild(self, rx, ry):
+        ratio = self.MAX_CELL_RATIO
+        return not (self.cell_w / ratio <= rx <= self.cell_w * ratio
+                    and self.cell_h / ratio <= ry <= self.cell_h * ratio)
+
+    def nearest(self, x, y, rx, ry, xs, ys):
+        """ Returns the index of the point nearest to (x, y) inside the ellipse with the radii rx and ry.
+
+        The distances are measured after dividing the x and y offsets by rx and ry, so if the radii
+        correspond to the same number of pixels, the nearest point is the nearest one on the screen.
+        Returns None if there is no point inside the ellipse.
+
+        Parameters
+        ----------
+        x, y : double
+            The coordinates of the searched position
+        rx, ry : double
+            The radii of the searched area
+        xs, ys : numpy.ndarray
+            The coordinates of the indexed points
+        """
+
+        col_min, row_min = self.get_cell(x - rx, y - ry)
+        col_max, row_max = self.get_cell(x + rx, y + ry)
+
+        candidates = []
+        for col in range(col_min, col_max + 1):
+            for row in range(row_min, row_max + 1):
+                indices = self.cells.get((col, row))
+                if indices:
+                    candidates.extend(indices)
+        if not candidates:
+            return None
+
+        candidates = np.array(candidates)
+        dist = ((xs[candidates] - x) / rx) ** 2 + ((ys[candidates] - y) / ry) ** 2
+        best = int(np.argmin(dist))
+        if dist[best] > 1:
+            return None
+        return int(candidates[best])
+
+    def query(self, xlim, ylim, xs, ys):
+        """ Returns the indices of the points inside the rectangle xlim x ylim (as an array).
+
+        The points of the cells inside the rectangle are taken whole, and only the points of the cells
+        on its edges are compared with its limits, so a query costs O(cells + points inside the rectangle)
+        instead of O(n). The cells are either looked up one by one or, if there are fewer of them, taken from
+        the cells dictionary. Returns None if the query would look at more than MAX_QUERY_CELLS cells
+        (the cells are much smaller than the rectangle), so the caller can scan the points instead.
+        """
+
+        x_min, x_max = min(xlim), max(xlim)
+        y_min, y_max = min(ylim), max(ylim)
+        col_min, row_min = self.get_cell(x_min, y_min)
+        col_max, row_max = self.get_cell(x_max, y_max)
+        view_cells = (col_max - col_min + 1) * (row_max - row_min + 1)
+        if min(view_cells, len(self.cells)) > self.MAX_QUERY_CELLS:
+            return None
+
+        if view_cells <= len(self.cells):
+            cells = (((col, row), self.cells.get((col, row))) for col in range(col_min, col_max + 1)
+                     for row in range(row_min, row_max + 1))
+        else:
+            cells = ((cell, indices) for cell, indices in self.cells.items()
+                     if col_min <= cell[0] <= col_max and row_min <= cell[1] <= row_max)
+
+        inner = []
+        edge = []
+        for (col, row), indices in cells:
+            if not indices:
+                continue
+            if col_min < col < col_max and row_min < row < row_max:
+                inner.extend(indices)
+            else:
+                edge.extend(indices)
+
+        edge = np.array(edge, dtype=np.int64)
+        ex, ey = xs[edge], ys[edge]
+        edge = edge[(ex >= x_min) & (ex <= x_max) & (ey >= y_min) & (ey <= y_max)]
+        return np.concatenate((np.array(inner, dtype=np.int64), edge))
@@ -0,0 +1,90 @@
+from tkinter import *
+from tkinter import filedialog
+import Instrumentation
+
+
+class StatsPanel(Toplevel):
+    """
+    A window which displays the runtime statistics collected by Instrumentation
+
+    Opening the panel enables the instrumentation and closing it disables it again,
+    so the hot paths are timed only while somebody is looking at the statistics.
+    The table is refreshed every REFRESH_MS milliseconds.
+
+    Attributes
+    ----------
+    REFRESH_MS : 1000
+        The time (in milliseconds) between two refreshes of the table
+    text : Text
+        The (read-only) text widget which displays the table
+    reset_btn : Button
+        The "Reset" button, which clears the statistics
+    dump_btn : Button
+        The "Dump" button, which saves the statistics to a JSON file
+    refresh_id :
+        The id of the scheduled refresh call
+
+    Methods
+    -------
+    update_table()
+        Displays the current statistics.
+    refresh()
+        Updates the table and schedules the next refresh.
+    reset_clb()
+        A callback assigned to the reset_btn ("Reset") button.
+    dump_clb()
+        A callback assigned to the dump_btn ("Dump") button.
+    close()
+        Disables the instrumentation and destroys the window.
+    """
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Runtime statistics")
+
+        self.text = Text(self, width=84, height=20, font="TkFixedFont", wrap=NONE)
+        self.text.grid(row=0, column=0, columnspan=2, padx=5, pady=5)
+        self.reset_btn = Button(self, text="Reset", command=self.reset_clb, padx=5)
+        self.reset_btn.grid(row=1, column=0, pady=5)
+        self.dump_btn = Button(self, text="Dump", command=self.dump_clb, padx=5)
+        self.dump_btn.grid(row=1, column=1, pady=5)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        Instrumentation.enable()
+        self.refresh_id = None
+        self.refresh()
+
+    def update_table(self):
+        self.text["state"] = NORMAL
+        self.text.delete("1.0", END)
+        self.text.insert(END, Instrumentation.format_table())
+        self.text["state"] = DISABLED
+
+    def refresh(self):
+        # Instrument the modules imported since the last refresh (Plot is imported lazily)
+        Instrumentation.instrument()
+        self.update_table()
+        self.refresh_id = self.after(StatsPanel.REFRESH_MS, self.refresh)
+
+    def reset_clb(self):
+        Instrumentation.reset()
+        self.update_table()
+
+    def dump_clb(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Dump statistics", defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        try:
+            Instrumentation.dump(path)
+        except OSError as e:
+            print(f"Could not dump the statistics: {e}")
+
+    def close(self):
+        if self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)
+        Instrumentation.disable()
+        self.destroy()
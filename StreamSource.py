@@ -0,0 +1,428 @@
+"""
+Live streams of points
+
+A StreamSource runs an asyncio event loop on a background thread, which reads point records from
+a local socket or a pipe, collects them into batches and puts the batches into a bounded queue.
+The Tk thread takes all the queued points at once (see get_points) and adds them to the plot in a
+single update, so the regression is updated live without a Tk callback per point.
+
+Addresses:
+    tcp://HOST:PORT : listens on a TCP socket (any number of producers can connect)
+    unix://PATH : listens on a Unix socket
+    pipe://PATH : reads a named pipe (FIFO), or the standard input if PATH is "-" (until it is closed)
+        The pipe is opened without blocking, so the source is running before a writer opens it.
+
+Record formats:
+    text : one point per line, with the x and y coordinates separated by a comma, a tab or whitespace
+        (lines which can't be parsed are counted in bad_records and skipped)
+    binary : pairs of little-endian float64 values (16 bytes per point)
+
+A batch is queued when it has batch_points points or when batch_seconds passed since the previous
+batch, whichever comes first. If the GUI falls behind and the queue is full, the sources stop
+reading until there is room again, so the operating system buffers fill up and the producers are
+slowed down (backpressure) instead of the memory growing without bound.
+
+This module doesn't use Tk or matplotlib. Run it as a script to start a fake producer, which sends
+the points of a noisy line to a source at a given rate:
+    python StreamSource.py tcp://127.0.0.1:5555 --rate 200000 [--format binary] [--count N]
+"""
+
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+
+FORMATS = ("text", "binary")
+RECORD = np.dtype("<f8")
+
+
+def parse_address(address):
+    """ Returns the (scheme, location) of an address, where location is (host, port) for tcp and a path otherwise. """
+
+    scheme, sep, location = address.partition("://")
+    if not sep or scheme not in ("tcp", "unix", "pipe") or not location:
+        raise ValueError(f"invalid stream address: {address} (expected tcp://HOST:PORT, unix://PATH or pipe://PATH)")
+    if scheme == "tcp":
+        host, sep, port = location.rpartition(":")
+        if not sep or not port.isdigit():
+            raise ValueError(f"invalid TCP address: {address}")
+        return scheme, (host or "127.0.0.1", int(port))
+    return scheme, location
+
+
+def has_two_fields(data):
+    """ Returns True if every non-empty line of a block (whose separators are spaces) has exactly two fields. """
+
+    chars = np.frombuffer(data, dtype=np.uint8)
+    # The whitespace characters split by bytes.split (space, \n, \r, \v and \f)
+    blank = (chars == 32) | ((chars >= 10) & (chars <= 13))
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    lines = np.cumsum(chars == 10)
+    fields = np.bincount(lines[starts])
+    return bool(np.all((fields == 0) | (fields == 2)))
+
+
+def parse_text(data):
+    """ Returns the x and y columns of a block of complete text lines and the number of lines which were skipped. """
+
+    data = data.replace(b",", b" ").replace(b"\t", b" ")
+    values = data.split()
+    if len(values) % 2 == 0 and has_two_fields(data):
+        try:
+            points = np.array(values, dtype=np.float64)
+            return points[0::2], points[1::2], 0
+        except ValueError:
+            pass
+
+    # Some lines are malformed, so the block is parsed line by line
+    xs, ys, bad = [], [], 0
+    for line in data.splitlines():
+        fields = line.replace(b",", b" ").split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != 2:
+                raise ValueError
+            x, y = float(fields[0]), float(fields[1])
+        except ValueError:
+            bad += 1
+            continue
+        xs.append(x)
+        ys.append(y)
+    return np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64), bad
+
+
+class StreamSource:
+    """
+    A live source of points, read by an asyncio event loop on a background thread
+
+    Attributes
+    ----------
+    BATCH_POINTS : 8192
+        The default maximum number of points in a batch
+    BATCH_SECONDS : 0.02
+        The default maximum time (in seconds) between two batches
+    MAX_BATCHES : 16
+        The default maximum number of batches waiting for the GUI
+    READ_SIZE : 65536
+        The maximum number of bytes read from a connection at a time
+    BACKOFF : 0.005
+        The time (in seconds) the sources wait before trying again to queue a batch when the queue is full
+    address : str
+        The address of the source (see the module docstring)
+    fmt (default = "text") : str
+        The format of the records, "text" or "binary"
+    batch_points, batch_seconds, max_batches :
+        The limits described by BATCH_POINTS, BATCH_SECONDS and MAX_BATCHES
+    batches : queue.Queue
+        The (xs, ys) batches waiting for the GUI
+    held : tuple
+        The (xs, ys) rest of the batch split by the last get_points call, returned first by the next one
+        (None if there is no such rest)
+    thread : threading.Thread
+        The thread which runs the event loop (None before start)
+    loop : asyncio.AbstractEventLoop
+        The event loop of the source (None if it isn't running)
+    received : int
+        The number of points received so far
+    bad_records : int
+        The number of text lines which couldn't be parsed
+    stalls : int
+        The number of times a batch had to wait for room in the queue (how often backpressure was applied)
+    connections : int
+        The number of producers connected right now
+    error : Exception
+        The error which stopped the source (None if there was no such error)
+
+    Methods
+    -------
+    start()
+        Starts reading the source on a background thread.
+    stop()
+        Stops reading the source and closes it.
+    is_running()
+        Returns True if the source is being read.
+    get_points(max_points)
+        Returns all the queued points (at most max_points of them) as one (xs, ys) batch, or None.
+    has_points()
+        Returns True if some points are waiting for get_points.
+    run(ready)
+        Runs the event loop (on the background thread) until the source is stopped.
+    serve(ready)
+        The main coroutine of the event loop (opens the source and waits until it is stopped).
+    on_connection(reader, writer)
+        Reads the records of a producer which connected to the socket.
+    read(reader)
+        Reads the records of a connection until it is closed.
+    add(xs, ys)
+        Adds points to the current batch and queues the batch if it is full.
+    flush()
+        Queues the current batch, waiting for room in the queue if it is full.
+    flush_periodically()
+        Queues the current batch every batch_seconds seconds.
+    """
+
+    BATCH_POINTS = 8192
+    BATCH_SECONDS = 0.02
+    MAX_BATCHES = 16
+    READ_SIZE = 1 << 16
+    BACKOFF = 0.005
+
+    def __init__(self, address, fmt="text", batch_points=BATCH_POINTS, batch_seconds=BATCH_SECONDS,
+                 max_batches=MAX_BATCHES):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown record format: {fmt}")
+
+        self.scheme, self.location = parse_address(address)
+        self.address = address
+        self.fmt = fmt
+        self.batch_points = batch_points
+        self.batch_seconds = batch_seconds
+        self.max_batches = max_batches
+        self.batches = queue.Queue(max_batches)
+        self.held = None
+
+        self.thread = None
+        self.loop = None
+        self.stopped = None
+        self.push_lock = None
+        self.pending_xs = []
+        self.pending_ys = []
+        self.pending_size = 0
+
+        self.received = 0
+        self.bad_records = 0
+        self.stalls = 0
+        self.connections = 0
+        self.error = None
+
+    def start(self):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(ready,), name="stream", daemon=True)
+        self.thread.start()
+        # Wait until the source is open (or failed to open), so errors like a busy port are reported right away
+        ready.wait(timeout=5)
+
+    def run(self, ready):
+        try:
+            asyncio.run(self.serve(ready))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.loop = None
+            ready.set()
+
+    def stop(self):
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.stopped.set)
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def get_points(self, max_points=None):
+        """ Returns the queued points as one (xs, ys) batch, or None if there are none.
+
+        At most max_points points are returned: the rest of the last batch is held for the next call,
+        so the caller can bound the duration of an update.
+        """
+
+        xs_parts, ys_parts, size = [], [], 0
+        while max_points is None or size < max_points:
+            if self.held is not None:
+                (xs, ys), self.held = self.held, None
+            else:
+                try:
+                    xs, ys = self.batches.get_nowait()
+                except queue.Empty:
+                    break
+            if max_points is not None and size + xs.size > max_points:
+                rest = max_points - size
+                self.held = xs[rest:], ys[rest:]
+                xs, ys = xs[:rest], ys[:rest]
+            xs_parts.append(xs)
+            ys_parts.append(ys)
+            size += xs.size
+
+        if not size:
+            return None
+        if len(xs_parts) == 1:
+            return xs_parts[0], ys_parts[0]
+        return np.concatenate(xs_parts), np.concatenate(ys_parts)
+
+    def has_points(self):
+        return self.held is not None or not self.batches.empty()
+
+    async def serve(self, ready):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        self.push_lock = asyncio.Lock()
+
+        server = None
+        reader_task = None
+        if self.scheme == "tcp":
+            server = await asyncio.start_server(self.on_connection, *self.location)
+        elif self.scheme == "unix":
+            server = await asyncio.start_unix_server(self.on_connection, self.location)
+        else:
+            reader = asyncio.StreamReader(limit=StreamSource.READ_SIZE)
+            if self.location == "-":
+                pipe = sys.stdin.buffer
+            else:
+                # Opening a FIFO for reading would block the event loop until a writer opens it
+                pipe = os.fdopen(os.open(self.location, os.O_RDONLY | os.O_NONBLOCK), "rb", buffering=0)
+            await self.loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+            reader_task = asyncio.create_task(self.read(reader))
+            # A pipe ends when its writer closes it
+            reader_task.add_done_callback(lambda task: self.stopped.set())
+        ready.set()
+
+        flusher = asyncio.create_task(self.flush_periodically())
+        try:
+            await self.stopped.wait()
+        finally:
+            flusher.cancel()
+            if reader_task is not None:
+                reader_task.cancel()
+            if server is not None:
+                server.close()
+            if self.scheme == "unix" and os.path.exists(self.location):
+                os.remove(self.location)
+
+    async def on_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            await self.read(reader)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def read(self, reader):
+        leftover = b""
+        record_size = 2 * RECORD.itemsize
+        while not self.stopped.is_set():
+            data = await reader.read(StreamSource.READ_SIZE)
+            if not data:
+                break
+
+            data = leftover + data
+            if self.fmt == "binary":
+                end = len(data) - len(data) % record_size
+                points = np.frombuffer(data, dtype=RECORD, count=end // RECORD.itemsize).astype(np.float64)
+                xs, ys = points[0::2], points[1::2]
+            else:
+                # Only complete lines are parsed, the rest waits for the next read
+                end = data.rfind(b"\n") + 1
+                xs, ys, bad = parse_text(data[:end])
+                self.bad_records += bad
+            leftover = data[end:]
+            await self.add(xs, ys)
+
+        if self.fmt == "text" and leftover.strip():
+            xs, ys, bad = parse_text(leftover)
+            self.bad_records += bad
+            await self.add(xs, ys)
+        await self.flush()
+
+    async def add(self, xs, ys):
+        if xs.size == 0:
+            return
+
+        self.pending_xs.append(xs)
+        self.pending_ys.append(ys)
+        self.pending_size += xs.size
+        if self.pending_size >= self.batch_points:
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending_size:
+            return
+
+        batch = (np.concatenate(self.pending_xs), np.concatenate(self.pending_ys))
+        self.pending_xs, self.pending_ys, self.pending_size = [], [], 0
+        # The lock keeps the batches in order when several connections wait for room in the queue
+        async with self.push_lock:
+            while True:
+                try:
+                    self.batches.put_nowait(batch)
+                    break
+                except queue.Full:
+                    self.stalls += 1
+                    # Nothing is read while waiting here, which slows the producers down
+                    await asyncio.sleep(StreamSource.BACKOFF)
+        self.received += batch[0].size
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.batch_seconds)
+            await self.flush()
+
+
+async def produce(address, rate=100_000, count=None, fmt="text", alpha=2.0, beta=0.5, noise=1.0, chunk=4096):
+    """ A fake producer which sends the points of the line y = alpha + beta * x (plus normal noise) to a source.
+
+    The points are sent in chunks of chunk points, at about rate points per second, until count points
+    were sent (or forever, if count is None). Returns the number of points which were sent.
+    """
+
+    scheme, location = parse_address(address)
+    if scheme == "tcp":
+        reader, writer = await asyncio.open_connection(*location)
+    elif scheme == "unix":
+        reader, writer = await asyncio.open_unix_connection(location)
+    else:
+        raise ValueError("the fake producer can only connect to a socket")
+
+    rng = np.random.default_rng()
+    sent = 0
+    start_time = time.perf_counter()
+    try:
+        while count is None or sent < count:
+            size = chunk if count is None else min(chunk, count - sent)
+            xs = rng.uniform(0, 100, size)
+            ys = alpha + beta * xs + rng.normal(0, noise, size)
+            if fmt == "binary":
+                writer.write(np.column_stack((xs, ys)).astype(RECORD).tobytes())
+            else:
+                writer.write("".join(f"{x:.6f},{y:.6f}\n" for x, y in zip(xs.tolist(), ys.tolist())).encode())
+            # drain() waits while the source applies backpressure
+            await writer.drain()
+            sent += size
+
+            delay = sent / rate - (time.perf_counter() - start_time)
+            if delay > 0:
+                await asyncio.sleep(delay)
+    finally:
+        writer.close()
+    return sent
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send the points of a noisy line to a stream source.")
+    parser.add_argument("address", help="the address of the source (tcp://HOST:PORT or unix://PATH)")
+    parser.add_argument("-r", "--rate", type=float, default=100_000, help="points per second (default: 100000)")
+    parser.add_argument("-n", "--count", type=int, default=None, help="the number of points (default: endless)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="text", help="the record format (default: text)")
+    args = parser.parse_args(argv)
+
+    try:
+        sent = asyncio.run(produce(args.address, args.rate, args.count, args.format))
+    except (OSError, ValueError) as e:
+        print(f"Could not send the points: {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    print(f"Sent {sent} points")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
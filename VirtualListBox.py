@@ -0,0 +1,101 @@
+from tkinter import *
+
+
+class VirtualListBox(Listbox):
+    """
+    A list box which displays only the visible rows of a (possibly huge) list
+
+    A Tk Listbox stores every row as a Tcl string, so one with millions of rows uses hundreds of MB
+    and becomes slow to update and scroll. This list box holds only the rows inside the visible window,
+    which are formatted on demand from the backing data, while the scrollbar reflects the full list size.
+    Memory usage and redraw cost are therefore independent of the number of rows.
+
+    Attributes
+    ----------
+    row_count : function
+        A function which returns the total number of rows
+    get_row : function
+        A function which returns the text of the row with the given index
+    scrollbar : Scrollbar
+        The scrollbar used to scroll through the rows
+    first : int
+        The index of the first visible row
+
+    Methods
+    -------
+    get_visible_rows()
+        Returns the number of rows that fit inside the list box.
+    refresh()
+        Formats the visible rows again and updates the scrollbar.
+    scroll_to(first)
+        Makes the row with the given index the first visible one.
+    on_scroll(*args)
+        Callback assigned to the scrollbar ("moveto" and "scroll" commands).
+    on_mouse_wheel(event)
+        Callback which scrolls the list box when the mouse wheel is used.
+    """
+
+    def __init__(self, parent, row_count, get_row, scrollbar, **args):
+        """
+        Parameters
+        ----------
+        parent :
+            The parent window (or widget)
+        row_count : function
+            A function which returns the total number of rows
+        get_row : function
+            A function which returns the text of the row with the given index
+        scrollbar : Scrollbar
+            The scrollbar used to scroll through the rows
+        **args :
+            A list of options used by the Listbox widget (width, height, etc.),
+            which are passed to the Listbox __init__ function.
+        """
+        super().__init__(parent, args)
+
+        self.row_count = row_count
+        self.get_row = get_row
+        self.scrollbar = scrollbar
+        self.first = 0
+
+        self.scrollbar.config(command=self.on_scroll)
+        self.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.bind("<Button-4>", self.on_mouse_wheel)
+        self.bind("<Button-5>", self.on_mouse_wheel)
+
+    def get_visible_rows(self):
+        return int(self["height"])
+
+    def refresh(self):
+        total = self.row_count()
+        rows = self.get_visible_rows()
+        self.first = max(0, min(self.first, total - rows))
+        last = min(self.first + rows, total)
+
+        self.delete(0, END)
+        self.insert(END, *[self.get_row(i) for i in range(self.first, last)])
+
+        if total == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, last / total)
+
+    def scroll_to(self, first):
+        self.first = int(first)
+        self.refresh()
+
+    def on_scroll(self, *args):
+        rows = self.get_visible_rows()
+        if args[0] == MOVETO:
+            self.scroll_to(float(args[1]) * self.row_count())
+        elif args[0] == SCROLL:
+            step = rows if args[2] == PAGES else 1
+            self.scroll_to(self.first + int(args[1]) * step)
+
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first - 1)
+        else:
+            self.scroll_to(self.first + 1)
+        # Don't let the Listbox scroll its own (few) rows
+        return "break"
@@ -0,0 +1,290 @@
+import math
+import time
+import numpy as np
+from LinearRegression import StableLinearRegression
+from PointStore import RingPointStore
+
+
+class WindowedLinearRegression(StableLinearRegression):
+    """
+    A linear regression model fitted only on the newest points of a stream
+
+    The window is defined by a maximum number of points, a maximum age (in seconds) or both.
+    The points inside the window are kept in a RingPointStore, so the oldest point is evicted in O(1)
+    and the memory used doesn't grow over an endless stream. The moments are updated with Welford's
+    method (see StableLinearRegression), and they are recomputed from the window after every
+    max_points evictions, so the rounding errors can't pile up (this costs amortized O(1) per point).
+
+    Attributes
+    ----------
+    alpha, beta, n, mx, my, cxx, cxy, cyy :
+        The same as in StableLinearRegression
+    max_points (default = None) : int
+        The maximum number of points inside the window
+    max_age (default = None) : double
+        The maximum age (in seconds) of the points inside the window
+    clock (default = time.monotonic) : function
+        The function which returns the current time, used when a point has no timestamp
+    points : RingPointStore
+        The points inside the window, from the oldest to the newest
+    evicted : int
+        The number of points evicted since the moments were last recomputed
+
+    Methods
+    -------
+    add_point(x, y, t)
+        Adds a new point (with the timestamp t) to the window and evicts the points which fall out of it.
+    add_points(xs, ys, ts)
+        Adds a batch of points to the window and evicts the points which fall out of it.
+    expire(now)
+        Evicts the points which are older than max_age.
+    evict(count)
+        Evicts the oldest count points.
+    refit()
+        Recomputes the moments from the points inside the window.
+    del_point(x, y), del_points(xs, ys)
+        Points can leave the window only by being evicted, so these always return False.
+    set_state(state)
+        The state doesn't describe the points inside the window, so a windowed model can't be restored from it
+        (this raises ValueError).
+    reset()
+        Deletes all the points from the window.
+    """
+
+    def __init__(self, max_points=None, max_age=None, clock=time.monotonic):
+        super().__init__()
+        if max_points is None and max_age is None:
+            raise ValueError("max_points or max_age must be given")
+
+        self.max_points = max_points
+        self.max_age = max_age
+        self.clock = clock
+        self.points = RingPointStore(max_size=max_points)
+        self.evicted = 0
+
+    def add_point(self, x, y, t=None):
+        if t is None:
+            t = self.clock()
+        if self.max_points is not None and len(self.points) == self.max_points:
+            self.evict(1)
+
+        self.points.append(x, y, t)
+        super().add_point(x, y)
+        self.expire(t)
+
+    def add_points(self, xs, ys, ts=None):
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size == 0:
+            return
+        now = self.clock() if ts is None else float(np.max(ts))
+        ts = now if ts is None else np.asarray(ts, dtype=np.float64)
+
+        if self.max_points is not None:
+            # Only the newest max_points points of the batch can be inside the window
+            keep = min(xs.size, self.max_points)
+            xs, ys = xs[-keep:], ys[-keep:]
+            if np.ndim(ts):
+                ts = ts[-keep:]
+            self.evict(max(0, len(self.points) + keep - self.max_points))
+
+        self.points.extend(xs, ys, ts)
+        super().add_points(xs, ys)
+        self.expire(now)
+
+    def expire(self, now=None):
+        if self.max_age is None:
+            return
+        if now is None:
+            now = self.clock()
+        self.evict(self.points.count_older_than(now - self.max_age))
+
+    def evict(self, count):
+        if count <= 0:
+            return
+
+        xs, ys = self.points.pop_oldest(count)
+        self.evicted += xs.size
+        if len(self.points) == 0 or self.evicted >= max(len(self.points), 1):
+            self.refit()
+        else:
+            super().del_points(xs, ys)
+
+    def refit(self):
+        self.evicted = 0
+        if len(self.points) == 0:
+            self.set_moments(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        else:
+            self.set_moments(*self.get_batch_moments(self.points.xs, self.points.ys))
+
+    def del_point(self, x, y):
+        return False
+
+    def del_points(self, xs, ys):
+        return False
+
+    def set_state(self, state):
+        raise ValueError("the state of a windowed model doesn't describe the points inside its window")
+
+    def reset(self):
+        self.points.clear()
+        self.evicted = 0
+        # set_state is refused, but the state of no points describes an empty window
+        StableLinearRegression.set_state(self, (0, 0, 0, 0, 0, 0))
+
+
+class ExpWeightedLinearRegression(StableLinearRegression):
+    """
+    An exponentially weighted linear regression model
+
+    Instead of forgetting the old points all at once (like WindowedLinearRegression), this model
+    decays the weights of all the points every time a new point is added, so the fit follows the
+    newest points without storing any of them. The decay is either a fixed factor per added point,
+    or it depends on the time elapsed since the previous point (given as a half-life in seconds).
+    The weighted means and co-moments are updated with the weighted version of Welford's method.
+
+    Attributes
+    ----------
+    alpha, beta, mx, my, cxx, cxy, cyy :
+        The same as in StableLinearRegression, but weighted
+    n : int
+        The number of points added to the model
+    w : double
+        The total weight of the points (at most 1 / (1 - decay) for a fixed decay)
+    decay (default = None) : double
+        The factor (between 0 and 1) which multiplies the weights of the old points when a point is added
+    half_life (default = None) : double
+        The time (in seconds) after which the weight of a point is halved
+    clock (default = time.monotonic) : function
+        The function which returns the current time, used when a point has no timestamp
+    last_t : double
+        The timestamp of the newest point (None if there are no points)
+
+    Methods
+    -------
+    get_decay(t)
+        Returns the factor which multiplies the old weights when a point with the timestamp t is added.
+    scale(factor)
+        Multiplies the weights of all the points by factor.
+    add_point(x, y, t)
+        Decays the old weights and adds a new point with the weight 1.
+    add_points(xs, ys, ts)
+        Adds a batch of points, with the same result as adding them one by one.
+    del_point(x, y), del_points(xs, ys)
+        The weight of an old point isn't known anymore, so these always return False.
+    get_fit_stats()
+        The standard errors assume equally weighted points, so this always returns None.
+    get_state()
+        Returns the state of StableLinearRegression followed by w and last_t (NaN if there are no points).
+    set_state(state)
+        Restores the numbers returned by get_state.
+    reset()
+        Deletes all the points from the model.
+    """
+
+    def __init__(self, decay=None, half_life=None, clock=time.monotonic):
+        super().__init__()
+        if (decay is None) == (half_life is None):
+            raise ValueError("exactly one of decay and half_life must be given")
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError("decay must be between 0 and 1")
+
+        self.decay = decay
+        self.half_life = half_life
+        self.clock = clock
+        self.w = 0.0
+        self.last_t = None
+
+    def get_decay(self, t):
+        if self.decay is not None:
+            return self.decay
+        if self.last_t is None:
+            return 1.0
+        return 0.5 ** (max(t - self.last_t, 0.0) / self.half_life)
+
+    def scale(self, factor):
+        self.w *= factor
+        self.cxx *= factor
+        self.cxy *= factor
+        self.cyy *= factor
+
+    def add_point(self, x, y, t=None):
+        if t is None and self.half_life is not None:
+            t = self.clock()
+        self.scale(self.get_decay(t))
+        self.last_t = t
+
+        self.n += 1
+        self.w += 1
+        dx = x - self.mx
+        dy = y - self.my
+        self.mx += dx / self.w
+        self.my += dy / self.w
+        self.cxx += dx * (x - self.mx)
+        self.cxy += dx * (y - self.my)
+        self.cyy += dy * (y - self.my)
+
+        self.refresh_coef()
+
+    def add_points(self, xs, ys, ts=None):
+        xs, ys = self.as_columns(xs, ys)
+        if xs.size == 0:
+            return
+
+        # The weight of every point of the batch, as it will be after the whole batch is added
+        if self.decay is not None:
+            weights = self.decay ** np.arange(xs.size - 1, -1, -1, dtype=np.float64)
+            old_factor = self.decay ** xs.size
+            last_t = ts[-1] if ts is not None else None
+        else:
+            ts = np.full(xs.size, self.clock()) if ts is None else np.asarray(ts, dtype=np.float64)
+            last_t = float(ts[-1])
+            weights = 0.5 ** ((last_t - ts) / self.half_life)
+            old_factor = 1.0 if self.last_t is None else 0.5 ** (max(last_t - self.last_t, 0.0) / self.half_life)
+
+        self.scale(old_factor)
+        self.last_t = last_t
+
+        wb = float(weights.sum())
+        mxb = float(np.dot(weights, xs)) / wb
+        myb = float(np.dot(weights, ys)) / wb
+        dxs = xs - mxb
+        dys = ys - myb
+        cxxb = float(np.dot(weights * dxs, dxs))
+        cxyb = float(np.dot(weights * dxs, dys))
+        cyyb = float(np.dot(weights * dys, dys))
+
+        # Chan's formulas, with weights instead of numbers of points
+        wa = self.w
+        w = wa + wb
+        dx = mxb - self.mx
+        dy = myb - self.my
+        self.mx += dx * wb / w
+        self.my += dy * wb / w
+        self.cxx += cxxb + dx * dx * wa * wb / w
+        self.cxy += cxyb + dx * dy * wa * wb / w
+        self.cyy += cyyb + dy * dy * wa * wb / w
+        self.w = w
+        self.n += xs.size
+
+        self.refresh_coef()
+
+    def del_point(self, x, y):
+        return False
+
+    def del_points(self, xs, ys):
+        return False
+
+    def get_fit_stats(self):
+        return None
+
+    def get_state(self):
+        return super().get_state() + (self.w, math.nan if self.last_t is None else self.last_t)
+
+    def set_state(self, state):
+        *moments, w, last_t = state
+        self.w = w
+        self.last_t = None if math.isnan(last_t) else last_t
+        super().set_state(moments)
+
+    def reset(self):
+        self.set_state((0, 0, 0, 0, 0, 0, 0.0, math.nan))
@@ -0,0 +1,322 @@
+"""
+Background workers for the heavy jobs of the GUI
+
+Tk isn't thread-safe and every Tk callback runs on the main thread, so a long fit or a large
+import inside a callback freezes the whole window. A WorkerPool runs such jobs on a pool of threads
+instead. The jobs never touch Tk or matplotlib: their progress reports and results are put
+into a queue, which is drained on the Tk thread by a callback scheduled with after(), so every
+on_progress / on_done / on_error callback runs on the Tk thread, between two Tk events.
+The queue is drained for at most POLL_BUDGET seconds at a time, so the GUI keeps a steady
+frame rate even if the jobs produce results faster than they can be displayed.
+
+The heavy work of the jobs below is done by numpy, which releases the GIL, so the threads
+run in parallel with the Tk thread and with each other, without copying the points into
+other processes. Text parsing holds the GIL, so read_points parses small chunks at a time.
+
+A job is a function called as func(job, *args) on a worker thread. It can report its progress
+with job.report(progress, value), which also raises JobCancelled once the job is cancelled.
+
+Example:
+    pool = WorkerPool(root)
+    job = pool.submit(fit_model, TheilSenRegression(), xs, ys, on_done=print)
+    ...
+    job.cancel()
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROGRESS = "progress"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """ Raised inside a job (by Job.check or Job.report) after the job was cancelled. """
+
+
+class Job:
+    """
+    A job submitted to a WorkerPool
+
+    Attributes
+    ----------
+    MAX_PENDING : 4
+        The maximum number of progress reports of the job which wait for the Tk thread
+        A job which reports faster than the reports are handled is blocked by report(), so the queue
+        (and the memory used by the values in it) stays bounded.
+    pool : WorkerPool
+        The pool which runs the job
+    func : function
+        The function of the job, called as func(job, *args) on a worker thread
+    args : tuple
+        The arguments of func
+    on_done, on_progress, on_error : function
+        The callbacks called on the Tk thread with the result of func, with every progress report
+        (as on_progress(progress, value)) and with the exception raised by func
+    cancel_event : threading.Event
+        Set when the job is cancelled
+    pending : threading.Semaphore
+        Counts the free places for progress reports (see MAX_PENDING)
+    future : concurrent.futures.Future
+        The future of the call of func
+
+    Methods
+    -------
+    cancel()
+        Cancels the job (none of its callbacks will be called anymore).
+    is_cancelled()
+        Returns True if the job was cancelled.
+    check()
+        Raises JobCancelled if the job was cancelled (called by the job itself).
+    report(progress, value)
+        Sends a progress report (a fraction between 0 and 1 and an optional value) to the Tk thread.
+    """
+
+    MAX_PENDING = 4
+
+    def __init__(self, pool, func, args, on_done=None, on_progress=None, on_error=None):
+        self.pool = pool
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        self.pending = threading.Semaphore(Job.MAX_PENDING)
+        self.future = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            # func will never run, so the pool is told here that the job is over
+            self.pool.results.put((self, CANCELLED, None))
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, progress, value=None):
+        # Wait for a free place, but give up as soon as the job is cancelled
+        while not self.pending.acquire(timeout=0.05):
+            self.check()
+        self.check()
+        self.pool.results.put((self, PROGRESS, (progress, value)))
+
+
+class WorkerPool:
+    """
+    A pool of worker threads whose results are handled on the Tk thread
+
+    Attributes
+    ----------
+    POLL_MS : 10
+        The time (in milliseconds) between two polls of the results queue while there are jobs
+    POLL_BUDGET : 0.008
+        The maximum time (in seconds) spent on the callbacks of the jobs by one poll
+        (at least one result is handled by every poll)
+    widget :
+        The Tk widget used to schedule the polls
+    executor : ThreadPoolExecutor
+        The pool of worker threads
+    results : queue.Queue
+        The progress reports and results of the jobs, waiting to be handled on the Tk thread
+    jobs : set
+        The jobs which weren't finished yet
+    poll_id :
+        The id of the scheduled poll call, or None if no call is scheduled
+
+    Methods
+    -------
+    submit(func, *args, on_done=None, on_progress=None, on_error=None)
+        Runs func(job, *args) on a worker thread and returns the new Job.
+    run(job)
+        Calls the function of a job and queues its result (runs on a worker thread).
+    schedule_poll()
+        Schedules a poll, unless one is already scheduled.
+    poll()
+        Handles the queued results for up to POLL_BUDGET seconds and schedules the next poll.
+    dispatch(job, kind, value)
+        Calls the callback of a job which matches a queued result.
+    cancel_all()
+        Cancels every unfinished job.
+    shutdown()
+        Cancels every unfinished job and stops the worker threads.
+    """
+
+    POLL_MS = 10
+    POLL_BUDGET = 0.008
+
+    def __init__(self, widget, workers=None):
+        """
+        Parameters
+        ----------
+        widget :
+            The Tk widget used to schedule the polls
+        workers (default = None) : int
+            The number of worker threads (by default, the number of CPUs, but at most 4)
+        """
+
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(os.cpu_count() or 1, 4),
+                                           thread_name_prefix="worker")
+        self.results = queue.Queue()
+        self.jobs = set()
+        self.poll_id = None
+
+    def submit(self, func, *args, on_done=None, on_progress=None, on_error=None):
+        job = Job(self, func, args, on_done, on_progress, on_error)
+        self.jobs.add(job)
+        job.future = self.executor.submit(self.run, job)
+        self.schedule_poll()
+        return job
+
+    def run(self, job):
+        try:
+            job.check()
+            self.results.put((job, DONE, job.func(job, *job.args)))
+        except JobCancelled:
+            self.results.put((job, CANCELLED, None))
+        except Exception as e:
+            self.results.put((job, FAILED, e))
+
+    def schedule_poll(self):
+        if self.poll_id is None:
+            self.poll_id = self.widget.after(WorkerPool.POLL_MS, self.poll)
+
+    def poll(self):
+        self.poll_id = None
+        deadline = time.perf_counter() + WorkerPool.POLL_BUDGET
+        while True:
+            try:
+                job, kind, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.dispatch(job, kind, value)
+            if time.perf_counter() >= deadline:
+                break
+
+        if self.jobs or not self.results.empty():
+            self.schedule_poll()
+
+    def dispatch(self, job, kind, value):
+        if kind == PROGRESS:
+            job.pending.release()
+            if job.on_progress is not None and not job.is_cancelled():
+                job.on_progress(*value)
+            return
+
+        self.jobs.discard(job)
+        if job.is_cancelled():
+            return
+        if kind == DONE and job.on_done is not None:
+            job.on_done(value)
+        elif kind == FAILED:
+            if job.on_error is not None:
+                job.on_error(value)
+            else:
+                print(f"A background job failed: {value!r}")
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_points(job, path, chunk_size=None, parse_size=1 << 13):
+    """ Reads a points file and reports its points in chunks of chunk_size points.
+
+    The file is parsed parse_size points at a time, which keeps the GIL free often enough for the Tk thread.
+    Every report is (progress, (xs, ys)). Returns the number of points read.
+    """
+
+    import numpy as np
+    from DataImport import CHUNK_SIZE, iter_chunks
+
+    chunk_size = chunk_size or CHUNK_SIZE
+    xs_parts, ys_parts, size, total = [], [], 0, 0
+    for xs, ys, progress in iter_chunks(path, parse_size):
+        job.check()
+        xs_parts.append(xs)
+        ys_parts.append(ys)
+        size += xs.size
+        if size >= chunk_size:
+            job.report(progress, (np.concatenate(xs_parts), np.concatenate(ys_parts)))
+            total += size
+            xs_parts, ys_parts, size = [], [], 0
+
+    if size:
+        job.report(1.0, (np.concatenate(xs_parts), np.concatenate(ys_parts)))
+        total += size
+    return total
+
+
+def fit_model(job, lin_reg, xs, ys):
+    """ Fits a (new) model on the given points and returns it. """
+
+    lin_reg.reset()
+    lin_reg.add_points(xs, ys)
+    return lin_reg
+
+
+def build_density_grid(job, xs, ys):
+    """ Returns a new DensityGrid of the given points. """
+
+    from DensityGrid import DensityGrid
+
+    grid = DensityGrid()
+    grid.rebuild(xs, ys)
+    return grid
+
+
+def report_chunks(job, phase):
+    """ Returns a callback for the passes of a MappedDataset, which reports every percent of progress as (progress, phase). """
+
+    reported = [-1.0]
+
+    def callback(progress):
+        job.check()
+        if progress - reported[0] >= 0.01 or progress == 1.0:
+            reported[0] = progress
+            job.report(progress, phase)
+
+    return callback
+
+
+def fit_dataset(job, lin_reg, dataset):
+    """ Fits a (new) model on a MappedDataset, in one pass over its file, and returns it. """
+
+    lin_reg.reset()
+    dataset.fit(lin_reg, report_chunks(job, "Fitting"))
+    return lin_reg
+
+
+def scan_dataset(job, lin_reg, dataset, sample_size):
+    """ Fits a model on a MappedDataset, samples it and bins it into a DensityGrid (two passes over its file).
+
+    Returns (lin_reg, grid, sample_xs, sample_ys).
+    """
+
+    import numpy as np
+    from DensityGrid import DensityGrid
+
+    lin_reg.reset()
+    sample_xs, sample_ys = dataset.scan(lin_reg, sample_size, report_chunks(job, "Fitting"))
+    # A cell of a dataset of billions of points can hold more points than an int32 can count
+    grid = DensityGrid(dtype=np.int64)
+    dataset.bin(grid, report_chunks(job, "Binning"))
+    return lin_reg, grid, sample_xs, sample_ys
@@ -0,0 +1,89 @@
+"""
+Resident memory and throughput of an out-of-core dataset
+
+Run it from the repository root with:
+    python -m benchmarks.out_of_core [--points 20000000] [--path /tmp/points.f64]
+
+A raw file of float64 (x, y) pairs is written (in chunks, unless it already exists), then it is
+opened as a MappedDataset and scanned like the GUI does: fitted in one pass, then binned into a
+DensityGrid in another. The peak resident memory of the scan (read from /proc, so Linux only) stays
+the same for any file size, since only one chunk of the file is mapped at a time.
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from DataImport import CHUNK_SIZE
+from DensityGrid import DensityGrid
+from LinearRegression import LinearRegression
+from MappedDataset import MappedDataset
+
+
+def get_memory():
+    """ Returns the current and the peak resident memory of the process, in MB. """
+
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM"):
+                values[name] = int(value.split()[0]) / 1024
+    return values["VmRSS"], values["VmHWM"]
+
+
+def reset_peak_memory():
+    # Writing 5 to clear_refs resets VmHWM to the current resident memory
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def write_points(path, n):
+    rng = np.random.default_rng(0)
+    with open(path, "wb") as f:
+        for start in range(0, n, CHUNK_SIZE * 16):
+            xs = rng.normal(0.0, 3.0, min(CHUNK_SIZE * 16, n - start))
+            ys = 2.0 + 0.5 * xs + rng.normal(0.0, 1.0, xs.size)
+            np.column_stack((xs, ys)).astype("<f8").tofile(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory used by a scan of an out-of-core dataset.")
+    parser.add_argument("-n", "--points", type=int, default=20_000_000, help="the number of points in the file")
+    parser.add_argument("-p", "--path", default="/tmp/out_of_core_points.f64", help="the file of the points")
+    parser.add_argument("--keep", action="store_true", help="don't delete the file at the end")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path) or os.path.getsize(args.path) != 16 * args.points:
+        write_points(args.path, args.points)
+
+    dataset = MappedDataset(args.path)
+    start_rss, _ = get_memory()
+    reset_peak_memory()
+
+    lin_reg = LinearRegression()
+    start_time = time.perf_counter()
+    sample_xs, sample_ys = dataset.scan(lin_reg, 50_000)
+    scanned = time.perf_counter()
+    grid = DensityGrid(dtype=np.int64)
+    dataset.bin(grid)
+    binned = time.perf_counter()
+    for index in range(0, len(dataset), max(len(dataset) // 1000, 1)):
+        dataset.get_point(index)
+    paged = time.perf_counter()
+    _, peak_rss = get_memory()
+
+    size_mb = os.path.getsize(args.path) / 2 ** 20
+    print(f"{len(dataset)} points ({size_mb:.0f} MB)")
+    print(f"fit pass: {scanned - start_time:.2f} s ({size_mb / (scanned - start_time):.0f} MB/s), "
+          f"binning pass: {binned - scanned:.2f} s, 1000 pages: {(paged - binned) * 1e3:.0f} ms")
+    print(f"resident memory: {start_rss:.0f} MB before the scan, {peak_rss:.0f} MB at most during it "
+          f"(+{peak_rss - start_rss:.0f} MB, the grid alone takes {grid.counts.nbytes / 2 ** 20:.0f} MB)")
+    print(f"fitted line: y = {lin_reg.get_alpha():.3f} + {lin_reg.get_beta():.4f} * x (written: y = 2 + 0.5 * x)")
+
+    if not args.keep:
+        os.remove(args.path)
+
+
+if __name__ == "__main__":
+    main()
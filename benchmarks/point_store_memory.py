@@ -0,0 +1,77 @@
+"""
+Memory used by a list of Point objects and by a PointStore
+
+Run it from the repository root with:
+    python -m benchmarks.point_store_memory [number of points ...]
+
+The memory is measured with tracemalloc (NumPy reports its buffers to tracemalloc too).
+The per-point paths (a list of objects and PointStore.append) are measured only up to
+10^6 points by default, because they take minutes (and a few GB of memory) for 10^7 points;
+pass --all to measure them for every size.
+"""
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+from PointStore import PointStore
+
+
+class ObjectPoint:
+    """ The per-point object that Plot and PlotData used to store (without __slots__). """
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def measure(build):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak, elapsed
+
+
+def build_objects(xs, ys):
+    return [ObjectPoint(x, y) for x, y in zip(xs, ys)]
+
+
+def build_store_appends(xs, ys):
+    store = PointStore()
+    for x, y in zip(xs, ys):
+        store.append(x, y)
+    return store
+
+
+def build_store_extend(xs, ys):
+    store = PointStore()
+    store.extend(xs, ys)
+    return store
+
+
+def main(sizes, measure_all=False):
+    print(f"{'points':>10}  {'container':<22}{'MB':>10}{'peak MB':>10}{'B/point':>10}{'seconds':>10}")
+    for n in sizes:
+        xs = np.random.rand(n)
+        ys = np.random.rand(n)
+        builders = [("PointStore.extend", build_store_extend, xs, ys)]
+        if measure_all or n <= 10 ** 6:
+            # The Python floats are created before measuring, like the ones received from the GUI
+            xl = xs.tolist()
+            yl = ys.tolist()
+            builders.insert(0, ("list of Point objects", build_objects, xl, yl))
+            builders.append(("PointStore.append", build_store_appends, xl, yl))
+
+        for name, build, bx, by in builders:
+            current, peak, elapsed = measure(lambda: build(bx, by))
+            print(f"{n:>10}  {name:<22}{current / 2 ** 20:>10.1f}{peak / 2 ** 20:>10.1f}"
+                  f"{current / n:>10.1f}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--all"]
+    main([int(arg) for arg in args] or [10 ** 6, 10 ** 7], "--all" in sys.argv)
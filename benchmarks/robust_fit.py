@@ -0,0 +1,53 @@
+"""
+Cost and accuracy of the robust estimators compared with OLS
+
+Run it from the repository root with:
+    python -m benchmarks.robust_fit [number of points ...]
+
+The points lie around y = 2 + 0.5 * x, except for 10% of outliers placed far above the line,
+which pull the OLS slope away, while Theil-Sen and RANSAC should stay close to 0.5.
+Two costs are reported: a full fit of all the points (add_points) and adding one more point
+to the fitted model (add_point), which is what a click on the plot costs.
+"""
+
+import sys
+import time
+import numpy as np
+from LinearRegression import LinearRegression
+from RobustRegression import TheilSenRegression, RansacRegression
+
+MODELS = (LinearRegression, TheilSenRegression, RansacRegression)
+
+
+def get_dataset(n, outliers=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = rng.uniform(0, 100, n)
+    ys = 2 + 0.5 * xs + rng.normal(0, 1, n)
+    bad = rng.random(n) < outliers
+    ys[bad] = 200 + xs[bad] * -1 + rng.normal(0, 5, bad.sum())
+    return xs, ys
+
+
+def time_fit(cls, xs, ys):
+    lin_reg = cls()
+    start_time = time.perf_counter()
+    lin_reg.add_points(xs, ys)
+    fit_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    lin_reg.add_point(50.0, 27.0)
+    point_time = time.perf_counter() - start_time
+    return fit_time, point_time, lin_reg.get_beta()
+
+
+def main(sizes=(10 ** 5, 10 ** 6)):
+    print(f"{'points':>9}  {'model':<20}{'fit (ms)':>10}{'add_point (ms)':>16}{'beta':>9}")
+    for n in sizes:
+        xs, ys = get_dataset(n)
+        for cls in MODELS:
+            fit_time, point_time, beta = time_fit(cls, xs, ys)
+            print(f"{n:>9}  {cls.__name__:<20}{fit_time * 1e3:>10.1f}{point_time * 1e3:>16.2f}{beta:>9.4f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or (10 ** 5, 10 ** 6))
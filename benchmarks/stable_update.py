@@ -0,0 +1,67 @@
+"""
+Cost and accuracy of the sums-based and the Welford-based LinearRegression updates
+
+Run it from the repository root with:
+    python -m benchmarks.stable_update [number of points]
+
+The x coordinates are epoch timestamps (about 1.7e9), so the raw sums used by
+LinearRegression lose most of their precision, while StableLinearRegression
+should match a two-pass (centered) reference fit.
+"""
+
+import sys
+import time
+import numpy as np
+from LinearRegression import LinearRegression, StableLinearRegression
+
+
+def get_dataset(n, offset=1.7e9, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = offset + rng.random(n) * 3600
+    ys = 2 + 1e-3 * (xs - offset) + rng.normal(0, 0.1, n)
+    return xs, ys
+
+
+def get_reference_beta(xs, ys):
+    dx = xs - xs.mean()
+    return float(np.dot(dx, ys - ys.mean()) / np.dot(dx, dx))
+
+
+def time_per_point(cls, xs, ys):
+    """ Returns the average cost (in seconds) of add_point and del_point and the final fit. """
+
+    xs = xs.tolist()
+    ys = ys.tolist()
+    lin_reg = cls()
+
+    start_time = time.perf_counter()
+    for x, y in zip(xs, ys):
+        lin_reg.add_point(x, y)
+    add_time = (time.perf_counter() - start_time) / len(xs)
+    beta = lin_reg.get_beta()
+
+    half = len(xs) // 2
+    start_time = time.perf_counter()
+    for x, y in zip(xs[:half], ys[:half]):
+        lin_reg.del_point(x, y)
+    del_time = (time.perf_counter() - start_time) / half
+
+    return add_time, del_time, beta, lin_reg.get_beta()
+
+
+def main(n=200_000):
+    xs, ys = get_dataset(n)
+    ref_beta = get_reference_beta(xs, ys)
+    ref_beta_half = get_reference_beta(xs[n // 2:], ys[n // 2:])
+
+    print(f"{n} points, x offset = 1.7e9")
+    print(f"{'model':<24}{'add (us)':>10}{'del (us)':>10}{'rel. error':>14}{'after del':>14}")
+    for cls in (LinearRegression, StableLinearRegression):
+        add_time, del_time, beta, beta_half = time_per_point(cls, xs, ys)
+        err = abs(beta - ref_beta) / abs(ref_beta)
+        err_half = abs(beta_half - ref_beta_half) / abs(ref_beta_half)
+        print(f"{cls.__name__:<24}{add_time * 1e6:>10.3f}{del_time * 1e6:>10.3f}{err:>14.2e}{err_half:>14.2e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
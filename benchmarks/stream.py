@@ -0,0 +1,89 @@
+"""
+Throughput of a live stream into a plot (on the headless Agg backend)
+
+Run it from the repository root with:
+    python -m benchmarks.stream [--rate 200000] [--seconds 5] [--format text|binary]
+
+A fake producer (see StreamSource.produce) sends the points of a noisy line to a StreamSource over
+a local TCP socket, while the main thread plays the part of the Tk loop: every STREAM_POLL_MS
+milliseconds it adds chunks of the received points to a Plot for at most STREAM_UPDATE_SECONDS
+(like MainApplication.poll_stream) and redraws the figure once, like the idle draw of Tk.
+The sustained rate, the longest update and the longest redraw (together, the longest time the Tk loop
+would be blocked) and the number of times backpressure was applied are reported.
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+import matplotlib
+
+matplotlib.use("Agg")
+
+from MainApp import MainApplication
+from Plot import Plot
+from StreamSource import StreamSource, produce
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the throughput of a live stream into a plot.")
+    parser.add_argument("-r", "--rate", type=float, default=200_000, help="points per second sent by the producer")
+    parser.add_argument("-s", "--seconds", type=float, default=5.0, help="how long the producer sends points")
+    parser.add_argument("-f", "--format", choices=("text", "binary"), default="text", help="the record format")
+    args = parser.parse_args(argv)
+
+    address = f"tcp://127.0.0.1:{get_free_port()}"
+    stream = StreamSource(address, args.format)
+    stream.start()
+    if stream.error is not None:
+        raise stream.error
+
+    count = int(args.rate * args.seconds)
+    producer = threading.Thread(target=lambda: asyncio.run(produce(address, args.rate, count, args.format)))
+    producer.start()
+
+    plot = Plot(None)
+    # The Agg canvas draws right away, while Tk draws once when it is idle, so the drawing is done after the updates
+    plot.fig.canvas.draw_idle = lambda: None
+    updates = 0
+    longest = 0.0
+    longest_draw = 0.0
+    start_time = time.perf_counter()
+    while producer.is_alive() or stream.has_points() or stream.received < count:
+        # The same updates as MainApplication.poll_stream
+        update_start = time.perf_counter()
+        added = False
+        while time.perf_counter() < update_start + MainApplication.STREAM_UPDATE_SECONDS:
+            points = stream.get_points(MainApplication.STREAM_CHUNK_POINTS)
+            if points is None:
+                break
+            plot.add_points(*points)
+            added = True
+        if added:
+            longest = max(longest, time.perf_counter() - update_start)
+            updates += 1
+            draw_start = time.perf_counter()
+            plot.fig.canvas.draw()
+            longest_draw = max(longest_draw, time.perf_counter() - draw_start)
+        time.sleep(MainApplication.STREAM_POLL_MS / 1000)
+        if time.perf_counter() - start_time > args.seconds * 10:
+            break
+    elapsed = time.perf_counter() - start_time
+    stream.stop()
+
+    print(f"format: {args.format}, target rate: {args.rate:.0f} points/s")
+    print(f"received {len(plot.points)} of {count} points in {elapsed:.2f} s ({len(plot.points) / elapsed:.0f} points/s)")
+    print(f"{updates} plot updates, the longest took {longest * 1e3:.1f} ms (and its redraw {longest_draw * 1e3:.1f} ms), "
+          f"backpressure applied {stream.stalls} times")
+    print(f"fitted line: y = {plot.get_alpha():.3f} + {plot.get_beta():.4f} * x (sent: y = 2 + 0.5 * x)")
+
+
+if __name__ == "__main__":
+    main()
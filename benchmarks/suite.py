@@ -0,0 +1,271 @@
+"""
+Benchmark suite for the regression engine and the rendering hot paths
+
+Run it from the repository root with:
+    python -m benchmarks.suite [--quick] [--output results.json]
+                               [--baseline benchmarks/baseline.json] [--tolerance 0.5] [--save-baseline]
+
+Every benchmark reports one time in seconds (lower is better): the cost of one operation
+(per point, per call) or the total time of a bulk operation. Every benchmark is repeated
+and the best time is kept, which is the least noisy estimate on a busy machine.
+The results are written as JSON, and when a baseline is given every result is compared
+with it: a result slower than baseline * (1 + tolerance) is reported as a regression and
+the exit status is 1. The default tolerance allows for the jitter of shared machines
+(timings of an unchanged tree vary by up to ~50% there), use a smaller one on a quiet machine.
+The stored baseline was measured on a developer machine, so save
+a new one (--save-baseline) before comparing results measured on another machine.
+
+The suite runs headless with the Agg backend. The PlotData benchmark needs a Tk display,
+so it is skipped (and reported as such) when there is none.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from LinearRegression import LinearRegression
+from Plot import Plot
+import DataImport
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+TOLERANCE = 0.5
+
+
+def best_time(func, repeat):
+    """ Returns the smallest of repeat measurements of func() (in seconds).
+
+    The garbage collector is disabled during the measurements (like in timeit), so its pauses don't add noise.
+    """
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start_time)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return min(times)
+
+
+def get_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = rng.normal(0, 3, n)
+    ys = 2 + 0.5 * xs + rng.normal(0, 1, n)
+    return xs, ys
+
+
+def create_plot():
+    with warnings.catch_warnings():
+        # plt.show() warns that Agg is non-interactive
+        warnings.simplefilter("ignore")
+        return Plot(None)
+
+
+def bench_lin_reg(n, repeat):
+    xs, ys = get_points(n)
+    xs, ys = xs.tolist(), ys.tolist()
+    results = {}
+
+    def add():
+        lin_reg = LinearRegression()
+        for x, y in zip(xs, ys):
+            lin_reg.add_point(x, y)
+        return lin_reg
+
+    results["lin_reg.add_point"] = best_time(add, repeat) / n
+
+    def delete():
+        lin_reg = filled.pop()
+        for x, y in zip(xs, ys):
+            lin_reg.del_point(x, y)
+
+    filled = [add() for _ in range(repeat)]
+    results["lin_reg.del_point"] = best_time(delete, repeat) / n
+
+    lin_reg = add()
+
+    def update():
+        for _ in range(n):
+            lin_reg.update_coef()
+
+    results["lin_reg.update_coef"] = best_time(update, repeat) / n
+    results["lin_reg.add_points"] = best_time(lambda: LinearRegression().add_points(xs, ys), repeat)
+    return results
+
+
+def bench_plot(n, repeat):
+    xs, ys = get_points(n)
+    results = {}
+
+    plot = create_plot()
+    # draw_idle draws right away with Agg, while a GUI coalesces the redraws, so the draws are measured apart
+    plot.fig.canvas.draw_idle = lambda: None
+    points = list(zip(xs.tolist(), ys.tolist()))
+
+    def add():
+        plot.reset()
+        for x, y in points:
+            plot.add_point(x, y)
+
+    results["plot.add_point"] = best_time(add, repeat) / n
+
+    canvas = plot.fig.canvas
+    results["plot.full_draw"] = best_time(canvas.draw, repeat)
+
+    def update_line():
+        for _ in range(1000):
+            plot.update_best_fitting_line()
+
+    results["plot.update_best_fitting_line"] = best_time(update_line, repeat) / 1000
+    plt.close(plot.fig)
+    return results
+
+
+def bench_plot_data(n, repeat):
+    from tkinter import Tk, TclError
+    try:
+        root = Tk()
+    except TclError:
+        return {"plot_data.update_data": None, "plot_data.update_data_batch": None}
+
+    from PlotData import PlotData
+    plot_data = PlotData(root, height=PlotData.HEIGHT, width=PlotData.WIDTH)
+    xs, ys = get_points(n)
+    points = list(zip(xs.tolist(), ys.tolist()))
+
+    def insert():
+        plot_data.reset()
+        for x, y in points:
+            plot_data.update_data(x, y, 0.0, 1.0)
+
+    def insert_batch():
+        plot_data.reset()
+        plot_data.update_data_batch(xs, ys, 0.0, 1.0)
+
+    result = best_time(insert, repeat) / n
+    batch_result = best_time(insert_batch, repeat) / n
+    root.destroy()
+    return {"plot_data.update_data": result, "plot_data.update_data_batch": batch_result}
+
+
+def bench_ingest(n, repeat):
+    """ The time to import n points from a CSV file into a new plot and draw it. """
+
+    xs, ys = get_points(n)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    np.savetxt(path, np.column_stack((xs, ys)), delimiter=",", fmt="%.6f")
+
+    def ingest():
+        plot = create_plot()
+        for chunk_xs, chunk_ys, progress in DataImport.iter_chunks(path):
+            plot.add_points(chunk_xs, chunk_ys)
+        plot.fig.canvas.draw()
+        plt.close(plot.fig)
+
+    try:
+        return {"ingest.csv_to_plot": best_time(ingest, repeat)}
+    finally:
+        os.remove(path)
+
+
+def run(quick=False):
+    scale = 10 if quick else 1
+    repeat = 3 if quick else 7
+    ingest_n = 1_000_000 // scale
+
+    results = {}
+    results.update(bench_lin_reg(100_000 // scale, repeat))
+    results.update(bench_plot(2_000 // scale, repeat))
+    results.update(bench_plot_data(2_000 // scale, repeat))
+    results.update(bench_ingest(ingest_n, max(repeat // 2, 1)))
+
+    meta = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "quick": quick,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "ingest_points": ingest_n,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """ Prints every result next to its baseline and returns the names of the regressed benchmarks. """
+
+    regressions = []
+    print(f"{'benchmark':<34}{'time':>12}{'baseline':>12}{'ratio':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if value is None:
+            print(f"{name:<34}{'skipped':>12}")
+            continue
+        if base is None:
+            print(f"{name:<34}{value:>12.3g}{'-':>12}")
+            continue
+
+        ratio = value / base
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<34}{value:>12.3g}{base:>12.3g}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the regression engine and the plot rendering.")
+    parser.add_argument("--quick", action="store_true", help="use 10x smaller inputs")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-b", "--baseline", default=BASELINE_PATH, help="the baseline JSON file to compare with")
+    parser.add_argument("-t", "--tolerance", type=float, default=TOLERANCE,
+                        help="the allowed slowdown before a result is a regression (default: 0.5)")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = run(args.quick)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored["meta"].get("quick") != args.quick:
+            print("The baseline was measured with a different --quick setting, the results aren't compared")
+        else:
+            baseline = stored["results"]
+
+    regressions = compare(report["results"], baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,34 @@
-from MainApp import MainApplication
-from tkinter import Tk
+import time
+
+START_TIME = time.perf_counter()
+
+import sys
+
+
+def print_startup_profile(steps):
+    """
+    Prints how long every startup step took (in milliseconds), measured from the start of main.py.
+
+    steps is a list of (name, time) pairs, where time is the time.perf_counter() value at the end of the step.
+    """
+
+    previous = START_TIME
+    print("Startup profile:", file=sys.stderr)
+    for name, end in steps:
+        print(f"  {name:<24}{(end - previous) * 1000:8.1f} ms", file=sys.stderr)
+        previous = end
+    print(f"  {'total':<24}{(previous - START_TIME) * 1000:8.1f} ms", file=sys.stderr)
+
+
+def main(profile_startup=False):
+    steps = []
+
+    from tkinter import Tk
+    steps.append(("import tkinter", time.perf_counter()))
+    # Plot (and with it matplotlib) is imported only when the first plot is created
+    from MainApp import MainApplication
+    steps.append(("import MainApp", time.perf_counter()))
 
-def main():
     root = Tk()
     root.title("Linear regression in python")
     min_root_width = 400
@@ -9,9 +36,11 @@ def main():
     root.minsize(min_root_width, min_root_height)
 
     root.update()
+    steps.append(("create the window", time.perf_counter()))
     MainApp = MainApplication(root, width=root.winfo_width(), height=root.winfo_height(), bg="white")
     MainApp.grid_propagate(0)
     MainApp.grid(row=0, column=0)
+    steps.append(("create the widgets", time.perf_counter()))
 
 
     def on_resize(event):
@@ -26,29 +55,15 @@ def main():
 
     root.bind("<Configure>", on_resize)
 
+    if profile_startup:
+        def on_first_paint():
+            # Tk redraws the widgets in idle callbacks scheduled before this one
+            steps.append(("first paint", time.perf_counter()))
+            print_startup_profile(steps)
 
-    def refresh_plot_data():
-        """
-        Callback used to get the plot data and display it on the main app.
-        """
-
-        if MainApp.plot is not None:
-            plot_points = MainApp.plot.points
-            plot_lin_reg = MainApp.plot.lin_reg
-            already_added_points = MainApp.plot_data.points
-
-            for i in range(len(already_added_points), len(plot_points)):
-                # Add only new points
-                new_point = plot_points[i]
-                MainApp.plot_data.update_data(new_point.x, new_point.y, 
-                                            plot_lin_reg.get_alpha(), plot_lin_reg.get_beta())
-
-        root.after(500, refresh_plot_data)
-
-
-    root.after(100, refresh_plot_data)
+        root.after_idle(on_first_paint)
 
     root.mainloop()
 
 if __name__ == '__main__':
-    main()
+    main(profile_startup="--profile-startup" in sys.argv[1:])
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from DataImport import get_delimiter, iter_chunks
+
+
+def read_points(path):
+    chunks = list(iter_chunks(str(path)))
+    return np.concatenate([xs for xs, ys, progress in chunks]), np.concatenate([ys for xs, ys, progress in chunks])
+
+
+@pytest.mark.parametrize("ext, text, delimiter", [
+    (".txt", "1,2\n3,4\n", ","),
+    (".dat", "1\t2\n3\t4\n", "\t"),
+    (".txt", "\n1;2\n3;4\n", ";"),
+    (".dat", "1 2\n3  4\n", None),
+])
+def test_text_file_without_header_keeps_its_first_row(tmp_path, ext, text, delimiter):
+    path = tmp_path / ("points" + ext)
+    path.write_text(text)
+
+    assert get_delimiter(str(path)) == delimiter
+    xs, ys = read_points(path)
+    assert xs.tolist() == [1, 3]
+    assert ys.tolist() == [2, 4]
+
+
+def test_text_file_header_is_skipped(tmp_path):
+    path = tmp_path / "points.txt"
+    path.write_text("x,y\n1,2\n3,4\n")
+
+    xs, ys = read_points(path)
+    assert xs.tolist() == [1, 3]
+    assert ys.tolist() == [2, 4]
@@ -0,0 +1,57 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import pytest
+from History import History, Step, ADD
+from LinearRegression import LinearRegression
+from Plot import Plot
+
+
+@pytest.fixture
+def plot():
+    plot = Plot(None)
+    yield plot
+    plt.close(plot.fig)
+
+
+def get_points(plot):
+    return list(zip(plot.points.xs.tolist(), plot.points.ys.tolist()))
+
+
+def test_redo_after_undone_delete_restores_the_added_point(plot):
+    for x, y in ((0, 0), (1, 1), (2, 5)):
+        plot.add_point(x, y)
+    plot.del_point(1)
+    plot.add_point(3, 3)
+
+    plot.undo()
+    plot.undo()
+    plot.redo()
+    plot.redo()
+
+    assert get_points(plot) == [(0, 0), (2, 5), (3, 3)]
+    fresh = LinearRegression()
+    fresh.add_points(plot.points.xs, plot.points.ys)
+    assert plot.get_alpha() == pytest.approx(fresh.get_alpha())
+    assert plot.get_beta() == pytest.approx(fresh.get_beta())
+
+
+def test_undo_and_redo_of_a_batch(plot):
+    plot.add_points(np.arange(10.0), np.arange(10.0) * 2)
+    plot.add_points(np.arange(5.0), np.ones(5))
+    points = get_points(plot)
+
+    plot.undo()
+    assert len(plot.points) == 10
+    plot.redo()
+    assert get_points(plot) == points
+
+
+def test_group_doesnt_merge_the_step_before_it():
+    history = History()
+    history.record(Step(ADD, 0, 1, None, None, None, None))
+    history.begin_group()
+    history.record(Step(ADD, 1, 5, None, None, None, None))
+    history.record(Step(ADD, 5, 9, None, None, None, None))
+    history.end_group()
+
+    assert [(step.start, step.stop) for step in history.undo_steps] == [(0, 1), (1, 9)]
@@ -0,0 +1,40 @@
+import tkinter
+import pytest
+import Instrumentation
+
+
+@pytest.fixture
+def tcl():
+    # A Tcl interpreter without Tk, so the tests don't need a display
+    tcl = tkinter.Tcl()
+    yield tcl
+    Instrumentation.disable()
+    Instrumentation.histograms.clear()
+
+
+def test_callback_registered_before_enable_is_timed(tcl):
+    calls = []
+
+    def on_event(value):
+        calls.append(value)
+        return value
+
+    command = tcl.register(on_event)
+    Instrumentation.enable()
+    assert tcl.tk.call(command, "a") == "a"
+
+    assert calls == ["a"]
+    assert Instrumentation.snapshot()["tk.on_event"]["count"] == 1
+
+
+def test_callback_is_not_timed_after_disable(tcl):
+    def on_event():
+        pass
+
+    Instrumentation.enable()
+    command = tcl.register(on_event)
+    tcl.tk.call(command)
+    Instrumentation.disable()
+    tcl.tk.call(command)
+
+    assert Instrumentation.snapshot()["tk.on_event"]["count"] == 1
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from LinearRegression import LinearRegression, StableLinearRegression, Z_95, t_quantile
+from RobustRegression import RansacRegression
+
+
+@pytest.mark.parametrize("model", (LinearRegression, StableLinearRegression))
+def test_offset_x_is_not_a_vertical_fit(model):
+    # Timestamps: a large offset and a spread of an hour
+    xs = 1.7e9 + np.linspace(0, 3600, 20000)
+    ys = 0.5 * (xs - 1.7e9) + 3
+    lin_reg = model()
+    lin_reg.add_points(xs, ys)
+
+    assert lin_reg.get_beta() is not None
+    assert lin_reg.get_beta() == pytest.approx(0.5, rel=1e-2)
+    assert lin_reg.get_fit_stats() is not None
+
+
+@pytest.mark.parametrize("model", (LinearRegression, StableLinearRegression))
+def test_equal_x_is_a_vertical_fit(model):
+    lin_reg = model()
+    lin_reg.add_points(np.full(100, 1.7e9 + 0.1), np.arange(100.0))
+
+    assert lin_reg.get_alpha() is None
+    assert lin_reg.get_beta() is None
+    assert lin_reg.get_fit_stats() is None
+
+
+def test_ransac_fits_offset_x():
+    rng = np.random.default_rng(1)
+    xs = 1.7e9 + np.linspace(0, 3600, 20000)
+    ys = 0.5 * (xs - 1.7e9) + 3 + rng.normal(0, 1, xs.size)
+    ys[::50] += 1000
+    ransac = RansacRegression()
+    ransac.add_points(xs, ys)
+
+    assert ransac.get_beta() == pytest.approx(0.5, rel=1e-3)
+
+
+# The 0.975 quantiles of Student's t distribution, from the usual tables
+@pytest.mark.parametrize("df, expected", [
+    (1, 12.7062), (2, 4.3027), (3, 3.1824), (4, 2.7764), (5, 2.5706), (10, 2.2281), (30, 2.0423),
+])
+def test_t_quantile_matches_the_tables(df, expected):
+    assert t_quantile(df) == pytest.approx(expected, abs=1e-4)
+
+
+def test_t_quantile_of_other_levels():
+    # The 0.995 quantiles, which need z = 2.5758...
+    assert t_quantile(3, 2.5758293035489004) == pytest.approx(5.8409, abs=1e-4)
+    assert t_quantile(30, 2.5758293035489004) == pytest.approx(2.7500, abs=1e-4)
+    assert t_quantile(4, -Z_95) == pytest.approx(-2.7764, abs=1e-4)
+
+
+@pytest.mark.parametrize("model", (LinearRegression, StableLinearRegression))
+def test_merged_shards_match_a_single_fit(model):
+    xs = np.linspace(0, 100, 3000)
+    ys = 2 - 0.25 * xs + np.sin(xs)
+    merged = model()
+    for start in range(0, xs.size, 1000):
+        shard = model()
+        shard.add_points(xs[start:start + 1000], ys[start:start + 1000])
+        merged.merge(shard)
+    single = model()
+    single.add_points(xs, ys)
+
+    assert merged.n == single.n
+    assert merged.get_alpha() == pytest.approx(single.get_alpha(), rel=1e-9)
+    assert merged.get_beta() == pytest.approx(single.get_beta(), rel=1e-9)
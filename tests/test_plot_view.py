@@ -0,0 +1,46 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import pytest
+from Plot import Plot
+
+
+@pytest.fixture
+def plot():
+    plot = Plot(None, lod_threshold=1000)
+    yield plot
+    plt.close(plot.fig)
+
+
+def get_markers(plot):
+    return sorted(map(tuple, np.asarray(plot.scatter.get_offsets()).tolist()))
+
+
+def get_inside(plot, xlim, ylim):
+    xs, ys = plot.points.xs, plot.points.ys
+    inside = (xs >= xlim[0]) & (xs <= xlim[1]) & (ys >= ylim[0]) & (ys <= ylim[1])
+    return sorted(zip(xs[inside].tolist(), ys[inside].tolist()))
+
+
+def test_zoomed_view_shows_the_points_inside_it(plot):
+    rng = np.random.default_rng(0)
+    plot.add_points(*rng.uniform(-10, 10, (2, 20000)))
+    plot.ax.set(xlim=(0, 1), ylim=(0, 1))
+    plot.update_points_view()
+    assert plot.scatter.get_visible()
+    assert get_markers(plot) == get_inside(plot, (0, 1), (0, 1))
+
+    # Only the appended points are compared with the view
+    plot.add_points(*rng.uniform(-10, 10, (2, 5000)))
+    plot.add_point(0.5, 0.5)
+    assert get_markers(plot) == get_inside(plot, (0, 1), (0, 1))
+
+    # The index is rebuilt with cells of the pick radius, so the view is queried from it
+    plot.find_nearest(0.5, 0.5)
+    plot.ax.set(xlim=(0.2, 1.3), ylim=(-0.4, 0.9))
+    plot.update_points_view()
+    assert get_markers(plot) == get_inside(plot, (0.2, 1.3), (-0.4, 0.9))
+
+    plot.del_point(len(plot.points) - 1)
+    plot.ax.set(xlim=(0, 1), ylim=(0, 1))
+    plot.update_points_view()
+    assert get_markers(plot) == get_inside(plot, (0, 1), (0, 1))
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from PointStore import PointStore, RingPointStore
+
+
+def test_ring_refuses_the_changes_of_a_point_store():
+    store = RingPointStore(max_size=4)
+    for x in range(6):
+        store.append(x, x)
+    assert store.head != 0
+
+    with pytest.raises(TypeError):
+        store.remove(1)
+    with pytest.raises(TypeError):
+        store.reinsert(1, 0.0, 0.0)
+    with pytest.raises(TypeError):
+        store.set_size(2)
+    with pytest.raises(TypeError):
+        RingPointStore.from_arrays(np.zeros(2), np.zeros(2))
+    assert store.xs.tolist() == [2, 3, 4, 5]
+    assert not hasattr(store, "offsets")
+
+
+def test_offsets_follow_removed_and_reinserted_points():
+    store = PointStore()
+    store.extend([0, 1, 2, 3], [0, 10, 20, 30])
+    store.get_offsets()
+    store.remove(1)
+    assert store.get_offsets().tolist() == [[0, 0], [3, 30], [2, 20]]
+    store.reinsert(1, 1, 10)
+    assert store.get_offsets().tolist() == [[0, 0], [1, 10], [2, 20], [3, 30]]
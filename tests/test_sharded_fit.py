@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from ShardedFit import sharded_fit
+
+
+def test_sharded_fit_of_arrays_with_offset_x():
+    xs = 1.7e9 + np.linspace(0, 3600, 100000)
+    ys = 0.5 * (xs - 1.7e9) + 3
+
+    lin_reg = sharded_fit(xs, ys, workers=3)
+
+    assert lin_reg.n == xs.size
+    assert lin_reg.get_beta() == pytest.approx(0.5, rel=1e-9)
+
+
+def test_sharded_fit_of_text_file(tmp_path):
+    path = tmp_path / "points.txt"
+    path.write_text("".join(f"{x},{2 * x + 1}\n" for x in range(1000)))
+
+    lin_reg = sharded_fit(str(path), workers=2)
+
+    assert lin_reg.n == 1000
+    assert lin_reg.get_alpha() == pytest.approx(1)
+    assert lin_reg.get_beta() == pytest.approx(2)
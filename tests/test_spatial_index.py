@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from SpatialIndex import SpatialIndex
+
+
+@pytest.mark.parametrize("cell_size", (0.05, 0.3, 5.0))
+def test_query_returns_the_points_inside_the_rectangle(cell_size):
+    rng = np.random.default_rng(0)
+    xs, ys = rng.uniform(-1, 1, (2, 5000))
+    index = SpatialIndex(cell_size, cell_size)
+    index.add_many(0, xs, ys)
+    xlim, ylim = (0.45, -0.2), (-0.7, 0.1)
+
+    inside = index.query(xlim, ylim, xs, ys)
+
+    expected = np.flatnonzero((xs >= -0.2) & (xs <= 0.45) & (ys >= -0.7) & (ys <= 0.1))
+    assert sorted(inside.tolist()) == expected.tolist()
+
+
+def test_query_gives_up_on_too_many_cells():
+    xs, ys = np.random.default_rng(0).uniform(0, 1, (2, 100000))
+    index = SpatialIndex(1e-4, 1e-4)
+    index.add_many(0, xs, ys)
+
+    assert index.query((0, 1), (0, 1), xs, ys) is None
@@ -0,0 +1,32 @@
+import os
+import threading
+import time
+import pytest
+from StreamSource import StreamSource
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="named pipes need a POSIX system")
+def test_pipe_source_starts_before_a_writer_opens_it(tmp_path):
+    path = str(tmp_path / "points")
+    os.mkfifo(path)
+    stream = StreamSource("pipe://" + path, batch_seconds=0.01)
+    start_time = time.perf_counter()
+    stream.start()
+    try:
+        assert time.perf_counter() - start_time < 1
+        assert stream.error is None and stream.is_running()
+
+        def write():
+            with open(path, "w") as f:
+                f.write("1,2\n3,4\n")
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(timeout=5)
+        stream.thread.join(timeout=5)
+        assert stream.get_points(1)[0].tolist() == [1]
+        assert stream.has_points()
+        assert stream.get_points()[1].tolist() == [4]
+        assert not stream.has_points()
+    finally:
+        stream.stop()